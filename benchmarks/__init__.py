@@ -0,0 +1 @@
+"""Micro-benchmarks for Mongomantic hot paths. Run a module with `python -m benchmarks.<name>`."""
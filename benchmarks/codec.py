@@ -0,0 +1,40 @@
+"""Compares dict()-based and codec encode and decode throughput of MongoDBModel
+
+Usage: python -m benchmarks.codec [number of documents]
+"""
+
+import sys
+import time
+
+from mongomantic.core.codec import ModelCodec
+
+from .hydration import Customer, make_documents
+
+
+def per_second(n: int, function, values) -> float:
+    start = time.perf_counter()
+    for value in values:
+        function(value)
+    return n / (time.perf_counter() - start)
+
+
+def main(n: int = 50_000):
+    codec = ModelCodec(Customer)
+    models = [Customer.from_mongo(document) for document in make_documents(n)]
+
+    # Passing any argument to to_mongo takes the dict() path
+    legacy_encode = per_second(n, lambda model: model.to_mongo(by_alias=True), models)
+    codec_encode = per_second(n, codec.encode, models)
+
+    # from_mongo consumes _id, so every run needs fresh documents
+    legacy_decode = per_second(n, Customer.from_mongo, make_documents(n))
+    codec_decode = per_second(n, codec.decode, make_documents(n))
+
+    print(f"encode dict(): {legacy_encode:>12,.0f} docs/sec")
+    print(f"encode codec:  {codec_encode:>12,.0f} docs/sec ({codec_encode / legacy_encode:.1f}x)")
+    print(f"decode dict(): {legacy_decode:>12,.0f} docs/sec")
+    print(f"decode codec:  {codec_decode:>12,.0f} docs/sec ({codec_decode / legacy_decode:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,69 @@
+"""Compares validated and trusted hydration throughput of MongoDBModel.from_mongo
+
+Usage: python -m benchmarks.hydration [number of documents]
+"""
+
+from typing import List, Optional
+
+import sys
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from mongomantic import MongoDBModel
+from pydantic import BaseModel
+
+
+class Address(BaseModel):
+    street: str
+    city: str
+    zip_code: Optional[str] = None
+
+
+class Customer(MongoDBModel):
+    first_name: str
+    last_name: str
+    email: str
+    age: int
+    score: float
+    joined: datetime
+    tags: List[str]
+    address: Address
+
+
+def make_documents(n: int) -> List[dict]:
+    return [
+        {
+            "_id": ObjectId(),
+            "first_name": "John",
+            "last_name": "Smith",
+            "email": f"john{i}@mail.com",
+            "age": i % 90,
+            "score": i / 3,
+            "joined": datetime(2021, 1, 1),
+            "tags": ["a", "b", "c"],
+            "address": {"street": "Main St", "city": "Beirut", "zip_code": "1100"},
+        }
+        for i in range(n)
+    ]
+
+
+def docs_per_second(n: int, trusted: bool) -> float:
+    documents = make_documents(n)  # from_mongo consumes _id, so every run needs fresh documents
+
+    start = time.perf_counter()
+    for document in documents:
+        Customer.from_mongo(document, trusted=trusted)
+    return n / (time.perf_counter() - start)
+
+
+def main(n: int = 50_000):
+    validated = docs_per_second(n, trusted=False)
+    trusted = docs_per_second(n, trusted=True)
+
+    print(f"validated: {validated:>12,.0f} docs/sec")
+    print(f"trusted:   {trusted:>12,.0f} docs/sec ({trusted / validated:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
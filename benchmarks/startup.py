@@ -0,0 +1,115 @@
+"""Import time and cold start of short-lived processes using mongomantic
+
+Every case runs in a fresh interpreter, which reports its own time and the modules it loaded. Cases fail when
+their best time over several runs exceeds its budget, or when they load a module they should not need.
+
+Usage: python -m benchmarks.startup [runs]
+"""
+
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+import json
+import subprocess
+import sys
+
+# Modules only needed by specific features, which importing the package must not load
+HEAVY_MODULES = (
+    "multiprocessing",
+    "gzip",
+    "bz2",
+    "lzma",
+    "concurrent.futures",
+    "importlib.metadata",
+    "mongomock",
+    "motor",
+    "mongomantic.core.async_base_repository",
+    "mongomantic.core.write_buffer",
+)
+
+
+class Case(NamedTuple):
+    name: str
+    setup: str  # Runs before timing starts
+    statement: str  # Timed
+    budget_ms: float
+    forbidden: Tuple[str, ...] = HEAVY_MODULES
+
+
+COLD_START = """
+from mongomantic import BaseRepository, MongoDBModel, connect
+
+class Event(MongoDBModel):
+    name: str
+
+class EventRepository(BaseRepository):
+    class Meta:
+        model = Event
+        collection = "event"
+
+connect("mongodb://localhost:27017", "startup", connect=False, serverSelectionTimeoutMS=100)
+EventRepository._get_collection()
+"""
+
+CASES = (
+    Case("import mongomantic", "", "import mongomantic", 100, HEAVY_MODULES + ("pydantic", "pymongo")),
+    Case("import BaseRepository", "", "from mongomantic import BaseRepository", 1500),
+    Case("connect", "from mongomantic import connect", "connect('mongodb://localhost:27017', 'startup')", 50),
+    Case("cold start", "", COLD_START, 2500),
+)
+
+_RUNNER = """
+import json, sys, time
+exec(compile({setup!r}, "<setup>", "exec"))
+start = time.perf_counter()
+exec(compile({statement!r}, "<statement>", "exec"))
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "modules": sorted(sys.modules)}}))
+"""
+
+
+def run_case(case: Case) -> Tuple[float, Set[str]]:
+    """Time in milliseconds and modules loaded by the case, in a fresh interpreter"""
+    code = _RUNNER.format(setup=case.setup, statement=case.statement)
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.splitlines()[-1])
+    return result["ms"], set(result["modules"])
+
+
+def check(case: Case, runs: int = 3) -> Dict:
+    """Best time of the case over runs, and the forbidden modules it loaded"""
+    times = []
+    loaded: Set[str] = set()
+    for _ in range(runs):
+        ms, modules = run_case(case)
+        times.append(ms)
+        loaded = modules
+
+    best = min(times)
+    forbidden = sorted(module for module in case.forbidden if module in loaded)
+    return {"name": case.name, "ms": best, "budget_ms": case.budget_ms, "forbidden": forbidden}
+
+
+def failures(results: List[Dict]) -> List[str]:
+    messages = []
+    for result in results:
+        if result["ms"] > result["budget_ms"]:
+            messages.append(f"{result['name']}: {result['ms']:.0f} ms over budget of {result['budget_ms']:.0f} ms")
+        if result["forbidden"]:
+            messages.append(f"{result['name']}: loaded {', '.join(result['forbidden'])}")
+    return messages
+
+
+def main(runs: int = 5) -> int:
+    results = [check(case, runs) for case in CASES]
+    print(f"{'case':<26}{'best ms':>10}{'budget ms':>12}")
+    for result in results:
+        print(f"{result['name']:<26}{result['ms']:>10.1f}{result['budget_ms']:>12.0f}")
+
+    messages = failures(results)
+    for message in messages:
+        print(message)
+    return 1 if messages else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,245 @@
+"""Benchmark suite for repository hot paths
+
+Runs every case against mongomock, or a MongoDB server with --uri, across model shapes of growing size and nesting
+depth. Reports throughput, p50/p99 latency of each call and peak memory allocated by Python. Results can be saved
+as a baseline, and later runs compared against it to catch regressions.
+
+Usage:
+    python -m benchmarks.suite [-n DOCUMENTS] [--uri URI] [--filter TEXT] [--save FILE] [--compare FILE]
+"""
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+from mongomantic import BaseRepository, Index, MongoDBModel
+from mongomantic.core.database import MongomanticClient, connect, disconnect
+from pydantic import BaseModel, create_model
+
+DATABASE = "mongomantic_benchmarks"
+
+# Fields per level and nesting depth of the benchmarked models
+SHAPES = {"small": (5, 0), "medium": (20, 1), "large": (40, 3)}
+
+# Regressions smaller than this fraction of baseline throughput are considered noise
+DEFAULT_THRESHOLD = 0.1
+
+_FIELD_TYPES = (str, int, float, datetime, List[str])
+
+
+def make_model(name: str, fields: int, depth: int, base: Type[BaseModel] = MongoDBModel) -> Type[BaseModel]:
+    definitions: Dict[str, Any] = {f"field_{i}": (_FIELD_TYPES[i % len(_FIELD_TYPES)], ...) for i in range(fields)}
+    if depth:
+        definitions["child"] = (make_model(f"{name}Child", fields, depth - 1, BaseModel), ...)
+    return create_model(name, __base__=base, **definitions)
+
+
+def make_document(fields: int, depth: int, i: int) -> Dict[str, Any]:
+    values = (f"value {i}", i, i / 3, datetime(2021, 1, 1 + i % 28), ["a", "b", "c"])
+    document = {f"field_{j}": values[j % len(values)] for j in range(fields)}
+    if depth:
+        document["child"] = make_document(fields, depth - 1, i)
+    return document
+
+
+def make_repository(shape: str) -> Type[BaseRepository]:
+    fields, depth = SHAPES[shape]
+    meta = type("Meta", (), {"model": make_model(f"{shape.title()}Model", fields, depth), "collection": shape})
+    return type(f"{shape.title()}Repository", (BaseRepository,), {"Meta": meta})
+
+
+@dataclass
+class Result:
+    name: str
+    ops_per_sec: float  # Documents, or calls for single-document cases, per second at median latency
+    p50_ms: float  # Latency of one call
+    p99_ms: float
+    peak_kib: float  # Peak memory allocated by Python during one call
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable[[Any], Any]  # Timed call, given the value returned by prepare
+    prepare: Callable[[], Any] = lambda: None  # Untimed setup before every call
+    ops: int = 1  # Operations per call
+    calls: int = 5
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile
+
+    >>> percentile([1.0, 2.0, 3.0, 4.0], 0.5)
+    2.0
+    """
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(fraction * len(ordered))) - 1))]
+
+
+def measure(case: Case) -> Result:
+    case.run(case.prepare())  # Warm up caches, compiled query shapes and encoding plans
+
+    latencies = []
+    for _ in range(case.calls):
+        argument = case.prepare()
+        gc.collect()
+        start = time.perf_counter()
+        case.run(argument)
+        latencies.append(time.perf_counter() - start)
+
+    # Memory is measured in a separate call, as tracing slows allocations down
+    argument = case.prepare()
+    gc.collect()
+    tracemalloc.start()
+    case.run(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return Result(
+        name=case.name,
+        ops_per_sec=case.ops / percentile(latencies, 0.5),  # The median resists outliers better than the mean
+        p50_ms=percentile(latencies, 0.5) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        peak_kib=peak / 1024,
+    )
+
+
+def repository_cases(shape: str, n: int) -> List[Case]:
+    repository = make_repository(shape)
+    fields, depth = SHAPES[shape]
+    model = repository.Meta.model
+    collection = repository._get_collection()
+
+    def reset():
+        collection.delete_many({})
+        return [model(**make_document(fields, depth, i)) for i in range(n)]
+
+    repository.save_many(reset())
+    ids = [document["_id"] for document in collection.find({}, projection=["_id"])]
+    gets = min(n, 1000)
+    view = create_model(f"{shape.title()}View", __base__=MongoDBModel, field_0=(str, ...), field_1=(int, ...))
+
+    return [
+        Case(f"get/{shape}", lambda _: repository.get(id=ids[len(ids) // 2]), calls=gets),
+        Case(f"save_many/{shape}", repository.save_many, reset, ops=n),
+        Case(f"find/{shape}", lambda _: list(repository.find()), ops=n),
+        Case(f"find_projection/{shape}", lambda _: list(repository.find(projection=["field_0"], as_="tuple")), ops=n),
+        Case(f"find_view/{shape}", lambda _: list(repository.find(view=view)), ops=n),
+        Case(f"aggregate/{shape}", lambda _: list(repository.aggregate([{"$match": {}}])), ops=n),
+    ]
+
+
+def model_cases(shape: str, n: int) -> List[Case]:
+    fields, depth = SHAPES[shape]
+    model = make_model(f"{shape.title()}Model", fields, depth)
+    models = [model(**make_document(fields, depth, i)) for i in range(n)]
+
+    def documents():
+        return [{"_id": None, **make_document(fields, depth, i)} for i in range(n)]  # from_mongo consumes _id
+
+    return [
+        Case(f"from_mongo/{shape}", lambda batch: [model.from_mongo(document) for document in batch], documents, n),
+        Case(f"to_mongo/{shape}", lambda _: [instance.to_mongo() for instance in models], ops=n),
+    ]
+
+
+def query_cases(n: int) -> List[Case]:
+    repository = make_repository("medium")
+    index = Index(fields=["+field_0", "-field_1", "field_2"], unique=True, sparse=True)
+
+    def process_kwargs(_):
+        for i in range(n):
+            repository._process_kwargs({"field_0": "value", "field_1__gte": i, "child__field_0__in": ["a", "b"]})
+
+    def index_to_pymongo(_):
+        for _ in range(n):
+            index.to_pymongo()
+
+    return [Case("process_kwargs", process_kwargs, ops=n), Case("index_to_pymongo", index_to_pymongo, ops=n)]
+
+
+def run(n: int, uri: Optional[str] = None, only: Optional[str] = None) -> List[Result]:
+    connect(uri or "localhost:27017", DATABASE, mock=uri is None)
+    try:
+        cases = query_cases(n)
+        for shape in SHAPES:
+            cases += model_cases(shape, n) + repository_cases(shape, n)
+
+        return [measure(case) for case in cases if only is None or only in case.name]
+    finally:
+        if uri is not None:
+            MongomanticClient.client.drop_database(DATABASE)
+        disconnect()
+
+
+def environment(n: int, uri: Optional[str]) -> Dict[str, Any]:
+    return {"python": platform.python_version(), "machine": platform.machine(), "backend": uri or "mongomock", "n": n}
+
+
+def compare(results: List[Result], baseline: Dict[str, Any], threshold: float) -> List[Tuple[str, float]]:
+    """Cases whose throughput dropped by more than threshold since the baseline, with their relative change"""
+    regressions = []
+    for result in results:
+        previous = baseline["results"].get(result.name)
+        if previous is None:
+            continue
+        change = result.ops_per_sec / previous["ops_per_sec"] - 1
+        if change < -threshold:
+            regressions.append((result.name, change))
+    return regressions
+
+
+def report(results: List[Result], baseline: Optional[Dict[str, Any]] = None):
+    print(f"{'case':<26}{'ops/sec':>14}{'p50 ms':>10}{'p99 ms':>10}{'peak KiB':>11}{'vs baseline':>13}")
+    for result in results:
+        previous = (baseline or {}).get("results", {}).get(result.name)
+        change = f"{result.ops_per_sec / previous['ops_per_sec'] - 1:+.1%}" if previous else ""
+        print(
+            f"{result.name:<26}{result.ops_per_sec:>14,.0f}{result.p50_ms:>10.3f}{result.p99_ms:>10.3f}"
+            f"{result.peak_kib:>11,.0f}{change:>13}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=2000, help="Documents per case")
+    parser.add_argument("--uri", help="MongoDB server to benchmark against, instead of mongomock")
+    parser.add_argument("--filter", dest="only", help="Only run cases whose name contains this text")
+    parser.add_argument("--save", help="Write results to this baseline file")
+    parser.add_argument("--compare", help="Compare results with this baseline file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Tolerated throughput drop")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    results = run(args.n, args.uri, args.only)
+    report(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            data = {"environment": environment(args.n, args.uri), "results": {r.name: asdict(r) for r in results}}
+            json.dump(data, file, indent=2)
+
+    if baseline is not None:
+        if baseline.get("environment") != environment(args.n, args.uri):
+            print(f"Baseline environment differs: {baseline.get('environment')}")
+        regressions = compare(results, baseline, args.threshold)
+        for name, change in regressions:
+            print(f"Regression: {name} {change:+.1%}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,81 @@
 # type: ignore[attr-defined]
-"""A MongoDB Python ORM, built on Pydantic and PyMongo."""
+"""A MongoDB Python ORM, built on Pydantic and PyMongo.
 
-try:
-    from importlib.metadata import PackageNotFoundError, version
-except ImportError:  # pragma: no cover
-    from importlib_metadata import PackageNotFoundError, version
+Public names are imported from their modules on first access, so that importing the package, e.g. to read
+__version__ or to run a short CLI job touching one repository, does not load every feature.
+"""
 
+from typing import TYPE_CHECKING, Any, List
 
-try:
-    __version__ = version(__name__)
-except PackageNotFoundError:  # pragma: no cover
-    __version__ = "unknown"
+from importlib import import_module
 
+_EXPORTS = {
+    "AsyncBaseRepository": "mongomantic.core.async_base_repository",
+    "BaseRepository": "mongomantic.core.base_repository",
+    "MongoDBModel": "mongomantic.core.mongo_model",
+    "connect": "mongomantic.core.database",
+    "connect_async": "mongomantic.core.async_database",
+    "disconnect": "mongomantic.core.database",
+    "disconnect_async": "mongomantic.core.async_database",
+    "Index": "mongomantic.core.index",
+    "Pipeline": "mongomantic.core.pipeline",
+    "Q": "mongomantic.core.query",
+    "run_in_transaction": "mongomantic.core.session",
+    "start_session": "mongomantic.core.session",
+    "transaction": "mongomantic.core.session",
+}
 
-from mongomantic.core.base_repository import BaseRepository
-from mongomantic.core.database import connect, disconnect
-from mongomantic.core.index import Index
-from mongomantic.core.mongo_model import MongoDBModel
+__all__ = [
+    "AsyncBaseRepository",
+    "BaseRepository",
+    "MongoDBModel",
+    "connect",
+    "connect_async",
+    "disconnect",
+    "disconnect_async",
+    "Index",
+    "Pipeline",
+    "Q",
+    "run_in_transaction",
+    "start_session",
+    "transaction",
+]
 
-__all__ = ["BaseRepository", "MongoDBModel", "connect", "disconnect", "Index"]
+if TYPE_CHECKING:  # pragma: no cover
+    from mongomantic.core.async_base_repository import AsyncBaseRepository
+    from mongomantic.core.async_database import connect_async, disconnect_async
+    from mongomantic.core.base_repository import BaseRepository
+    from mongomantic.core.database import connect, disconnect
+    from mongomantic.core.index import Index
+    from mongomantic.core.mongo_model import MongoDBModel
+    from mongomantic.core.pipeline import Pipeline
+    from mongomantic.core.query import Q
+    from mongomantic.core.session import run_in_transaction, start_session, transaction
+
+
+def _version() -> str:
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:  # pragma: no cover
+        from importlib_metadata import PackageNotFoundError, version
+
+    try:
+        return version(__name__)
+    except PackageNotFoundError:  # pragma: no cover
+        return "unknown"
+
+
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        value = _version()
+    elif name in _EXPORTS:
+        value = getattr(import_module(_EXPORTS[name]), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value  # Later accesses skip __getattr__
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__) | {"__version__"})
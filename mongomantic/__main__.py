@@ -0,0 +1,109 @@
+"""Command line interface
+
+python -m mongomantic sync-indexes myapp.repositories [myapp.other:UserRepository ...] [--alias name=uri/db] [--dry-run]
+"""
+
+from typing import List, Optional, Tuple
+
+import argparse
+import importlib
+import inspect
+import sys
+
+from mongomantic.config import MongoSettings
+from mongomantic.core.base_repository import BaseRepository
+from mongomantic.core.database import DEFAULT_CONNECTION_NAME, connect
+from mongomantic.core.errors import IndexCreationError
+
+
+def find_repositories(target: str) -> List[type]:
+    """Resolves 'package.module:Repository', or every repository defined in 'package.module'"""
+    module_name, _, class_name = target.partition(":")
+    module = importlib.import_module(module_name)
+
+    if class_name:
+        return [getattr(module, class_name)]
+
+    return [
+        value
+        for _, value in inspect.getmembers(module, inspect.isclass)
+        if issubclass(value, BaseRepository) and value.__module__ == module.__name__
+    ]
+
+
+def parse_alias(value: str) -> Tuple[str, str, str]:
+    """Parses 'name=uri/database' into its alias, URI and database
+
+    >>> parse_alias("analytics=mongodb://replica:27017/events")
+    ('analytics', 'mongodb://replica:27017', 'events')
+    """
+    name, _, address = value.partition("=")
+    uri, _, database = address.rpartition("/")
+    if not (name and uri and database):
+        raise argparse.ArgumentTypeError(f"Invalid alias {value!r}, expected name=uri/database")
+    return name, uri, database
+
+
+def sync_indexes(args: argparse.Namespace) -> int:
+    connect(args.uri, args.database)
+    for name, uri, database in args.aliases:
+        connect(uri, database, alias=name)
+    aliases = {DEFAULT_CONNECTION_NAME} | {name for name, _, _ in args.aliases}
+
+    failed = False
+    for target in args.repositories:
+        for repository in find_repositories(target):
+            alias = getattr(repository.Meta, "connection", DEFAULT_CONNECTION_NAME)
+            if alias not in aliases:
+                print(
+                    f"{repository.__name__}: skipped, connection '{alias}' is not configured, "
+                    f"pass --alias {alias}=URI/DATABASE",
+                    file=sys.stderr,
+                )
+                failed = True
+                continue
+
+            try:
+                plan = repository.sync_indexes(
+                    drop=args.drop, background=args.background, rolling=args.rolling, dry_run=args.dry_run
+                )
+            except IndexCreationError as e:
+                print(f"{repository.__name__}: {e}", file=sys.stderr)
+                failed = True
+                continue
+
+            for line in plan.describe() or [f"{plan.collection}: up to date"]:
+                print(line)
+
+    return 1 if failed else 0
+
+
+def app(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="mongomantic")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync = commands.add_parser("sync-indexes", help="Create, rebuild and drop indexes to match Meta.indexes")
+    sync.add_argument("repositories", nargs="+", help="Modules, or module:Repository paths, to sync")
+    sync.add_argument("--uri", default=MongoSettings.uri, help="Defaults to $MONGO_URI")
+    sync.add_argument("--database", default=MongoSettings.database, help="Defaults to $MONGO_DATABASE")
+    sync.add_argument(
+        "--alias",
+        dest="aliases",
+        action="append",
+        type=parse_alias,
+        default=[],
+        metavar="NAME=URI/DATABASE",
+        help="Connection used by repositories whose Meta.connection is NAME. May be repeated.",
+    )
+    sync.add_argument("--dry-run", action="store_true", help="Only print the plan")
+    sync.add_argument("--no-drop", dest="drop", action="store_false", help="Keep indexes that are not declared")
+    sync.add_argument("--background", action="store_true", help="Build indexes in the background (MongoDB < 4.2)")
+    sync.add_argument("--rolling", action="store_true", help="Apply changes one index at a time")
+    sync.set_defaults(handler=sync_indexes)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(app())
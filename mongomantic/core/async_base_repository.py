@@ -0,0 +1,413 @@
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Type, Union
+
+from functools import partial
+
+from mongomantic.core.index import Index
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from pymongo.results import UpdateResult
+
+from .async_database import AsyncMongomanticClient
+from .base_repository import ABRepositoryMeta, RepositoryMixin
+from .bulk import (
+    DEFAULT_BATCH_SIZE,
+    BulkWriteResult,
+    PendingWrite,
+    delete_request,
+    insert_request,
+    iter_batches,
+    model_writes,
+    record_batch,
+    replace_request,
+    request_writes,
+)
+from .database import DEFAULT_CONNECTION_NAME
+from .errors import DoesNotExistError, IndexCreationError, InvalidQueryError, MultipleObjectsReturnedError, WriteError
+from .mongo_model import MongoDBModel
+from .query import Q
+
+
+class AsyncBaseRepository(RepositoryMixin, metaclass=ABRepositoryMeta):
+    """Asyncio counterpart of BaseRepository, backed by Motor.
+
+    Covers saving, get, find, aggregate, updates and bulk writes. Pagination, counts, distinct values, views,
+    deferred fields, sessions and Meta.cache are only implemented by BaseRepository.
+
+    Every operation is a coroutine, except find and aggregate which return async iterators.
+    Connect with connect_async before use.
+    """
+
+    class Meta:
+        @property
+        def model(self) -> Type[MongoDBModel]:
+            """Model class that subclasses MongoDBModel"""
+            raise NotImplementedError
+
+        @property
+        def collection(self) -> str:
+            """String representing the MongoDB collection to use when storing this model"""
+            raise NotImplementedError
+
+        @property
+        def indexes(self) -> List[Index]:
+            """List of MongoDB indexes that should be setup for this particular model"""
+            raise NotImplementedError
+
+        @property
+        def connection(self) -> str:
+            """Alias of the connection to use, as passed to connect_async(). Defaults to 'default'."""
+            return DEFAULT_CONNECTION_NAME
+
+        @property
+        def read_preference(self) -> str:
+            """Optional read preference for this collection, e.g. 'secondaryPreferred'"""
+            return None
+
+    @classmethod
+    async def _get_collection(cls):
+        """Returns a reference to the Motor collection, and initializes indexes if first time"""
+        if not hasattr(cls, "_indexes") or cls._indexes is None:
+            cls._indexes = True  # State to know that already checked
+
+            if getattr(cls.Meta, "auto_create_index", True):
+                await cls._create_indexes()
+
+        db = AsyncMongomanticClient.get_database(getattr(cls.Meta, "connection", DEFAULT_CONNECTION_NAME))
+        return cls._configure_collection(db[cls.Meta.collection])
+
+    @classmethod
+    async def _create_indexes(cls):
+        indexes = getattr(cls.Meta, "indexes", False)
+        if indexes:
+            try:
+                pymongo_indexes = [index.to_pymongo() for index in indexes]
+                collection = await cls._get_collection()
+                await collection.create_indexes(pymongo_indexes)
+            except Exception as e:
+                raise IndexCreationError(f"Failed to create indexes: {e}")
+
+    @classmethod
+    async def save(cls, model, as_: str = "model") -> Any:
+        """Saves object in MongoDB. See BaseRepository.save.
+
+        New models are inserted. Persisted models are updated in place with a $set of their changed fields.
+        """
+        cls._check_save_mode(as_)
+        if model.id is not None and model.is_persisted:
+            model = await cls._save_changes(model)
+            return model.id if as_ == "id" else model
+
+        try:
+            document = model.to_mongo()
+            collection = await cls._get_collection()
+            res = await collection.insert_one(document)
+        except Exception as e:
+            raise WriteError(f"Error inserting document: \n{e}")
+
+        return cls._saved(model, document, res.inserted_id, as_)
+
+    @classmethod
+    async def _save_changes(cls, model) -> Type[MongoDBModel]:
+        changed = model.changed_fields
+        if not changed:
+            return model
+
+        try:
+            collection = await cls._get_collection()
+            res = await collection.update_one({"_id": model.id}, {"$set": model.to_mongo(include=changed)})
+        except Exception as e:
+            raise WriteError(f"Error updating document: \n{e}")
+
+        if res.acknowledged and not res.matched_count:
+            raise WriteError(f"Error updating document: {model.id} does not exist")
+
+        model._mark_persisted()
+        return model
+
+    @classmethod
+    async def update_one(cls, update: Dict, *queries: Q, upsert: bool = False, **kwargs) -> UpdateResult:
+        """Updates the first document matching a filter. See BaseRepository.update_one.
+
+        Args:
+            update: Update operators, or plain field values which are applied with $set
+            queries: Q objects combined with the keyword filters
+            upsert: If True, insert a document if none matches
+            kwargs: Filter keyword arguments
+
+        Raises:
+            InvalidQueryError: If find options such as sort, skip or limit are given
+            WriteError: If the update failed
+
+        Returns:
+            UpdateResult: PyMongo result with matched, modified and upserted counts
+        """
+        cls._process_filter(kwargs, queries, "update_one")
+
+        try:
+            collection = await cls._get_collection()
+            return await collection.update_one(kwargs, cls._update_spec(update), upsert=upsert)
+        except Exception as e:
+            raise WriteError(f"Error updating document: \n{e}")
+
+    @classmethod
+    async def update_where(cls, update: Dict, *queries: Q, upsert: bool = False, **kwargs) -> UpdateResult:
+        """Updates all documents matching a filter. See BaseRepository.update_where.
+
+        Args:
+            update: Update operators, or plain field values which are applied with $set
+            queries: Q objects combined with the keyword filters
+            upsert: If True, insert a document if none matches
+            kwargs: Filter keyword arguments
+
+        Raises:
+            InvalidQueryError: If find options such as sort, skip or limit are given
+            WriteError: If the update failed
+
+        Returns:
+            UpdateResult: PyMongo result with matched, modified and upserted counts
+        """
+        cls._process_filter(kwargs, queries, "update_where")
+
+        try:
+            collection = await cls._get_collection()
+            return await collection.update_many(kwargs, cls._update_spec(update), upsert=upsert)
+        except Exception as e:
+            raise WriteError(f"Error updating documents: \n{e}")
+
+    @classmethod
+    async def find_one_and_update(
+        cls,
+        update: Dict,
+        *queries: Q,
+        upsert: bool = False,
+        return_new: bool = True,
+        sort: Optional[Union[str, List]] = None,
+        **kwargs,
+    ) -> Optional[Type[MongoDBModel]]:
+        """Atomically updates the first document matching a filter and returns it. See BaseRepository.
+
+        Args:
+            update: Update operators, or plain field values which are applied with $set
+            queries: Q objects combined with the keyword filters
+            upsert: If True, insert a document if none matches
+            return_new: If True, return the document after the update, otherwise before it
+            sort: Order in which documents are considered, see find
+            kwargs: Filter keyword arguments. Reserved name trusted works like in find.
+
+        Raises:
+            WriteError: If the update failed
+
+        Returns:
+            Optional[Type[MongoDBModel]]: The updated model, or None if no document matched
+        """
+        trusted = cls._is_trusted(kwargs.pop("trusted", None))
+        cls._process_kwargs(kwargs, queries)
+        return_document = ReturnDocument.AFTER if return_new else ReturnDocument.BEFORE
+
+        try:
+            collection = await cls._get_collection()
+            document = await collection.find_one_and_update(
+                kwargs,
+                cls._update_spec(update),
+                upsert=upsert,
+                sort=cls._sort_spec(sort) if sort is not None else None,
+                return_document=return_document,
+            )
+        except Exception as e:
+            raise WriteError(f"Error updating document: \n{e}")
+
+        return cls.Meta.model.from_mongo(document, trusted=trusted)
+
+    @classmethod
+    async def get(cls, *queries: Q, **kwargs) -> Type[MongoDBModel]:
+        """Get a unique document based on some filter. See BaseRepository.get.
+
+        Args:
+            queries: Q objects combined with the keyword filters
+            kwargs: Filter keyword arguments
+
+        Raises:
+            DoesNotExistError: If object not found
+            MultipleObjectsReturnedError: If more than one object matches filter
+
+        Returns:
+            Type[MongoDBModel]: Matching model
+        """
+        trusted = cls._is_trusted(kwargs.pop("trusted", None))
+        cls._process_kwargs(kwargs, queries)
+
+        collection = await cls._get_collection()
+        documents = await collection.find(filter=kwargs, limit=2).to_list(length=2)
+        if not documents:
+            raise DoesNotExistError("Document not found")
+        if len(documents) > 1:
+            raise MultipleObjectsReturnedError("2 or more items returned, instead of 1")
+
+        return cls.Meta.model.from_mongo(documents[0], trusted=trusted)
+
+    @classmethod
+    async def find(cls, *queries: Q, **kwargs) -> AsyncIterator[Type[MongoDBModel]]:
+        """Queries database and filters on kwargs provided. See BaseRepository.find for reserved names.
+
+        Args:
+            queries: Q objects combined with the keyword filters
+            kwargs: Filter keyword arguments
+
+        Raises:
+            InvalidQueryError: In case one or more arguments were invalid
+
+        Yields:
+            AsyncIterator[Type[MongoDBModel]]: Async generator that wraps the Motor cursor
+        """
+        trusted = cls._is_trusted(kwargs.pop("trusted", None))
+        as_ = kwargs.pop("as_", "model")
+        options = cls._cursor_options(kwargs)
+        projection, skip, limit = cls._process_kwargs(kwargs, queries)
+        convert = cls._result_converter(as_, trusted, projection)
+
+        try:
+            collection, encode = cls._result_collection(await cls._get_collection(), as_)
+            cursor = collection.find(filter=kwargs, projection=projection, skip=skip, limit=limit, **options)
+            async for result in cursor:
+                yield convert(encode(result) if encode else result)
+        except Exception as e:
+            raise InvalidQueryError(f"Invalid argument types: {e}")
+
+    @classmethod
+    async def aggregate(cls, pipeline: List[Dict], trusted: Optional[bool] = None, as_: str = "model"):
+        """Runs an aggregation pipeline on the collection. See BaseRepository.aggregate.
+
+        Args:
+            pipeline: List of aggregation stages
+            trusted: If True, skip validation when building models. Defaults to Meta.trusted_hydration.
+            as_: Result type, one of "model" (default), "dict", "tuple" or "raw_bson"
+
+        Raises:
+            InvalidQueryError: If the pipeline failed to execute
+
+        Yields:
+            AsyncIterator: Async generator of results in the requested type
+        """
+        convert = cls._result_converter(as_, cls._is_trusted(trusted))
+
+        try:
+            collection, encode = cls._result_collection(await cls._get_collection(), as_)
+            async for result in collection.aggregate(pipeline):
+                yield convert(encode(result) if encode else result)
+        except Exception as e:
+            raise InvalidQueryError(f"Error executing pipeline: {e}")
+
+    @classmethod
+    async def _bulk(
+        cls,
+        writes: Iterable[PendingWrite],
+        result: BulkWriteResult,
+        ordered: bool,
+        batch_size: int,
+        max_batch_bytes: Optional[int],
+    ) -> BulkWriteResult:
+        try:
+            collection = await cls._get_collection()
+            for batch in iter_batches(writes, batch_size, max_batch_bytes):
+                try:
+                    res = await collection.bulk_write([pending.request for pending in batch], ordered=ordered)
+                    ok = record_batch(result, batch, res, ordered=ordered)
+                except BulkWriteError as e:
+                    ok = record_batch(result, batch, error=e, ordered=ordered)
+
+                if ordered and not ok:
+                    break
+        except Exception as e:
+            raise WriteError(f"Error executing bulk write: \n{e}")
+
+        result.failures.sort(key=lambda failure: failure.index)
+        return result
+
+    @classmethod
+    async def save_many(
+        cls,
+        models: Iterable[MongoDBModel],
+        ordered: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: Optional[int] = None,
+    ) -> BulkWriteResult:
+        """Inserts many models using batched bulk writes. See BaseRepository.save_many.
+
+        Args:
+            models: Iterable of models to insert, consumed lazily
+            ordered: If True, stop at the first failing document. Otherwise attempt all documents.
+            batch_size: Maximum number of documents sent per bulk write
+            max_batch_bytes: Optional maximum encoded size of a batch
+
+        Returns:
+            BulkWriteResult: Inserted ids, counts and per-document failures
+        """
+        result = BulkWriteResult()
+        writes = model_writes(models, result, ordered, max_batch_bytes is not None, insert_request)
+        return await cls._bulk(writes, result, ordered, batch_size, max_batch_bytes)
+
+    @classmethod
+    async def update_many(
+        cls,
+        models: Iterable[MongoDBModel],
+        upsert: bool = False,
+        ordered: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: Optional[int] = None,
+    ) -> BulkWriteResult:
+        """Replaces the stored documents of many models, matched on their ids. See BaseRepository.update_many.
+
+        Args:
+            models: Iterable of models to update, consumed lazily. Every model must have an id.
+            upsert: If True, insert models whose id does not exist yet
+            ordered: If True, stop at the first failing document. Otherwise attempt all documents.
+            batch_size: Maximum number of documents sent per bulk write
+            max_batch_bytes: Optional maximum encoded size of a batch
+
+        Returns:
+            BulkWriteResult: Matched/modified counts and per-document failures
+        """
+        result = BulkWriteResult()
+        build = partial(replace_request, upsert=upsert)
+        writes = model_writes(models, result, ordered, max_batch_bytes is not None, build)
+        return await cls._bulk(writes, result, ordered, batch_size, max_batch_bytes)
+
+    @classmethod
+    async def delete_many(
+        cls, models: Iterable[MongoDBModel], ordered: bool = True, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> BulkWriteResult:
+        """Deletes the stored documents of many models, matched on their ids. See BaseRepository.delete_many.
+
+        Args:
+            models: Iterable of models to delete, consumed lazily. Every model must have an id.
+            ordered: If True, stop at the first failing document. Otherwise attempt all documents.
+            batch_size: Maximum number of documents sent per bulk write
+
+        Returns:
+            BulkWriteResult: Deleted count and per-document failures
+        """
+        result = BulkWriteResult()
+        writes = model_writes(models, result, ordered, False, delete_request)
+        return await cls._bulk(writes, result, ordered, batch_size, None)
+
+    @classmethod
+    async def bulk_write(
+        cls,
+        requests: Iterable[Any],
+        ordered: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: Optional[int] = None,
+    ) -> BulkWriteResult:
+        """Executes a stream of write requests in batches. See BaseRepository.bulk_write.
+
+        Args:
+            requests: Iterable of models to insert, or PyMongo requests (InsertOne, UpdateOne, ReplaceOne, DeleteOne..)
+            ordered: If True, stop at the first failing request. Otherwise attempt all requests.
+            batch_size: Maximum number of requests sent per bulk write
+            max_batch_bytes: Optional maximum encoded size of a batch
+
+        Returns:
+            BulkWriteResult: Counts, inserted ids of models and per-request failures
+        """
+        writes = request_writes(requests, MongoDBModel, max_batch_bytes is not None)
+        return await cls._bulk(writes, BulkWriteResult(), ordered, batch_size, max_batch_bytes)
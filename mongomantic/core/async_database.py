@@ -0,0 +1,54 @@
+# # Package # #
+from typing import Any, Optional, Union
+
+from .database import DEFAULT_CONNECTION_NAME, MongomanticClient, connect, disconnect
+
+__all__ = ["AsyncMongomanticClient"]
+
+
+class _DefaultAsyncConnection(type):
+    @property
+    def client(cls) -> Optional[Any]:
+        """Motor client of the default connection, created on first use"""
+        if DEFAULT_CONNECTION_NAME not in MongomanticClient.connections:
+            return None
+        return MongomanticClient.get_connection().async_client
+
+    @property
+    def db(cls) -> Optional[Any]:
+        """Motor database of the default connection"""
+        if DEFAULT_CONNECTION_NAME not in MongomanticClient.connections:
+            return None
+        return MongomanticClient.get_connection().async_db
+
+
+class AsyncMongomanticClient(metaclass=_DefaultAsyncConnection):
+    """Motor side of the connections registered with MongomanticClient"""
+
+    @classmethod
+    def get_database(cls, alias: str = DEFAULT_CONNECTION_NAME) -> Any:
+        return MongomanticClient.get_connection(alias).async_db
+
+
+def connect_async(
+    uri: str, database: str, mock: Union[bool, str] = False, alias: str = DEFAULT_CONNECTION_NAME, **client_options: Any
+) -> None:
+    """Sets up a named connection, like connect. Connections serve both sync and async repositories.
+
+    The Motor client is created on first use without blocking, so this can be called before or inside a running
+    event loop. Mocking wraps the in-process mongomock client of the connection behind the same awaitable interface
+    as Motor.
+
+    Args:
+        uri: MongoDB connection string
+        database: Name of the database used by repositories on this connection
+        mock: If True, or "memory", use an in-process mongomock client instead
+        alias: Name of the connection, selected by Meta.connection
+        client_options: Passed on to AsyncIOMotorClient, e.g. maxPoolSize, minPoolSize, waitQueueTimeoutMS,
+            compressors, readPreference, w or retryWrites
+    """
+    connect(uri, database, mock=mock, alias=alias, **client_options)
+
+
+def disconnect_async(alias: str = DEFAULT_CONNECTION_NAME) -> None:
+    disconnect(alias)
@@ -1,22 +1,77 @@
-from typing import Any, Dict, Iterator, List, Tuple, Type
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
 
+import os
+import threading
+import warnings
 from abc import ABCMeta
+from contextlib import nullcontext
+from functools import partial
 
-from bson import ObjectId
-from bson.objectid import InvalidId
+import bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from mongomantic.core.index import Index
+from pydantic import BaseModel
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, WriteConcern
+from pymongo.client_session import ClientSession
 from pymongo.collection import Collection
+from pymongo.results import UpdateResult
 
-from .database import MongomanticClient
+from .bulk import (
+    DEFAULT_BATCH_SIZE,
+    BulkWriteResult,
+    PendingWrite,
+    delete_request,
+    insert_request,
+    iter_batches,
+    model_writes,
+    replace_request,
+    request_writes,
+    run_batch,
+)
+from .cache import CacheBackend, cache_key
+from .change_stream import ChangeEvent, ResumeTokenStore
+from .codec import codec_options
+from .database import DEFAULT_CONNECTION_NAME, MongomanticClient, as_read_preference
 from .errors import (
     DoesNotExistError,
     FieldDoesNotExistError,
     IndexCreationError,
+    IndexWarning,
     InvalidQueryError,
     MultipleObjectsReturnedError,
     WriteError,
 )
-from .mongo_model import MongoDBModel
+from .index_sync import IndexPlan, apply_plan, plan_for
+from .instrumentation import Instrumentation, Observation
+from .mongo_model import MongoDBModel, _construct_trusted, view_projection
+from .pagination import Page, decode_token, encode_token, include_sort_keys, range_filter, with_tiebreaker
+from .parallel import run_workers, split_ranges
+from .pipeline import Pipeline
+from .query import Q, _compile_key, combine_filters, compile_filter
+from .session import after_commit, current_session
+from .transfer import FORMATS, TransferProgress, compression_for, format_for, open_file, read_documents, write_documents
+
+if TYPE_CHECKING:  # pragma: no cover
+    from concurrent.futures import Future
+
+    from .write_buffer import WriteBuffer
+
+RESULT_MODES = ("model", "dict", "tuple", "raw_bson")
+
+# What save() returns for a new model: a re-validated copy, the saved instance with its id set, or only the id
+SAVE_MODES = ("model", "instance", "id")
+
+# Reserved find() arguments passed on to the PyMongo cursor
+CURSOR_OPTIONS = ("batch_size", "sort", "hint", "max_time_ms", "no_cursor_timeout", "allow_disk_use")
+
+# Number of ranges parallel_scan splits the collection into per worker, so that uneven ranges even out
+SPLITS_PER_WORKER = 4
+
+# Number of results whose references find(prefetch_related=...) resolves per query, unless batch_size is given
+PREFETCH_SIZE = 100
+
+_RAW_BSON_OPTIONS = CodecOptions(document_class=RawBSONDocument)
 
 
 class ABRepositoryMeta(ABCMeta):
@@ -38,7 +93,154 @@ class ABRepositoryMeta(ABCMeta):
         return base_repo
 
 
-class BaseRepository(metaclass=ABRepositoryMeta):
+class RepositoryMixin:
+    """Query building and result conversion shared by synchronous and asynchronous repositories"""
+
+    @classmethod
+    def _process_kwargs(cls, kwargs: Dict, queries: Tuple[Q, ...] = ()) -> Tuple:
+        """Update keyword arguments from human readable to mongo specific
+
+        Reserved names are popped, and the remaining lookups, combined with any Q objects, are replaced in place
+        by the compiled MongoDB filter.
+        """
+        projection = kwargs.pop("projection", None)
+        skip = kwargs.pop("skip", 0)
+        limit = kwargs.pop("limit", 0)
+
+        query_filter = combine_filters(
+            [compile_filter(cls.Meta.model, kwargs)] + [query.compile(cls.Meta.model) for query in queries]
+        )
+        kwargs.clear()
+        kwargs.update(query_filter)
+
+        return projection, skip, limit
+
+    @classmethod
+    def _process_filter(cls, kwargs: Dict, queries: Tuple[Q, ...], operation: str) -> None:
+        """Like _process_kwargs, for operations taking only a filter. Rejects the find options they would ignore."""
+        ignored = [name for name in ("projection", "skip", "limit") + CURSOR_OPTIONS if name in kwargs]
+        if ignored:
+            raise InvalidQueryError(f"{operation} does not support {', '.join(ignored)}")
+        cls._process_kwargs(kwargs, queries)
+
+    @staticmethod
+    def _sort_spec(sort: Union[str, List]) -> List[Tuple[str, int]]:
+        """Converts '-field' / '+field' strings, or lists of them, to a PyMongo sort specification"""
+        if isinstance(sort, str):
+            sort = [sort]
+
+        spec = []
+        for key in sort:
+            if isinstance(key, str):
+                direction = DESCENDING if key.startswith("-") else ASCENDING
+                key = (key.lstrip("+-"), direction)
+            field, direction = key
+            spec.append(("_id" if field == "id" else field, direction))
+
+        return spec
+
+    @classmethod
+    def _cursor_options(cls, kwargs: Dict) -> Dict:
+        """Pops reserved cursor options from keyword arguments, keeping only those that were given"""
+        options = {name: kwargs.pop(name) for name in CURSOR_OPTIONS if name in kwargs}
+        if options.get("sort") is not None:
+            options["sort"] = cls._sort_spec(options["sort"])
+        if options.get("hint") is not None and not isinstance(options["hint"], str):
+            options["hint"] = cls._sort_spec(options["hint"])
+
+        return options
+
+    @classmethod
+    def _is_trusted(cls, trusted: Optional[bool]) -> bool:
+        """Resolves a per-call trusted flag against the repository default"""
+        if trusted is None:
+            return getattr(cls.Meta, "trusted_hydration", False)
+        return trusted
+
+    @staticmethod
+    def _result_collection(collection: Collection, as_: str) -> Tuple[Collection, Callable[[Any], Any]]:
+        """Returns the collection to read from and an encoder applied to every document it returns"""
+        if as_ != "raw_bson":
+            return collection, None
+
+        try:
+            return collection.with_options(codec_options=_RAW_BSON_OPTIONS), None
+        except NotImplementedError:
+            # Mongomock only decodes into dicts
+            return collection, lambda document: RawBSONDocument(bson.encode(document))
+
+    @classmethod
+    def _result_converter(
+        cls, as_: str, trusted: bool, projection: Optional[Union[List, Dict]] = None
+    ) -> Callable[[Any], Any]:
+        """Returns a function turning a raw document into the requested result type"""
+        if as_ == "model":
+            model = cls.Meta.model
+            return lambda document: model.from_mongo(document, trusted=trusted)
+
+        if as_ in ("dict", "raw_bson"):
+            return lambda document: document
+
+        if as_ == "tuple":
+            if isinstance(projection, dict):
+                projection = [key for key, included in projection.items() if included]
+            if projection:
+                fields = tuple(projection)
+                return lambda document: tuple(document.get(field) for field in fields)
+            return lambda document: tuple(document.values())
+
+        raise InvalidQueryError(f"Invalid result mode {as_}, expected one of {RESULT_MODES}")
+
+    @staticmethod
+    def _check_save_mode(as_: str):
+        if as_ not in SAVE_MODES:
+            raise ValueError(f"Invalid save mode {as_}, expected one of {SAVE_MODES}")
+
+    @classmethod
+    def _saved(cls, model: MongoDBModel, document: Dict, inserted_id: Any, as_: str) -> Any:
+        """Result of inserting a new model, in one of SAVE_MODES"""
+        if as_ == "id":
+            return inserted_id
+        if as_ == "instance":
+            model.id = inserted_id
+            model._mark_persisted()
+            return model
+
+        document["_id"] = inserted_id
+        return cls.Meta.model.from_mongo(document)
+
+    @staticmethod
+    def _update_spec(update: Dict) -> Dict:
+        """Wraps plain field values in $set, leaving update operator documents untouched"""
+        if any(key.startswith("$") for key in update):
+            return update
+        return {"$set": update}
+
+    @classmethod
+    def _configure_collection(cls, collection: Any) -> Any:
+        """Applies the model codecs, Meta.read_preference and Meta.write_concern to a PyMongo or Motor collection"""
+        try:
+            # Lets the driver encode models used as values, e.g. in update operators
+            collection = collection.with_options(
+                codec_options=codec_options([cls.Meta.model], base=collection.codec_options)
+            )
+        except NotImplementedError:
+            pass  # Mongomock does not support custom type registries
+
+        read_preference = as_read_preference(getattr(cls.Meta, "read_preference", None))
+        if read_preference is not None:
+            collection = collection.with_options(read_preference=read_preference)
+        return cls._write_concern(collection, getattr(cls.Meta, "write_concern", None))
+
+    @staticmethod
+    def _write_concern(collection: Any, options: Optional[Dict[str, Any]]) -> Any:
+        """Applies Meta.write_concern options such as {"w": 0} or {"w": "majority", "j": True} to a collection"""
+        if not options:
+            return collection
+        return collection.with_options(write_concern=WriteConcern(**options))
+
+
+class BaseRepository(RepositoryMixin, metaclass=ABRepositoryMeta):
     class Meta:
         @property
         def model(self) -> Type[MongoDBModel]:
@@ -55,6 +257,64 @@ class BaseRepository(metaclass=ABRepositoryMeta):
             """List of MongoDB indexes that should be setup for this particular model"""
             raise NotImplementedError
 
+        @property
+        def auto_create_index(self) -> bool:
+            """If True, indexes are created on first use of the collection. Disable when using sync_indexes."""
+            return True
+
+        @property
+        def trusted_hydration(self) -> bool:
+            """If True, documents read by this repository are built into models without re-validation"""
+            return False
+
+        @property
+        def connection(self) -> str:
+            """Alias of the connection to use, as passed to connect(). Defaults to 'default'."""
+            return DEFAULT_CONNECTION_NAME
+
+        @property
+        def read_preference(self) -> str:
+            """Optional read preference for this collection, e.g. 'secondaryPreferred'"""
+            return None
+
+        @property
+        def cache(self) -> CacheBackend:
+            """Optional cache for documents returned by get, invalidated by writes through this repository"""
+            return None
+
+        @property
+        def deferred_fields(self) -> List[str]:
+            """Names of fields that find and get leave out, and load on first attribute access"""
+            return []
+
+        @property
+        def references(self) -> Dict[str, Type["BaseRepository"]]:
+            """Maps fields holding ids, or lists of ids, to the repository of the documents they reference"""
+            return {}
+
+        @property
+        def instrumentation(self) -> Instrumentation:
+            """Optional collector of latency, volume and query plan statistics for get, find, aggregate and save"""
+            return None
+
+        @property
+        def resume_tokens(self) -> ResumeTokenStore:
+            """Optional store in which watch saves change stream resume tokens"""
+            return None
+
+        @property
+        def write_buffer(self) -> Dict[str, Any]:
+            """Options of the buffer used by save_buffered: max_docs, max_bytes and max_latency_ms"""
+            return {}
+
+        @property
+        def write_concern(self) -> Dict[str, Any]:
+            """Optional write concern of this collection's writes, e.g. {"w": 0} or {"w": "majority", "j": True}"""
+            return {}
+
+    # Guards the creation of write buffers, so that concurrent first calls to save_buffered share one buffer
+    _buffer_lock = threading.Lock()
+
     @classmethod
     def _get_collection(cls) -> Collection:
         """Returns a reference to the MongoDB collection, and initializes indexes if first time"""
@@ -64,7 +324,14 @@ class BaseRepository(metaclass=ABRepositoryMeta):
             if getattr(cls.Meta, "auto_create_index", True):
                 cls._create_indexes()
 
-        return MongomanticClient.db.__getattr__(cls.Meta.collection)
+        db = MongomanticClient.get_database(getattr(cls.Meta, "connection", DEFAULT_CONNECTION_NAME))
+
+        # Cache the configured collection for as long as its database is in use
+        cached = cls.__dict__.get("_collection")
+        if cached is None or cached[0] is not db:
+            cached = cls._collection = (db, cls._configure_collection(db.__getattr__(cls.Meta.collection)))
+
+        return cached[1]
 
     @classmethod
     def _create_indexes(cls):
@@ -72,50 +339,445 @@ class BaseRepository(metaclass=ABRepositoryMeta):
         if indexes:
             try:
                 pymongo_indexes = [index.to_pymongo() for index in indexes]
+                # Never in the current transaction, which cannot create indexes on existing collections
                 cls._get_collection().create_indexes(pymongo_indexes)
             except Exception as e:
                 raise IndexCreationError(f"Failed to create indexes: {e}")
 
     @classmethod
-    def _process_kwargs(cls, kwargs: Dict) -> Tuple:
-        """Update keyword arguments from human readable to mongo specific"""
-        if "id" in kwargs:
+    def plan_indexes(cls, drop: bool = True) -> IndexPlan:
+        """Compares Meta.indexes with the indexes of the collection, without changing either
+
+        Args:
+            drop: If True, plan to drop live indexes that are no longer declared
+
+        Returns:
+            IndexPlan: Indexes to create, rebuild and drop
+        """
+        cls._indexes = True  # Skip the lazy create_indexes, which would fail on any changed definition
+        return plan_for(cls._get_collection(), getattr(cls.Meta, "indexes", None), drop=drop)
+
+    @classmethod
+    def sync_indexes(
+        cls, drop: bool = True, background: bool = False, rolling: bool = False, dry_run: bool = False
+    ) -> IndexPlan:
+        """Brings the indexes of the collection in line with Meta.indexes.
+
+        Meant to run at deploy time or from a startup hook, together with `auto_create_index = False` in Meta, so
+        that no request pays for index builds. Also available as `python -m mongomantic sync-indexes`.
+
+        Args:
+            drop: If True, drop live indexes that are no longer declared
+            background: If True, build indexes in the background on servers older than 4.2
+            rolling: If True, apply changes one index at a time, building new indexes before dropping stale ones
+            dry_run: If True, only compute the plan
+
+        Raises:
+            IndexCreationError: If an index could not be dropped or built
+
+        Returns:
+            IndexPlan: The changes that were applied, or would be with dry_run
+        """
+        plan = cls.plan_indexes(drop=drop)
+        if not dry_run and not plan.is_empty:
+            apply_plan(cls._get_collection(), plan, background=background, rolling=rolling)
+
+        return plan
+
+    @classmethod
+    def _defer(cls, defer: Optional[Iterable[str]], projection: Any, as_: str) -> Tuple[Any, Tuple[str, ...]]:
+        """Returns the projection leaving out deferred fields, and their names. Explicit projections win."""
+        if defer is None:
+            defer = getattr(cls.Meta, "deferred_fields", None)
+        if not defer or projection is not None or as_ != "model":
+            return projection, ()
+
+        fields = cls.Meta.model.__fields__
+        for name in defer:
+            if name not in fields:
+                raise FieldDoesNotExistError(f"Deferred field {name} does not exist for model {cls.Meta.model}")
+
+        return {fields[name].alias: False for name in defer}, tuple(defer)
+
+    @classmethod
+    def _view_projection(cls, view: Type[MongoDBModel]) -> Dict[str, bool]:
+        """Projection of a view model, checked against the fields of Meta.model once per view"""
+        views = cls.__dict__.get("_views")
+        if views is None:
+            views = cls._views = {}
+
+        projection = views.get(view)
+        if projection is None:
+            if not (isinstance(view, type) and issubclass(view, MongoDBModel)):
+                raise InvalidQueryError(f"View {view} must be a subclass of MongoDBModel")
+
+            projection = view_projection(view)
+            aliases = {field.alias for field in cls.Meta.model.__fields__.values()}
+            for path in projection:
+                if path.split(".")[0] not in aliases:
+                    raise FieldDoesNotExistError(f"View field {path} does not exist for model {cls.Meta.model}")
+            views[view] = projection
+
+        return dict(projection)  # Drivers may add _id to the projection they are given
+
+    @classmethod
+    def _model_converter(cls, trusted: bool, deferred: Tuple[str, ...] = ()) -> Callable[[Dict], MongoDBModel]:
+        model = cls.Meta.model
+        if not deferred and not getattr(cls.Meta, "references", None):
+            return partial(model.from_mongo, trusted=trusted)
+
+        def convert(document: Dict) -> MongoDBModel:
+            instance = model.from_mongo(document, trusted=trusted, deferred=deferred)
+            instance._repository = cls  # Loads deferred fields and references on demand
+            return instance
+
+        return convert
+
+    @classmethod
+    def _load_deferred(cls, model: MongoDBModel):
+        """Fetches every deferred field of model that was not loaded yet, in one query"""
+        pending = model.unloaded_fields
+        if not pending or model.id is None:
+            return
+
+        fields = cls.Meta.model.__fields__
+        document = cls._get_collection().find_one(
+            {"_id": model.id}, projection=[fields[name].alias for name in pending], session=cls._session()
+        )
+        if document is None:
+            raise DoesNotExistError(f"Document {model.id} no longer exists")
+
+        model._load_fields(document, trusted=cls._is_trusted(None))
+
+    @classmethod
+    def _check_references(cls, fields: Optional[Iterable[str]], as_: str = "model") -> Optional[List[str]]:
+        if not fields:
+            return None
+
+        references = getattr(cls.Meta, "references", None) or {}
+        for field in fields:
+            if field not in references:
+                raise InvalidQueryError(f"Field {field} is not declared in Meta.references of {cls.__name__}")
+        if as_ != "model":
+            raise InvalidQueryError("prefetch_related requires models, as_='model'")
+
+        return list(fields)
+
+    @classmethod
+    def _resolve_references(cls, models: List[MongoDBModel], fields: Iterable[str]):
+        """Resolves references of a batch of models, with one $in query per referenced repository"""
+        references = getattr(cls.Meta, "references", None) or {}
+        by_repository: Dict[Any, List[str]] = {}
+        for field in cls._check_references(fields):
+            by_repository.setdefault(references[field], []).append(field)
+
+        for repository, repository_fields in by_repository.items():
+            ids = set()
+            for model in models:
+                for field in repository_fields:
+                    value = getattr(model, field)
+                    if isinstance(value, list):
+                        ids.update(value)
+                    elif value is not None:
+                        ids.add(value)
+
+            found = {related.id: related for related in repository.find(id__in=list(ids))} if ids else {}
+
+            for model in models:
+                if model._related is None:
+                    model._related = {}
+                for field in repository_fields:
+                    value = getattr(model, field)
+                    if isinstance(value, list):
+                        model._related[field] = [found[item] for item in value if item in found]
+                    else:
+                        model._related[field] = found.get(value)
+
+    @classmethod
+    def _prefetch(cls, models: Iterable[MongoDBModel], fields: List[str], batch_size: int) -> Iterator[MongoDBModel]:
+        batch = []
+        for model in models:
+            batch.append(model)
+            if len(batch) >= batch_size:
+                cls._resolve_references(batch, fields)
+                yield from batch
+                batch = []
+
+        if batch:
+            cls._resolve_references(batch, fields)
+            yield from batch
+
+    @classmethod
+    def _session(cls) -> Optional[ClientSession]:
+        """The session bound by transaction() or start_session(), if it belongs to this repository's connection"""
+        session = current_session()
+        if session is None or session.client is not cls._get_collection().database.client:
+            return None
+        return session
+
+    @classmethod
+    def _observe(cls, operation: str, query_filter: Any = None) -> Optional[Observation]:
+        instrumentation = getattr(cls.Meta, "instrumentation", None)
+        if instrumentation is None:
+            return None
+        return instrumentation.observe(cls.__name__, operation, query_filter)
+
+    @classmethod
+    def explain(cls, *queries: Q, **kwargs) -> Dict:
+        """Returns the server's explain output for find with the same arguments
+
+        Raises:
+            InvalidQueryError: In case one or more arguments were invalid
+        """
+        options = cls._cursor_options(kwargs)
+        projection, skip, limit = cls._process_kwargs(kwargs, queries)
+
+        try:
+            cursor = cls._get_collection().find(
+                filter=kwargs, projection=projection, skip=skip, limit=limit, session=cls._session(), **options
+            )
+            return cursor.explain()
+        except Exception as e:
+            raise InvalidQueryError(f"Could not explain query: {e}")
+
+    @classmethod
+    def _invalidate_cache(cls):
+        cache = getattr(cls.Meta, "cache", None)
+        if cache is not None:
+            namespace = cls._cache_namespace(cls._get_collection())
+            cache.invalidate(namespace)
+            session = cls._session()
+            if session is not None and session.in_transaction:
+                # Reads until the commit still see the previous documents, and may cache them again
+                after_commit(partial(cache.invalidate, namespace))
+
+    @staticmethod
+    def _cache_namespace(collection) -> str:
+        """Prefix of the cache keys of a collection, shared by every repository reading it"""
+        return f"{collection.full_name}/"
+
+    @classmethod
+    def _cache_prefix(cls, collection) -> str:
+        """Prefix of cache keys, separating repositories that share a cache backend"""
+        model = cls.Meta.model
+        connection = getattr(cls.Meta, "connection", DEFAULT_CONNECTION_NAME)
+        return f"{cls._cache_namespace(collection)}{connection}/{model.__module__}.{model.__qualname__}"
+
+    @classmethod
+    def save(cls, model, as_: str = "model") -> Any:
+        """Saves object in MongoDB
+
+        New models are inserted. Models that were loaded from, or saved to, the collection are updated in place
+        with a $set of the fields assigned since, so unchanged fields are not rewritten.
+
+        Args:
+            model: Model to save
+            as_: What to return for a new model. "model" returns a copy re-validated from the stored document,
+                "instance" returns model itself with its id set, and "id" returns only the inserted id.
+                The last two skip validating the document a second time.
+
+        Raises:
+            WriteError: If the write failed
+        """
+        cls._check_save_mode(as_)
+        with cls._observe("save") or nullcontext() as observation:
+            if model.id is not None and model.is_persisted:
+                model = cls._save_changes(model)
+                return model.id if as_ == "id" else model
+
             try:
-                oid = str(kwargs.pop("id"))
-                oid = ObjectId(oid)
-                kwargs["_id"] = oid
-            except InvalidId:
-                raise InvalidQueryError(f"Invalid ObjectId {oid}.")
+                document = model.to_mongo()
+                res = cls._get_collection().insert_one(document, session=cls._session())
+            except Exception as e:
+                raise WriteError(f"Error inserting document: \n{e}")
+            finally:
+                cls._invalidate_cache()
 
-        projection = kwargs.pop("projection", None)
-        skip = kwargs.pop("skip", 0)
-        limit = kwargs.pop("limit", 0)
+            if observation is not None:
+                observation.add(document)
 
-        for key in kwargs:
-            if key not in cls.Meta.model.__fields__:
-                raise FieldDoesNotExistError(f"Field {key} does not exist for model {cls.Meta.model}")
+            return cls._saved(model, document, res.inserted_id, as_)
 
-        return projection, skip, limit
+    @classmethod
+    def _write_buffer(cls) -> "WriteBuffer":
+        from .write_buffer import WriteBuffer, WriteBufferSettings  # Starts threads, only imported when used
+
+        buffer = cls.__dict__.get("_buffer")
+        if buffer is None or buffer.pid != os.getpid():  # The writer thread of a parent process is not inherited
+            with cls._buffer_lock:
+                buffer = cls.__dict__.get("_buffer")
+                if buffer is None or buffer.pid != os.getpid():
+                    settings = WriteBufferSettings(**(getattr(cls.Meta, "write_buffer", None) or {}))
+                    buffer = cls._buffer = WriteBuffer(cls, settings)
+        return buffer
 
     @classmethod
-    def save(cls, model) -> Type[MongoDBModel]:
-        """Saves object in MongoDB"""
+    def save_buffered(cls, model, timeout: Optional[float] = None) -> "Future":
+        """Buffers the insert of a new model, written in bulk with others by a background thread
+
+        Batches are sent once they reach Meta.write_buffer's max_docs or max_bytes, or after max_latency_ms.
+        Unlike save, the stored document is not read back into a model. Changes made to the model after this
+        call are not saved.
+
+        Args:
+            model: New model to insert. Its id is kept if set.
+            timeout: Seconds to wait for room while the buffer is full. Waits indefinitely by default.
+
+        Raises:
+            WriteError: If the model was persisted before, or the buffer stayed full until timeout
+
+        Returns:
+            Future: Resolves to the inserted id, or fails with WriteError
+        """
+        if model.is_persisted:
+            raise WriteError("save_buffered only inserts new models, use save to update persisted models")
+        return cls._write_buffer().add(model, timeout)
+
+    @classmethod
+    def flush_buffer(cls, timeout: Optional[float] = None) -> bool:
+        """Writes the documents buffered by save_buffered, and waits for them. Returns False on timeout."""
+        buffer = cls.__dict__.get("_buffer")
+        if buffer is None or buffer.pid != os.getpid():
+            return True
+        return buffer.flush(timeout)
+
+    @classmethod
+    def _save_changes(cls, model) -> Type[MongoDBModel]:
+        changed = model.changed_fields
+        if not changed:
+            return model
+
         try:
-            document = model.to_mongo()
-            res = cls._get_collection().insert_one(document)
+            res = cls._get_collection().update_one(
+                {"_id": model.id}, {"$set": model.to_mongo(include=changed)}, session=cls._session()
+            )
         except Exception as e:
-            raise WriteError(f"Error inserting document: \n{e}")
+            raise WriteError(f"Error updating document: \n{e}")
+        finally:
+            cls._invalidate_cache()
 
-        document["_id"] = res.inserted_id
-        return cls.Meta.model.from_mongo(document)
+        if res.acknowledged and not res.matched_count:
+            raise WriteError(f"Error updating document: {model.id} does not exist")
+
+        model._mark_persisted()
+        return model
 
     @classmethod
-    def get(cls, **kwargs) -> Type[MongoDBModel]:
-        """Get a unique document based on some filter.
+    def update_one(cls, update: Dict, *queries: Q, upsert: bool = False, **kwargs) -> UpdateResult:
+        """Updates the first document matching a filter, without rewriting the whole document.
 
         Args:
+            update: Update operators such as {"$set": {...}, "$inc": {...}, "$push": {...}}, or plain
+                    field values which are applied with $set
+            queries: Q objects combined with the keyword filters
+            upsert: If True, insert a document if none matches
             kwargs: Filter keyword arguments
 
+        Raises:
+            InvalidQueryError: If find options such as sort, skip or limit are given
+            WriteError: If the update failed
+
+        Returns:
+            UpdateResult: PyMongo result with matched, modified and upserted counts
+        """
+        cls._process_filter(kwargs, queries, "update_one")
+
+        try:
+            return cls._get_collection().update_one(
+                kwargs, cls._update_spec(update), upsert=upsert, session=cls._session()
+            )
+        except Exception as e:
+            raise WriteError(f"Error updating document: \n{e}")
+        finally:
+            cls._invalidate_cache()
+
+    @classmethod
+    def update_where(cls, update: Dict, *queries: Q, upsert: bool = False, **kwargs) -> UpdateResult:
+        """Updates all documents matching a filter. See update_one.
+
+        Args:
+            update: Update operators, or plain field values which are applied with $set
+            queries: Q objects combined with the keyword filters
+            upsert: If True, insert a document if none matches
+            kwargs: Filter keyword arguments
+
+        Raises:
+            InvalidQueryError: If find options such as sort, skip or limit are given
+            WriteError: If the update failed
+
+        Returns:
+            UpdateResult: PyMongo result with matched, modified and upserted counts
+        """
+        cls._process_filter(kwargs, queries, "update_where")
+
+        try:
+            return cls._get_collection().update_many(
+                kwargs, cls._update_spec(update), upsert=upsert, session=cls._session()
+            )
+        except Exception as e:
+            raise WriteError(f"Error updating documents: \n{e}")
+        finally:
+            cls._invalidate_cache()
+
+    @classmethod
+    def find_one_and_update(
+        cls,
+        update: Dict,
+        *queries: Q,
+        upsert: bool = False,
+        return_new: bool = True,
+        sort: Optional[Union[str, List]] = None,
+        **kwargs,
+    ) -> Optional[Type[MongoDBModel]]:
+        """Atomically updates the first document matching a filter and returns it.
+
+        Args:
+            update: Update operators, or plain field values which are applied with $set
+            queries: Q objects combined with the keyword filters
+            upsert: If True, insert a document if none matches
+            return_new: If True, return the document after the update, otherwise before it
+            sort: Order in which documents are considered, see find
+            kwargs: Filter keyword arguments. Reserved name trusted works like in find.
+
+        Raises:
+            WriteError: If the update failed
+
+        Returns:
+            Optional[Type[MongoDBModel]]: The updated model, or None if no document matched
+        """
+        trusted = cls._is_trusted(kwargs.pop("trusted", None))
+        cls._process_kwargs(kwargs, queries)
+        return_document = ReturnDocument.AFTER if return_new else ReturnDocument.BEFORE
+
+        try:
+            document = cls._get_collection().find_one_and_update(
+                kwargs,
+                cls._update_spec(update),
+                upsert=upsert,
+                sort=cls._sort_spec(sort) if sort is not None else None,
+                return_document=return_document,
+                session=cls._session(),
+            )
+        except Exception as e:
+            raise WriteError(f"Error updating document: \n{e}")
+        finally:
+            cls._invalidate_cache()
+
+        return cls.Meta.model.from_mongo(document, trusted=trusted)
+
+    @classmethod
+    def get(cls, *queries: Q, **kwargs) -> Type[MongoDBModel]:
+        """Get a unique document based on some filter.
+
+        Args:
+            queries: Q objects combined with the keyword filters
+            kwargs: Filter keyword arguments, optionally with lookups such as age__gte=30 or address__city="Paris"
+
+            Reserved *optional* field names:
+            trusted: if True, skip validation when building the model. Defaults to Meta.trusted_hydration.
+            defer: names of fields to load on first access instead. Defaults to Meta.deferred_fields.
+            view: model reading a subset of the fields, see find
+
         Raises:
             DoesNotExistError: If object not found
             MultipleObjectsReturnedError: If more than one object matches filter
@@ -123,26 +785,66 @@ class BaseRepository(metaclass=ABRepositoryMeta):
         Returns:
             Type[MongoDBModel]: Matching model
         """
-        cls._process_kwargs(kwargs)
+        trusted = cls._is_trusted(kwargs.pop("trusted", None))
+        defer = kwargs.pop("defer", None)
+        view = kwargs.pop("view", None)
+        cls._process_kwargs(kwargs, queries)
+        if view is not None:
+            projection, convert = cls._view_projection(view), partial(view.from_mongo, trusted=trusted)
+        else:
+            projection, deferred = cls._defer(defer, None, "model")
+            convert = cls._model_converter(trusted, deferred)
 
-        try:
-            res = cls._get_collection().find(filter=kwargs, limit=2)
-            document = next(res)
-        except StopIteration:
-            raise DoesNotExistError("Document not found")
+        with cls._observe("get", kwargs) or nullcontext() as observation:
+            session = cls._session()
+            cache = getattr(cls.Meta, "cache", None)
+            if session is not None and session.in_transaction:
+                cache = None  # Documents read in a transaction may never be committed
 
-        try:
-            next(res)
-            raise MultipleObjectsReturnedError("2 or more items returned, instead of 1")
-        except StopIteration:
-            return cls.Meta.model.from_mongo(document)
+            collection = cls._get_collection()
+            if cache is not None:
+                namespace = cls._cache_namespace(collection)
+                generation = cache.generation(namespace)
+                key = cache_key(
+                    kwargs if projection is None else {"$query": kwargs, "$projection": projection},
+                    cls._cache_prefix(collection),
+                )
+                cached = cache.get(key)
+                if cached is not None:
+                    if observation is not None:
+                        observation.cached = True
+                        observation.add(RawBSONDocument(cached))
+                    return convert(bson.decode(cached))
+
+            if observation is not None:
+                observation.instrumentation.check_plan(
+                    observation, collection, kwargs, getattr(cls.Meta, "indexes", None)
+                )
+
+            try:
+                res = collection.find(filter=kwargs, projection=projection, limit=2, session=session)
+                document = next(res)
+            except StopIteration:
+                raise DoesNotExistError("Document not found")
+
+            if observation is not None:
+                observation.add(document)
+
+            try:
+                next(res)
+                raise MultipleObjectsReturnedError("2 or more items returned, instead of 1")
+            except StopIteration:
+                if cache is not None:
+                    cache.set_if_current(key, bson.encode(document), namespace, generation)
+                return convert(document)
 
     @classmethod
-    def find(cls, **kwargs) -> Iterator[Type[MongoDBModel]]:
+    def find(cls, *queries: Q, **kwargs) -> Iterator[Type[MongoDBModel]]:
         """Queries database and filters on kwargs provided.
 
         Args:
-            kwargs: Filter keyword arguments
+            queries: Q objects combined with the keyword filters
+            kwargs: Filter keyword arguments, optionally with lookups such as age__gte=30 or address__city="Paris"
 
             Reserved *optional* field names:
             projection: can either be a list of field names that should be returned in the result set
@@ -151,6 +853,23 @@ class BaseRepository(metaclass=ABRepositoryMeta):
                         (e.g. projection={‘_id’: False}).
             skip: the number of documents to omit when returning results
             limit: the maximum number of results to return
+            sort: field name prefixed with '+' or '-', a list of them, or a PyMongo sort specification
+            batch_size: number of documents fetched from the server per round-trip
+            hint: index name or specification the query should use
+            max_time_ms: server-side time limit for the query
+            no_cursor_timeout: if True, the server will not close the cursor after 10 minutes of inactivity.
+                               Make sure to consume or close it.
+            allow_disk_use: if True, large sorts may use temporary files on the server
+            trusted: if True, skip validation when building models. Defaults to Meta.trusted_hydration.
+            as_: result type, one of "model" (default), "dict" (raw documents), "tuple" (values in
+                 projection order) or "raw_bson" (lazily decoded RawBSONDocument). Only "model" builds models.
+            defer: names of fields to load on first access instead, unless a projection is given.
+                   Defaults to Meta.deferred_fields.
+            prefetch_related: names of fields declared in Meta.references. The referenced models of every batch
+                              of results are fetched with one $in query per repository, see MongoDBModel.related.
+            view: MongoDBModel subclass declaring a subset of Meta.model's fields, with the same names, aliases
+                  and nesting. Only those fields are fetched, and results are built as the view instead of
+                  Meta.model. Replaces projection, defer and prefetch_related.
 
         Note that invalid query errors may not be detected until the generator is consumed.
         This is because the query is not executed until the result is needed.
@@ -161,20 +880,669 @@ class BaseRepository(metaclass=ABRepositoryMeta):
         Yields:
             Iterator[Type[MongoDBModel]]: Generator that wraps PyMongo cursor and transforms documents to models
         """
-        projection, skip, limit = cls._process_kwargs(kwargs)
+        trusted = cls._is_trusted(kwargs.pop("trusted", None))
+        as_ = kwargs.pop("as_", "model")
+        defer = kwargs.pop("defer", None)
+        view = kwargs.pop("view", None)
+        prefetch_related = cls._check_references(kwargs.pop("prefetch_related", None), as_)
+        options = cls._cursor_options(kwargs)
+        projection, skip, limit = cls._process_kwargs(kwargs, queries)
+        if view is not None:
+            if projection is not None or prefetch_related:
+                raise InvalidQueryError("A view cannot be combined with projection or prefetch_related")
+            projection = cls._view_projection(view)
+
+        projection, deferred = cls._defer(defer, projection, as_)
+        if view is not None and as_ == "model":
+            convert = partial(view.from_mongo, trusted=trusted)
+        elif as_ == "model":
+            convert = cls._model_converter(trusted, deferred)
+        else:
+            convert = cls._result_converter(as_, trusted, projection)
+
+        with cls._observe("find", kwargs) or nullcontext() as observation:
+            try:
+                collection, encode = cls._result_collection(cls._get_collection(), as_)
+                results = collection.find(
+                    filter=kwargs, projection=projection, skip=skip, limit=limit, session=cls._session(), **options
+                )
+                if encode:
+                    results = map(encode, results)
+
+                if observation is None:
+                    results = map(convert, results)
+                else:
+                    indexes = getattr(cls.Meta, "indexes", None)
+                    observation.instrumentation.check_plan(observation, collection, kwargs, indexes)
+                    results = observation.iterate(results, convert)
+
+                if prefetch_related:
+                    results = cls._prefetch(results, prefetch_related, options.get("batch_size") or PREFETCH_SIZE)
+                yield from results
+            except Exception as e:
+                raise InvalidQueryError(f"Invalid argument types: {e}")
+
+    @classmethod
+    def find_chunks(cls, *queries: Q, chunk_size: int = 1000, **kwargs) -> Iterator[List]:
+        """Queries like find, yielding results in lists of up to chunk_size items.
+
+        Unless given, the cursor batch size is set to chunk_size so that every chunk costs at most one round-trip.
+
+        Args:
+            queries: Q objects combined with the keyword filters
+            chunk_size: Maximum number of results per chunk
+            kwargs: Filter keyword arguments and reserved names, see find
+
+        Raises:
+            InvalidQueryError: In case one or more arguments were invalid
+
+        Yields:
+            Iterator[List]: Lists of results
+        """
+        kwargs.setdefault("batch_size", chunk_size)
+
+        chunk = []
+        for result in cls.find(*queries, **kwargs):
+            chunk.append(result)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+    @classmethod
+    def parallel_scan(
+        cls,
+        *queries: Q,
+        workers: Optional[int] = None,
+        split_by: str = "_id",
+        chunk_size: int = 500,
+        queue_size: Optional[int] = None,
+        start_method: Optional[str] = None,
+        **kwargs,
+    ) -> Iterator[Any]:
+        """Queries like find, scanning and hydrating ranges of split_by in worker processes.
+
+        Meant for full-collection jobs such as exports, where validating results on a single core is the
+        bottleneck. The range boundaries come from a $sample of split_by values, and there are several ranges
+        per worker so that uneven ranges even out. Results are yielded in no particular order.
+
+        Workers open their own client, and send results back in chunks of up to chunk_size through a queue of
+        queue_size chunks, which bounds memory when the caller consumes results more slowly than workers
+        produce them. The repository class must be importable by workers, i.e. defined at module level.
+
+        Args:
+            queries: Q objects combined with the keyword filters
+            workers: Number of worker processes, defaults to the number of CPUs. With 0, ranges are scanned in
+                     the calling process.
+            split_by: Field whose ranges are scanned in parallel, ideally indexed
+            chunk_size: Maximum number of results per chunk sent by workers
+            queue_size: Maximum number of chunks waiting to be consumed, defaults to twice the number of workers
+            start_method: Multiprocessing start method, e.g. "spawn". Defaults to the platform's.
+            kwargs: Filter keyword arguments and reserved names, see find. sort, skip and limit apply per range.
+
+        Raises:
+            InvalidQueryError: In case one or more arguments were invalid, or a worker failed
+
+        Yields:
+            Iterator[Any]: Results, as in find
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 0:
+            raise InvalidQueryError(f"Invalid number of workers: {workers}")
+
+        ranges = split_ranges(cls.Meta.model, cls._get_collection(), split_by, max(workers, 1) * SPLITS_PER_WORKER)
+
+        if workers == 0:
+            for task in ranges:
+                yield from cls.find(*queries, task, **kwargs)
+            return
+
+        alias = getattr(cls.Meta, "connection", DEFAULT_CONNECTION_NAME)
+        queue_size = queue_size or 2 * workers
+        yield from run_workers(cls, alias, ranges, queries, kwargs, workers, chunk_size, queue_size, start_method)
+
+    @classmethod
+    def _has_sort_index(cls, sort: List[Tuple[str, int]]) -> bool:
+        """True if a declared index (or the _id index) can serve the sort without an in-memory sort"""
+        keys = [(key, direction) for key, direction in sort if key != "_id"]
+        if not keys:
+            return True
+
+        inverted = [(key, -direction) for key, direction in keys]
+        for index in getattr(cls.Meta, "indexes", None) or []:
+            index_keys = list(index.to_pymongo().document["key"].items())[: len(keys)]
+            if index_keys in (keys, inverted):
+                return True
+
+        return False
+
+    @classmethod
+    def paginate(
+        cls, *queries: Q, after: Optional[str] = None, sort: Union[str, List] = "_id", page_size: int = 20, **kwargs
+    ) -> Page:
+        """Returns one page of results using keyset pagination.
+
+        Instead of skipping documents, each page starts right after the sort keys of the previous page's last
+        document, so deep pages cost the same as the first one. Ties are broken on _id. Sorting on keys that
+        are not covered by one of Meta.indexes emits an IndexWarning.
+
+        Args:
+            queries: Q objects combined with the keyword filters
+            after: Continuation token from the previous page's next_token, or None for the first page
+            sort: Field name prefixed with '+' or '-', a list of them, or a PyMongo sort specification
+            page_size: Maximum number of results in the page
+            kwargs: Filter keyword arguments. Reserved names projection, trusted, as_ and defer work like in find.
+
+        Raises:
+            InvalidQueryError: In case one or more arguments, or the token, were invalid
+
+        Returns:
+            Page: Results, and the token of the next page if there is one
+        """
+        trusted = cls._is_trusted(kwargs.pop("trusted", None))
+        as_ = kwargs.pop("as_", "model")
+        defer = kwargs.pop("defer", None)
+        sort = with_tiebreaker(cls._sort_spec(sort))
+        projection, _, _ = cls._process_kwargs(kwargs, queries)
+        projection, deferred = cls._defer(defer, projection, as_)
+        if as_ == "model":
+            convert = cls._model_converter(trusted, deferred)
+        else:
+            convert = cls._result_converter(as_, trusted, projection)
+
+        if not cls._has_sort_index(sort):
+            warnings.warn(f"{cls.__name__} paginates on {sort} without a matching index in Meta.indexes", IndexWarning)
+
+        query = kwargs
+        if after is not None:
+            after_filter = range_filter(sort, decode_token(sort, after))
+            query = {"$and": [kwargs, after_filter]} if kwargs else after_filter
 
         try:
-            results = cls._get_collection().find(filter=kwargs, projection=projection, skip=skip, limit=limit)
-            for result in results:
-                yield cls.Meta.model.from_mongo(result)
+            collection, encode = cls._result_collection(cls._get_collection(), as_)
+            projection = include_sort_keys(projection, sort)
+            cursor = collection.find(
+                filter=query, projection=projection, sort=sort, limit=page_size + 1, session=cls._session()
+            )
+            documents = list(cursor)
         except Exception as e:
             raise InvalidQueryError(f"Invalid argument types: {e}")
 
+        next_token = None
+        if len(documents) > page_size:
+            documents = documents[:page_size]
+            next_token = encode_token(sort, documents[-1])
+
+        if encode:
+            documents = map(encode, documents)
+        return Page(items=[convert(document) for document in documents], next_token=next_token)
+
+    @classmethod
+    def count(cls, *queries: Q, **kwargs) -> int:
+        """Counts matching documents on the server, without transferring them.
+
+        Args:
+            queries: Q objects combined with the keyword filters
+            kwargs: Filter keyword arguments, and optionally skip, limit, hint and max_time_ms as in find
+
+        Raises:
+            InvalidQueryError: In case one or more arguments were invalid
+
+        Returns:
+            int: Number of matching documents
+        """
+        options = cls._cursor_options(kwargs)
+        _, skip, limit = cls._process_kwargs(kwargs, queries)
+        if skip:
+            options["skip"] = skip
+        if limit:
+            options["limit"] = limit
+        if "max_time_ms" in options:
+            options["maxTimeMS"] = options.pop("max_time_ms")
+
+        try:
+            return cls._get_collection().count_documents(kwargs, session=cls._session(), **options)
+        except Exception as e:
+            raise InvalidQueryError(f"Error counting documents: {e}")
+
+    @classmethod
+    def estimated_count(cls, max_time_ms: Optional[int] = None) -> int:
+        """Number of documents in the collection, from its metadata instead of a scan.
+
+        The count may be off after an unclean shutdown or during chunk migrations, and ignores transactions.
+        """
+        options = {"maxTimeMS": max_time_ms} if max_time_ms is not None else {}
+        try:
+            return cls._get_collection().estimated_document_count(**options)
+        except Exception as e:
+            raise InvalidQueryError(f"Error counting documents: {e}")
+
     @classmethod
-    def aggregate(cls, pipeline: List[Dict]):
+    def exists(cls, *queries: Q, **kwargs) -> bool:
+        """True if any document matches. Only the _id of the first match is fetched."""
+        cls._process_kwargs(kwargs, queries)
+        try:
+            document = cls._get_collection().find_one(kwargs, projection={"_id": 1}, session=cls._session())
+        except Exception as e:
+            raise InvalidQueryError(f"Error executing query: {e}")
+        return document is not None
+
+    @classmethod
+    def distinct(cls, field: str, *queries: Q, **kwargs) -> List[Any]:
+        """Distinct values of a field among matching documents, computed on the server.
+
+        Args:
+            field: Field name, with nested fields separated by double underscores, e.g. address__city
+            queries: Q objects combined with the keyword filters
+            kwargs: Filter keyword arguments
+
+        Raises:
+            InvalidQueryError: In case one or more arguments were invalid
+
+        Returns:
+            List: Distinct values, as stored. Values of array fields are unwound.
+        """
+        path = _compile_key(cls.Meta.model, field)[0]
+        cls._process_kwargs(kwargs, queries)
         try:
-            results = cls._get_collection().aggregate(pipeline)
-            for result in results:
-                yield cls.Meta.model.from_mongo(result)
+            return cls._get_collection().distinct(path, kwargs, session=cls._session())
         except Exception as e:
-            raise InvalidQueryError(f"Error executing pipeline: {e}")
+            raise InvalidQueryError(f"Error executing query: {e}")
+
+    @classmethod
+    def _output_converter(cls, output_model: Any, trusted: bool) -> Callable[[Dict], Any]:
+        if output_model is dict:
+            return lambda document: document
+        if isinstance(output_model, type) and issubclass(output_model, MongoDBModel):
+            return partial(output_model.from_mongo, trusted=trusted)
+        if isinstance(output_model, type) and issubclass(output_model, BaseModel):
+            if trusted:
+                return partial(_construct_trusted, output_model)
+            return output_model.parse_obj
+
+        raise InvalidQueryError(f"Invalid output model {output_model}, expected a pydantic model or dict")
+
+    @classmethod
+    def aggregate(
+        cls,
+        pipeline: Union[List[Dict], Pipeline],
+        trusted: Optional[bool] = None,
+        as_: str = "model",
+        output_model: Optional[Any] = None,
+        allow_disk_use: Optional[bool] = None,
+        batch_size: Optional[int] = None,
+        max_time_ms: Optional[int] = None,
+        hint: Optional[Union[str, List]] = None,
+    ):
+        """Runs an aggregation pipeline on the collection.
+
+        Args:
+            pipeline: List of aggregation stages, or a Pipeline whose lookups are compiled against Meta.model
+            trusted: If True, skip validation when building models. Defaults to Meta.trusted_hydration.
+            as_: Result type, one of "model" (default), "dict", "tuple" or "raw_bson". See find.
+            output_model: Model class for results shaped differently from Meta.model, e.g. by $group, or dict.
+                          Overrides as_. MongoDBModel subclasses map _id to id, like find.
+            allow_disk_use: If True, stages exceeding the memory limit may use temporary files on the server
+            batch_size: Number of results fetched from the server per round-trip
+            max_time_ms: Server-side time limit for the pipeline
+            hint: Index name or specification the pipeline should use
+
+        Raises:
+            InvalidQueryError: If the pipeline failed to execute
+
+        Yields:
+            Iterator: Generator of results in the requested type
+        """
+        trusted = cls._is_trusted(trusted)
+        if output_model is not None:
+            convert = cls._output_converter(output_model, trusted)
+            as_ = "dict"
+        else:
+            convert = cls._result_converter(as_, trusted)
+
+        if isinstance(pipeline, Pipeline):
+            pipeline = pipeline.build(cls.Meta.model)
+
+        options = {"allowDiskUse": allow_disk_use, "batchSize": batch_size, "maxTimeMS": max_time_ms}
+        options = {name: value for name, value in options.items() if value is not None}
+        if hint is not None:
+            options["hint"] = hint if isinstance(hint, str) else cls._sort_spec(hint)
+
+        with cls._observe("aggregate", pipeline) or nullcontext() as observation:
+            try:
+                collection, encode = cls._result_collection(cls._get_collection(), as_)
+                results = collection.aggregate(pipeline, session=cls._session(), **options)
+                if encode:
+                    results = map(encode, results)
+
+                if observation is None:
+                    for result in results:
+                        yield convert(result)
+                else:
+                    yield from observation.iterate(results, convert)
+            except Exception as e:
+                raise InvalidQueryError(f"Error executing pipeline: {e}")
+
+    @classmethod
+    def watch(
+        cls,
+        pipeline: Optional[List[Dict]] = None,
+        batch: Optional[int] = None,
+        max_await_ms: Optional[int] = None,
+        name: Optional[str] = None,
+        token_store: Optional[ResumeTokenStore] = None,
+        resume_after: Optional[Dict] = None,
+        full_document: Optional[str] = "updateLookup",
+        trusted: Optional[bool] = None,
+    ) -> Iterator[Union[ChangeEvent, List[ChangeEvent]]]:
+        """Subscribes to changes of the collection, instead of polling it with find.
+
+        The subscription resumes after the last token saved under name in the token store, if any. Tokens are
+        saved when the consumer asks for the next event, or batch of events, so events are processed at least once.
+        Change streams require a replica set or sharded cluster.
+
+        Args:
+            pipeline: Aggregation stages filtering or reshaping change events, e.g. [{"$match": {...}}]
+            batch: If given, yield lists of up to batch events. Smaller lists are yielded when no more events arrive
+                   within max_await_ms, so events are never held back while the collection is idle.
+            max_await_ms: Maximum time the server waits for new events before returning an empty batch
+            name: Subscription name under which resume tokens are saved, defaults to the collection name
+            token_store: Store for resume tokens, defaults to Meta.resume_tokens
+            resume_after: Resume token to start after, instead of the stored one
+            full_document: "updateLookup" (default) includes the current document in update events, None leaves it
+                           out, in which case update events only carry updated_fields and removed_fields
+            trusted: If True, skip validation when building models. Defaults to Meta.trusted_hydration.
+
+        Raises:
+            InvalidQueryError: If the stream could not be opened or read
+
+        Yields:
+            ChangeEvent, or lists of them when batch is given
+        """
+        if batch is not None and batch < 1:
+            raise InvalidQueryError(f"Invalid batch size: {batch}")
+
+        store = token_store if token_store is not None else getattr(cls.Meta, "resume_tokens", None)
+        name = name or cls.Meta.collection
+        if resume_after is None and store is not None:
+            resume_after = store.load(name)
+        convert = cls._model_converter(cls._is_trusted(trusted))
+
+        try:
+            stream = cls._get_collection().watch(
+                pipeline or [],
+                full_document=full_document,
+                resume_after=resume_after,
+                max_await_time_ms=max_await_ms,
+                batch_size=batch,
+            )
+        except Exception as e:
+            raise InvalidQueryError(f"Error opening change stream: {e}")
+
+        with stream:
+            saved = resume_after
+            pending = []
+            while stream.alive:
+                try:
+                    change = stream.try_next()
+                except Exception as e:
+                    raise InvalidQueryError(f"Error reading change stream: {e}")
+
+                if change is not None:
+                    event = ChangeEvent.from_change(change, convert)
+                    if batch is None:
+                        yield event
+                    else:
+                        pending.append(event)
+
+                if pending and (change is None or len(pending) >= batch):
+                    yield pending
+                    pending = []
+
+                # Also saved when idle, as the token then moves past events the pipeline filtered out
+                token = stream.resume_token
+                if store is not None and token is not None and token != saved and not pending:
+                    store.save(name, token)
+                    saved = token
+
+    @classmethod
+    def _bulk(
+        cls,
+        writes: Iterable[PendingWrite],
+        result: BulkWriteResult,
+        ordered: bool,
+        batch_size: int,
+        max_batch_bytes: Optional[int],
+    ) -> BulkWriteResult:
+        collection = cls._get_collection()
+        session = cls._session()
+
+        try:
+            for batch in iter_batches(writes, batch_size, max_batch_bytes):
+                if not run_batch(collection, batch, ordered, result, session=session) and ordered:
+                    break
+        except Exception as e:
+            raise WriteError(f"Error executing bulk write: \n{e}")
+        finally:
+            cls._invalidate_cache()
+
+        result.failures.sort(key=lambda failure: failure.index)
+        return result
+
+    @classmethod
+    def save_many(
+        cls,
+        models: Iterable[MongoDBModel],
+        ordered: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: Optional[int] = None,
+    ) -> BulkWriteResult:
+        """Inserts many models using batched bulk writes.
+
+        Unlike save, saved models are not re-validated; the generated ids are reported in the result instead.
+
+        Args:
+            models: Iterable of models to insert, consumed lazily
+            ordered: If True, stop at the first failing document. Otherwise attempt all documents.
+            batch_size: Maximum number of documents sent per bulk write
+            max_batch_bytes: Optional maximum encoded size of a batch
+
+        Raises:
+            WriteError: If the bulk write could not be executed
+
+        Returns:
+            BulkWriteResult: Inserted ids, counts and per-document failures
+        """
+        result = BulkWriteResult()
+        writes = model_writes(models, result, ordered, max_batch_bytes is not None, insert_request)
+        return cls._bulk(writes, result, ordered, batch_size, max_batch_bytes)
+
+    @classmethod
+    def update_many(
+        cls,
+        models: Iterable[MongoDBModel],
+        upsert: bool = False,
+        ordered: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: Optional[int] = None,
+    ) -> BulkWriteResult:
+        """Replaces the stored documents of many models, matched on their ids.
+
+        Args:
+            models: Iterable of models to update, consumed lazily. Every model must have an id.
+            upsert: If True, insert models whose id does not exist yet
+            ordered: If True, stop at the first failing document. Otherwise attempt all documents.
+            batch_size: Maximum number of documents sent per bulk write
+            max_batch_bytes: Optional maximum encoded size of a batch
+
+        Raises:
+            WriteError: If the bulk write could not be executed
+
+        Returns:
+            BulkWriteResult: Matched/modified counts and per-document failures
+        """
+        result = BulkWriteResult()
+        build = partial(replace_request, upsert=upsert)
+        writes = model_writes(models, result, ordered, max_batch_bytes is not None, build)
+        return cls._bulk(writes, result, ordered, batch_size, max_batch_bytes)
+
+    @classmethod
+    def delete_many(
+        cls, models: Iterable[MongoDBModel], ordered: bool = True, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> BulkWriteResult:
+        """Deletes the stored documents of many models, matched on their ids.
+
+        Args:
+            models: Iterable of models to delete, consumed lazily. Every model must have an id.
+            ordered: If True, stop at the first failing document. Otherwise attempt all documents.
+            batch_size: Maximum number of documents sent per bulk write
+
+        Raises:
+            WriteError: If the bulk write could not be executed
+
+        Returns:
+            BulkWriteResult: Deleted count and per-document failures
+        """
+        result = BulkWriteResult()
+        writes = model_writes(models, result, ordered, False, delete_request)
+        return cls._bulk(writes, result, ordered, batch_size, None)
+
+    @classmethod
+    def bulk_write(
+        cls,
+        requests: Iterable[Any],
+        ordered: bool = True,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: Optional[int] = None,
+    ) -> BulkWriteResult:
+        """Executes a stream of write requests in batches.
+
+        Args:
+            requests: Iterable of models to insert, or PyMongo requests (InsertOne, UpdateOne, ReplaceOne, DeleteOne..)
+            ordered: If True, stop at the first failing request. Otherwise attempt all requests.
+            batch_size: Maximum number of requests sent per bulk write
+            max_batch_bytes: Optional maximum encoded size of a batch
+
+        Raises:
+            WriteError: If the bulk write could not be executed
+
+        Returns:
+            BulkWriteResult: Counts, inserted ids of models and per-request failures
+        """
+        writes = request_writes(requests, MongoDBModel, max_batch_bytes is not None)
+        return cls._bulk(writes, BulkWriteResult(), ordered, batch_size, max_batch_bytes)
+
+    @classmethod
+    def export_to(
+        cls,
+        path: str,
+        *queries: Q,
+        format: str = "bson",
+        compress: Optional[str] = None,
+        progress: Optional[Callable[[TransferProgress], None]] = None,
+        progress_every: int = DEFAULT_BATCH_SIZE,
+        **kwargs,
+    ) -> TransferProgress:
+        """Streams the models matching the query to a file, without holding them in memory.
+
+        Documents go through the model layer: they are validated as in find, unless trusted, and written as
+        the model encodes them, _id included. Deferred fields are exported unless defer is given.
+
+        Args:
+            path: File to write
+            queries: Q objects combined with the keyword filters
+            format: "bson" (concatenated documents, as written by mongodump) or "ndjson" (one JSON document per line,
+                    encoded with the model's Config.json_encoders)
+            compress: "gzip", "bz2" or "xz". Defaults to the compression matching the file suffix, e.g. ".gz".
+            progress: Function called with a TransferProgress every progress_every documents and at the end
+            progress_every: Number of documents between progress calls
+            kwargs: Filter keyword arguments and reserved names, see find
+
+        Raises:
+            InvalidQueryError: In case one or more arguments were invalid
+
+        Returns:
+            TransferProgress: Number of documents and bytes written, and throughput
+        """
+        if format not in FORMATS:
+            raise InvalidQueryError(f"Invalid format {format}, expected one of {FORMATS}")
+        try:
+            compress = compression_for(path, compress)
+        except ValueError as e:
+            raise InvalidQueryError(str(e))
+
+        kwargs.setdefault("defer", ())
+        documents = ({"_id": model.id, **model.to_mongo()} for model in cls.find(*queries, **kwargs))
+        stats = TransferProgress()
+
+        with open_file(path, "wb", compress) as file:
+            for stats in write_documents(file, documents, format, cls.Meta.model.__json_encoder__, stats):
+                if progress is not None and stats.documents % progress_every == 0:
+                    progress(stats)
+
+        if progress is not None:
+            progress(stats)
+        return stats
+
+    @classmethod
+    def import_from(
+        cls,
+        path: str,
+        format: Optional[str] = None,
+        compress: Optional[str] = None,
+        ordered: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        progress: Optional[Callable[[TransferProgress], None]] = None,
+    ) -> BulkWriteResult:
+        """Streams documents from a file written by export_to, mongodump or mongoexport into the collection.
+
+        Every document is validated into a model before being inserted with its _id, in bulk writes of batch_size
+        documents. Documents failing validation are reported as failures, like failed writes.
+
+        Args:
+            path: File to read
+            format: "bson" or "ndjson", including Extended JSON. Defaults to the format matching the file suffix.
+            compress: "gzip", "bz2" or "xz". Defaults to the compression matching the file suffix.
+            ordered: If True, stop at the first failing document. Otherwise attempt all documents.
+            batch_size: Maximum number of documents sent per bulk write
+            progress: Function called with a TransferProgress every batch_size documents read and at the end
+
+        Raises:
+            InvalidQueryError: In case one or more arguments were invalid
+            WriteError: If a bulk write could not be executed
+
+        Returns:
+            BulkWriteResult: Inserted ids, counts and per-document failures
+        """
+        try:
+            compress = compression_for(path, compress)
+        except ValueError as e:
+            raise InvalidQueryError(str(e))
+        format = format or format_for(path, compress)
+        if format not in FORMATS:
+            raise InvalidQueryError(f"Invalid format {format}, expected one of {FORMATS}")
+
+        model = cls.Meta.model
+        stats = TransferProgress()
+
+        def documents() -> Iterator[Dict]:
+            for document, size in read_documents(path, format, compress):
+                stats.documents += 1
+                stats.bytes += size
+                if progress is not None and stats.documents % batch_size == 0:
+                    progress(stats)
+                yield document
+
+        def build(document: Dict) -> Tuple:
+            # Validation also converts JSON strings back to ObjectIds and datetimes
+            return insert_request(model.from_mongo(document), keep_id=True)
+
+        result = BulkWriteResult()
+        cls._bulk(model_writes(documents(), result, ordered, False, build), result, ordered, batch_size, None)
+
+        if progress is not None:
+            progress(stats)
+        return result
@@ -0,0 +1,202 @@
+"""Batching helpers used by the BaseRepository bulk write API"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from dataclasses import dataclass, field
+
+import bson
+from bson import ObjectId
+from pymongo import DeleteOne, InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+__all__ = ["BulkWriteFailure", "BulkWriteResult", "DEFAULT_BATCH_SIZE"]
+
+# Number of operations sent to the server per bulk_write command
+DEFAULT_BATCH_SIZE = 1000
+
+
+class PendingWrite(NamedTuple):
+    position: int  # Position of the operation in the input stream
+    source: Any  # Model or raw request reported back on failure
+    request: Any  # PyMongo write request
+    size: int = 0
+    inserted_id: Any = None
+
+
+@dataclass
+class BulkWriteFailure:
+    index: int  # Position of the failed operation in the input stream
+    code: Optional[int]
+    message: str
+    operation: Any = None
+
+
+@dataclass
+class BulkWriteResult:
+    inserted_ids: List[Any] = field(default_factory=list)
+    inserted_count: int = 0
+    matched_count: int = 0
+    modified_count: int = 0
+    deleted_count: int = 0
+    upserted_ids: Dict[int, Any] = field(default_factory=dict)
+    failures: List[BulkWriteFailure] = field(default_factory=list)
+    write_concern_errors: List[Dict] = field(default_factory=list)
+
+    @property
+    def upserted_count(self) -> int:
+        return len(self.upserted_ids)
+
+    @property
+    def acknowledged(self) -> bool:
+        """True if every operation in the stream was applied"""
+        return not self.failures and not self.write_concern_errors
+
+    def merge(self, details: Dict, batch: List[PendingWrite], ordered: bool = False):
+        """Merge raw bulk API results of a single batch, mapping batch indexes to stream positions
+
+        Ordered batches stop at their first write error, so writes after it were not applied either.
+        """
+        self.inserted_count += details.get("nInserted", 0)
+        self.matched_count += details.get("nMatched", 0)
+        self.modified_count += details.get("nModified", 0)
+        self.deleted_count += details.get("nRemoved", 0)
+
+        for upserted in details.get("upserted", []):
+            self.upserted_ids[batch[upserted["index"]].position] = upserted["_id"]
+
+        failed = set()
+        for error in details.get("writeErrors", []):
+            pending = batch[error["index"]]
+            failed.add(error["index"])
+            self.failures.append(
+                BulkWriteFailure(
+                    index=pending.position,
+                    code=error.get("code"),
+                    message=error.get("errmsg", ""),
+                    operation=pending.source,
+                )
+            )
+
+        applied = min(failed) if ordered and failed else len(batch)
+        for i, pending in enumerate(batch[:applied]):
+            if pending.inserted_id is not None and i not in failed:
+                self.inserted_ids.append(pending.inserted_id)
+
+        self.write_concern_errors.extend(details.get("writeConcernErrors", []))
+
+
+def request_size(request: Any) -> int:
+    """Approximate BSON size of a PyMongo write request"""
+    size = 0
+    for attr in ("_filter", "_doc"):
+        document = getattr(request, attr, None)
+        if document:
+            size += len(bson.encode(document))
+
+    return size
+
+
+def iter_batches(
+    writes: Iterable[PendingWrite], batch_size: int, max_batch_bytes: Optional[int] = None
+) -> Iterator[List[PendingWrite]]:
+    """Splits a stream of pending writes into count- and size-bounded batches
+
+    A single write larger than max_batch_bytes is still sent, alone in its own batch.
+    """
+    batch: List[PendingWrite] = []
+    batch_bytes = 0
+
+    for pending in writes:
+        if batch and (
+            len(batch) >= batch_size or (max_batch_bytes is not None and batch_bytes + pending.size > max_batch_bytes)
+        ):
+            yield batch
+            batch, batch_bytes = [], 0
+
+        batch.append(pending)
+        batch_bytes += pending.size
+
+    if batch:
+        yield batch
+
+
+def insert_request(model, keep_id: bool = False) -> Tuple[Any, Dict, ObjectId]:
+    document = model.to_mongo()
+    document["_id"] = model.id if keep_id and model.id is not None else ObjectId()
+    return InsertOne(document), document, document["_id"]
+
+
+def replace_request(model, upsert: bool = False) -> Tuple[Any, Dict, None]:
+    if model.id is None:
+        raise ValueError("Cannot update a model without an id")
+    if model.unloaded_fields:
+        raise ValueError(f"Cannot replace a document whose deferred fields {model.unloaded_fields} were not loaded")
+
+    document = model.to_mongo()
+    return ReplaceOne({"_id": model.id}, document, upsert=upsert), document, None
+
+
+def delete_request(model) -> Tuple[Any, None, None]:
+    if model.id is None:
+        raise ValueError("Cannot delete a model without an id")
+
+    return DeleteOne({"_id": model.id}), None, None
+
+
+def model_writes(
+    models: Iterable[Any], result: BulkWriteResult, ordered: bool, sized: bool, build: Callable
+) -> Iterator[PendingWrite]:
+    """Turns models into pending writes using build(model) -> (request, document, inserted_id)
+
+    Models that cannot be turned into a request are recorded as failures without reaching the server.
+    """
+    for position, model in enumerate(models):
+        try:
+            request, document, inserted_id = build(model)
+        except (ValueError, TypeError) as e:
+            result.failures.append(BulkWriteFailure(index=position, code=None, message=str(e), operation=model))
+            if ordered:
+                return
+            continue
+
+        size = len(bson.encode(document)) if sized else 0
+        yield PendingWrite(position, model, request, size, inserted_id)
+
+
+def request_writes(requests: Iterable[Any], model_class: type, sized: bool) -> Iterator[PendingWrite]:
+    """Turns raw PyMongo requests, or models to insert, into pending writes"""
+    for position, source in enumerate(requests):
+        request, inserted_id = source, None
+        if isinstance(source, model_class):
+            request, _, inserted_id = insert_request(source)
+
+        size = request_size(request) if sized else 0
+        yield PendingWrite(position, source, request, size, inserted_id)
+
+
+def record_batch(
+    result: BulkWriteResult,
+    batch: List[PendingWrite],
+    res: Any = None,
+    error: BulkWriteError = None,
+    ordered: bool = False,
+):
+    """Records the outcome of a single batch. Returns False if any operation failed."""
+    if error is not None:
+        details = error.details
+    else:
+        details = res.bulk_api_result if res.acknowledged else {}
+
+    failures = len(result.failures)
+    result.merge(details, batch, ordered)
+    return len(result.failures) == failures
+
+
+def run_batch(collection, batch: List[PendingWrite], ordered: bool, result: BulkWriteResult, **kwargs) -> bool:
+    """Writes a single batch and records its outcome. Returns False if any operation failed."""
+    try:
+        res = collection.bulk_write([pending.request for pending in batch], ordered=ordered, **kwargs)
+    except BulkWriteError as e:
+        return record_batch(result, batch, error=e, ordered=ordered)
+
+    return record_batch(result, batch, res, ordered=ordered)
@@ -0,0 +1,150 @@
+"""Read caches for BaseRepository.get
+
+Repositories opt in by setting `cache` in their Meta to a CacheBackend instance. Entries are keyed on the
+connection, database, collection and model of the repository, and on the normalized query filter, so one backend
+can serve several repositories. They hold BSON-encoded documents, so cached values can never be mutated through a
+returned model, and shared backends (e.g. Redis or Memcached) can store them as plain bytes.
+
+Keys start with the namespace of their collection. Writes invalidate the namespace of the collection they go
+through, leaving the entries of other collections in place, and bump its generation: a lookup that read its
+document before the write is not stored afterwards. Generations are kept per process, so documents written by
+other processes may be served from a shared backend until they expire.
+"""
+
+from typing import Dict, Optional, Set
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+
+from bson import json_util
+
+__all__ = ["CacheBackend", "CacheStats", "LRUCache", "cache_key"]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class CacheBackend(ABC):
+    """Interface for repository read caches.
+
+    Implementations are responsible for counting hits, misses and evictions in `stats`. Keys are grouped in
+    namespaces, one per collection, which writes invalidate separately.
+    """
+
+    def __init__(self):
+        self.stats = CacheStats()
+        self._generations: Dict[str, int] = {}  # Bumped by invalidate
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the cached BSON document for key, or None"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes) -> None:
+        """Stores a BSON document under key"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drops all entries"""
+
+    def delete_prefix(self, prefix: str) -> None:
+        """Drops the entries whose key starts with prefix. Backends that cannot find such keys drop all entries."""
+        self.clear()
+
+    def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    def invalidate(self, namespace: str) -> None:
+        """Drops the entries of a namespace, and discards values read from it before now. Called on writes."""
+        self._generations[namespace] = self.generation(namespace) + 1
+        self.delete_prefix(namespace)
+
+    def set_if_current(self, key: str, value: bytes, namespace: str, generation: int) -> None:
+        """Stores a BSON document under key, unless its namespace was invalidated since generation was read"""
+        if generation == self.generation(namespace):
+            self.set(key, value)
+
+
+class LRUCache(CacheBackend):
+    """In-process, thread-safe cache evicting least recently used entries and entries older than ttl seconds"""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: Dict[str, tuple] = OrderedDict()  # key -> (value, expires_at, namespace)
+        self._namespaces: Dict[Optional[str], Set[str]] = defaultdict(set)  # namespace -> keys
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.stats.evictions += 1
+                self.stats.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: str, value: bytes, namespace: Optional[str] = None) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, namespace)
+            self._namespaces[namespace].add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def _remove(self, key: str):
+        _, _, namespace = self._entries.pop(key)
+        keys = self._namespaces[namespace]
+        keys.discard(key)
+        if not keys:
+            del self._namespaces[namespace]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._namespaces.clear()
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            # Keys stored by repositories are indexed by namespace, others are scanned
+            keys = list(self._namespaces.get(prefix, ()))
+            keys += [key for key in self._namespaces.get(None, ()) if key.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+
+    def invalidate(self, namespace: str) -> None:
+        with self._lock:
+            super().invalidate(namespace)
+
+    def set_if_current(self, key: str, value: bytes, namespace: str, generation: int) -> None:
+        with self._lock:
+            if generation == self.generation(namespace):
+                self.set(key, value, namespace)
+
+
+def cache_key(query_filter: Dict, namespace: str = "") -> str:
+    """Canonical string for a processed filter, independent of keyword order, prefixed with namespace"""
+    return f"{namespace}:{json_util.dumps(query_filter, sort_keys=True)}"
@@ -0,0 +1,90 @@
+"""Change stream events and resume token stores for BaseRepository.watch
+
+Resume tokens are saved once the consumer is done with an event, or a batch of events, so a consumer restarted
+with the same store continues after the last events it processed. Events may therefore be delivered more than
+once after a crash, never skipped.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from .database import DEFAULT_CONNECTION_NAME, MongomanticClient
+from .mongo_model import MongoDBModel
+
+__all__ = ["ChangeEvent", "CollectionTokenStore", "MemoryTokenStore", "ResumeTokenStore"]
+
+
+@dataclass
+class ChangeEvent:
+    """A change to one document of the collection"""
+
+    operation: str  # "insert", "update", "replace", "delete", or a collection-level event such as "drop"
+    id: Any  # _id of the changed document
+    model: Optional[MongoDBModel]  # Full document, if any. Deletes have none.
+    resume_token: Dict
+    updated_fields: Dict[str, Any] = field(default_factory=dict)
+    removed_fields: List[str] = field(default_factory=list)
+    cluster_time: Any = None
+
+    @classmethod
+    def from_change(cls, change: Dict, convert: Callable[[Dict], MongoDBModel]) -> "ChangeEvent":
+        document = change.get("fullDocument")
+        description = change.get("updateDescription") or {}
+        return cls(
+            operation=change["operationType"],
+            id=(change.get("documentKey") or {}).get("_id"),
+            model=convert(dict(document)) if document is not None else None,
+            resume_token=change["_id"],
+            updated_fields=description.get("updatedFields") or {},
+            removed_fields=description.get("removedFields") or [],
+            cluster_time=change.get("clusterTime"),
+        )
+
+
+class ResumeTokenStore(ABC):
+    """Interface for stores of change stream resume tokens, keyed on subscription name"""
+
+    @abstractmethod
+    def load(self, name: str) -> Optional[Dict]:
+        """Returns the last token saved under name, or None"""
+
+    @abstractmethod
+    def save(self, name: str, token: Dict) -> None:
+        """Replaces the token saved under name"""
+
+
+class MemoryTokenStore(ResumeTokenStore):
+    """In-process store, for tests or consumers that only need to resume after transient failures"""
+
+    def __init__(self):
+        self._tokens: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def load(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            return self._tokens.get(name)
+
+    def save(self, name: str, token: Dict) -> None:
+        with self._lock:
+            self._tokens[name] = token
+
+
+class CollectionTokenStore(ResumeTokenStore):
+    """Stores tokens in a MongoDB collection, one document per subscription name"""
+
+    def __init__(self, collection: str = "resume_tokens", connection: str = DEFAULT_CONNECTION_NAME):
+        self.collection = collection
+        self.connection = connection
+
+    def _collection(self):
+        return MongomanticClient.get_database(self.connection)[self.collection]
+
+    def load(self, name: str) -> Optional[Dict]:
+        document = self._collection().find_one({"_id": name})
+        return document["token"] if document else None
+
+    def save(self, name: str, token: Dict) -> None:
+        self._collection().replace_one({"_id": name}, {"_id": name, "token": token}, upsert=True)
@@ -0,0 +1,97 @@
+"""Per-model codecs and their PyMongo type registry
+
+Encoding and decoding follow plans computed once per model class (see `to_mongo` and trusted `from_mongo`). The
+type registry lets PyMongo encode models wherever they appear as values, e.g. in update operators:
+
+    UserRepository.update_one({"$set": {"address": Address(city="Paris")}}, id=user_id)
+
+PyMongo's type decoders only apply to BSON values, not to whole documents, so documents are turned back into
+models with ModelCodec.decode rather than by the collection.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Type
+
+from bson.codec_options import DEFAULT_CODEC_OPTIONS, CodecOptions, TypeEncoder, TypeRegistry
+from pydantic import BaseModel
+
+from .mongo_model import MongoDBModel, encode_model, encode_value
+
+__all__ = ["ModelCodec", "ModelEncoder", "codec_options", "type_registry"]
+
+
+class ModelEncoder(TypeEncoder):
+    """Encodes instances of one model class embedded in a document"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+
+    @property
+    def python_type(self) -> Type[BaseModel]:
+        return self.model
+
+    def transform_python(self, value: BaseModel) -> Dict[str, Any]:
+        return encode_model(value)
+
+
+class ModelCodec:
+    """Encoder and decoder of a MongoDBModel class
+
+    >>> from mongomantic import MongoDBModel
+    >>> class Point(MongoDBModel):
+    ...     x: int
+    ...     y: int
+    >>> codec = ModelCodec(Point)
+    >>> codec.encode(Point(x=1, y=2))
+    {'x': 1, 'y': 2}
+    >>> codec.decode({"x": 1, "y": 2})
+    Point(id=None, x=1, y=2)
+    """
+
+    def __init__(self, model: Type[MongoDBModel]):
+        self.model = model
+
+    def encode(self, instance: MongoDBModel) -> Dict[str, Any]:
+        return instance.to_mongo()
+
+    def decode(self, document: Dict[str, Any], trusted: bool = True) -> MongoDBModel:
+        """Builds a model from a stored document, without validation unless trusted is False"""
+        return self.model.from_mongo(dict(document), trusted=trusted)
+
+    def type_encoders(self) -> List[ModelEncoder]:
+        return [ModelEncoder(model) for model in _nested_models(self.model)]
+
+
+def _nested_models(model: Type[BaseModel], seen: Optional[Set[type]] = None) -> List[Type[BaseModel]]:
+    """The model and every model class its fields may hold"""
+    seen = set() if seen is None else seen
+    if model in seen:
+        return []
+    seen.add(model)
+
+    models = [model]
+    for field in model.__fields__.values():
+        for sub_field in [field] + list(field.sub_fields or []):
+            type_ = sub_field.type_
+            if isinstance(type_, type) and issubclass(type_, BaseModel):
+                models += _nested_models(type_, seen)
+
+    return models
+
+
+def _fallback_encoder(value: Any) -> Any:
+    # Subclasses and models that were not registered, e.g. values of Dict or Any fields
+    return encode_value(value) if isinstance(value, BaseModel) else value
+
+
+def type_registry(models: Iterable[Type[BaseModel]]) -> TypeRegistry:
+    encoders: Dict[type, ModelEncoder] = {}
+    for model in models:
+        for nested in _nested_models(model):
+            encoders.setdefault(nested, ModelEncoder(nested))
+
+    return TypeRegistry(list(encoders.values()), fallback_encoder=_fallback_encoder)
+
+
+def codec_options(models: Iterable[Type[BaseModel]], base: CodecOptions = DEFAULT_CODEC_OPTIONS) -> CodecOptions:
+    """Extends base codec options, e.g. a collection's, so that the given models can be encoded as values"""
+    return base.with_options(type_registry=type_registry(models))
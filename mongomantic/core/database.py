@@ -1,27 +1,191 @@
 # # Package # #
+from typing import Any, Dict, Optional, Tuple, Union
+
+import os
+import threading
+from dataclasses import dataclass, field
+
 from pymongo import MongoClient
 from pymongo.database import Database
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
+
+from .errors import ConnectionNotFoundError
+
+__all__ = ["MongomanticClient", "DEFAULT_CONNECTION_NAME"]
+
+DEFAULT_CONNECTION_NAME = "default"
 
-__all__ = ["MongomanticClient"]
 
+@dataclass
+class ConnectionSettings:
+    """Everything needed to (re)create a client, e.g. after a fork or in another process"""
 
-class MongomanticClient:
-    client: MongoClient = None
-    db: Database = None
+    uri: str
+    database: str
+    mock: Union[bool, str] = False
+    options: Dict[str, Any] = field(default_factory=dict)
 
+    def create_client(self) -> MongoClient:
+        if self.mock:
+            try:
+                import mongomock
+            except ImportError:
+                raise RuntimeError("Mongomock needs to be installed for mocking a connection")
+            if self.mock == "memory":
+                from .memory import MemoryClient
+
+                return MemoryClient(self.uri, **self.options)
+            return mongomock.MongoClient(self.uri, **self.options)
+
+        return MongoClient(self.uri, **self.options)
+
+    def create_async_client(self, mock_client: Optional[MongoClient] = None) -> Any:
+        """Motor client with the same options. Mocks wrap mock_client, so sync and async repositories share data."""
+        if self.mock:
+            from mongomantic.utils.async_mock import AsyncMockClient
+
+            return AsyncMockClient(client=mock_client)
 
-def connect(uri: str, database: str, mock: bool = False) -> None:
-    if mock:
         try:
-            import mongomock
+            from motor.motor_asyncio import AsyncIOMotorClient
         except ImportError:
-            raise RuntimeError("Mongomock needs to be installed for mocking a connection")
-        MongomanticClient.client = mongomock.MongoClient(uri)
-    else:
-        MongomanticClient.client = MongoClient(uri)
+            raise RuntimeError("Motor needs to be installed for asynchronous connections")
+        return AsyncIOMotorClient(self.uri, **self.options)
+
+
+class _Connection:
+    """Settings of a connection, and the sync and async clients created from them on first use"""
+
+    def __init__(self, settings: ConnectionSettings):
+        self.settings = settings
+        self.pid = os.getpid()
+        self._client: Optional[MongoClient] = None
+        self._db: Optional[Database] = None
+        self._async_client: Any = None  # motor.motor_asyncio.AsyncIOMotorClient
+        self._async_db: Any = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> Tuple[MongoClient, Database]:
+        with self._lock:
+            if self._client is None:
+                client = self.settings.create_client()
+                self._db = client.__getattr__(self.settings.database)
+                self._client = client
+        return self._client, self._db
+
+    def _open_async(self) -> Tuple[Any, Any]:
+        mock_client = self.client if self.settings.mock else None
+        with self._lock:
+            if self._async_client is None:
+                client = self.settings.create_async_client(mock_client)
+                self._async_db = client[self.settings.database]
+                self._async_client = client
+        return self._async_client, self._async_db
+
+    @property
+    def client(self) -> MongoClient:
+        return self._client if self._client is not None else self._open()[0]
+
+    @property
+    def db(self) -> Database:
+        return self._db if self._client is not None else self._open()[1]
+
+    @property
+    def async_client(self) -> Any:
+        return self._async_client if self._async_client is not None else self._open_async()[0]
+
+    @property
+    def async_db(self) -> Any:
+        return self._async_db if self._async_client is not None else self._open_async()[1]
+
+    def reconnect(self):
+        """Replaces a client inherited from a parent process. The parent's client must not be closed or reused."""
+        if not self.settings.mock:  # A new mock client would lose the in-memory data
+            self._client, self._db = None, None
+            self._async_client, self._async_db = None, None
+        self._lock = threading.Lock()  # May have been held by another thread of the parent
+        self.pid = os.getpid()
+
+    def close(self):
+        if self._async_client is not None:
+            self._async_client.close()
+        if self._client is not None:
+            self._client.close()
+
+
+class _DefaultConnection(type):
+    @property
+    def client(cls) -> Optional[MongoClient]:
+        """Client of the default connection, created on first use"""
+        if DEFAULT_CONNECTION_NAME not in cls.connections:
+            return None
+        return cls.get_connection().client
+
+    @property
+    def db(cls) -> Optional[Database]:
+        """Database of the default connection"""
+        if DEFAULT_CONNECTION_NAME not in cls.connections:
+            return None
+        return cls.get_connection().db
+
+
+class MongomanticClient(metaclass=_DefaultConnection):
+    connections: Dict[str, _Connection] = {}
+
+    @classmethod
+    def get_connection(cls, alias: str = DEFAULT_CONNECTION_NAME) -> _Connection:
+        try:
+            connection = cls.connections[alias]
+        except KeyError:
+            raise ConnectionNotFoundError(f"No connection named '{alias}', call connect(..., alias='{alias}') first")
+
+        if connection.pid != os.getpid():
+            connection.reconnect()
+
+        return connection
+
+    @classmethod
+    def get_database(cls, alias: str = DEFAULT_CONNECTION_NAME) -> Database:
+        return cls.get_connection(alias).db
+
+    @classmethod
+    def get_settings(cls, alias: str = DEFAULT_CONNECTION_NAME) -> ConnectionSettings:
+        return cls.get_connection(alias).settings
+
+
+def as_read_preference(read_preference: Optional[Union[str, Any]]) -> Any:
+    """Accepts read preference objects or mode names such as 'secondaryPreferred'"""
+    if isinstance(read_preference, str):
+        return make_read_preference(read_pref_mode_from_name(read_preference), None)
+    return read_preference
+
+
+def connect(
+    uri: str, database: str, mock: Union[bool, str] = False, alias: str = DEFAULT_CONNECTION_NAME, **client_options: Any
+) -> None:
+    """Sets up a named connection.
+
+    Repositories use the 'default' connection, unless their Meta sets `connection` to another alias.
+    The client is created on first use, so invalid URIs and options are reported then. A connection
+    serves both BaseRepository and AsyncBaseRepository, which use a Motor client with the same options.
+
+    Args:
+        uri: MongoDB connection string
+        database: Name of the database used by repositories on this connection
+        mock: If True, connect to an in-memory mongomock client instead. If "memory", use mongomock with real
+            indexes, which is much faster for large test fixtures
+        alias: Name of the connection
+        client_options: Passed on to MongoClient, e.g. maxPoolSize, minPoolSize, waitQueueTimeoutMS,
+            compressors, readPreference, w or retryWrites
+    """
+    if mock not in (False, True, "memory"):
+        raise ValueError(f"Unknown mock engine {mock!r}, expected True or 'memory'")
 
-    MongomanticClient.db = MongomanticClient.client.__getattr__(database)
+    settings = ConnectionSettings(uri=uri, database=database, mock=mock, options=client_options)
+    MongomanticClient.connections[alias] = _Connection(settings)
 
 
-def disconnect() -> None:
-    MongomanticClient.client.close()
+def disconnect(alias: str = DEFAULT_CONNECTION_NAME) -> None:
+    connection = MongomanticClient.connections.pop(alias, None)
+    if connection is not None:
+        connection.close()
@@ -4,6 +4,8 @@ __all__ = [
     "DoesNotExistError",
     "MultipleObjectsReturnedError",
     "FieldDoesNotExistError",
+    "ConnectionNotFoundError",
+    "IndexWarning",
 ]
 
 
@@ -33,3 +35,11 @@ class IndexCreationError(Exception):
 
 class DuplicateKeyError(Exception):
     pass
+
+
+class ConnectionNotFoundError(Exception):
+    pass
+
+
+class IndexWarning(UserWarning):
+    pass
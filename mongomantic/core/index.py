@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
@@ -32,17 +32,35 @@ class Index(BaseModel):
     # MongoDB will automatically delete documents from this collection after <int> seconds.
     # The indexed field must be a UTC datetime or the data will not expire.
     expire_after_seconds: Optional[int] = Field(
-        default=0,
+        default=None,
         description="Used to create an expiring (TTL) collection. Documents automatically deleted after <int> seconds.",
     )
 
+    partial_filter_expression: Optional[Dict[str, Any]] = Field(
+        default=None, description="If given, only index documents matching this filter, e.g. {'active': True}."
+    )
+
+    collation: Optional[Dict[str, Any]] = Field(
+        default=None, description="Collation of the index, e.g. {'locale': 'en', 'strength': 2}."
+    )
+
+    weights: Optional[Dict[str, int]] = Field(
+        default=None, description="Relative weights of the fields of a text index. Unlisted fields weigh 1."
+    )
+
+    wildcard_projection: Optional[Dict[str, int]] = Field(
+        default=None, description="Fields included in or excluded from a '$**' wildcard index."
+    )
+
     def to_pymongo(self):
         # Create pymongo index models
         pymongo_fields = []
         for field in self.fields:
             # Process prefix
             direction = ASCENDING
-            if field.startswith("-"):
+            if field == "$**" or field.endswith(".$**"):
+                pass  # Wildcard index
+            elif field.startswith("-"):
                 direction = DESCENDING
                 field = field[1:]
             elif field.startswith("+"):
@@ -53,10 +71,18 @@ class Index(BaseModel):
 
             pymongo_fields.append((field, direction))
 
+        # Options left unset are not sent, so that they match the definition MongoDB reports back
+        options = {
+            "unique": self.unique,
+            "background": self.background,
+            "sparse": self.sparse,
+            "expireAfterSeconds": self.expire_after_seconds,
+            "partialFilterExpression": self.partial_filter_expression,
+            "collation": self.collation,
+            "weights": self.weights,
+            "wildcardProjection": self.wildcard_projection,
+        }
+
         return IndexModel(
-            pymongo_fields,
-            unique=self.unique,
-            background=self.background,
-            sparse=self.sparse,
-            expireAfterSeconds=self.expire_after_seconds,
+            pymongo_fields, **{key: value for key, value in options.items() if value is not None and value is not False}
         )
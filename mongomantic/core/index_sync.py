@@ -0,0 +1,172 @@
+"""Synchronization of declared Meta.indexes with the indexes of a live collection
+
+Indexes are matched by name, then by key pattern. A declared index missing from the collection is created, one
+whose definition differs from the live index is rebuilt, and a live index that is no longer declared is dropped.
+Plans are computed without side effects, so they can be reviewed before running them at deploy time.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dataclasses import dataclass, field
+
+from pymongo import IndexModel
+from pymongo.collection import Collection
+
+from .errors import IndexCreationError
+
+__all__ = ["IndexPlan", "diff_indexes", "apply_plan"]
+
+# Options that are part of an index definition. Build options such as background are not compared.
+_DEFINITION_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression", "wildcardProjection")
+
+# Fields MongoDB stores in place of the fields of a text index
+_TEXT_KEYS = ("_fts", "_ftsx")
+
+
+@dataclass
+class IndexPlan:
+    collection: str
+    create: List[IndexModel] = field(default_factory=list)
+    drop: List[str] = field(default_factory=list)  # Names of live indexes that are no longer declared
+    rebuild: List[Tuple[str, IndexModel]] = field(default_factory=list)  # (live name, declared index)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.create or self.drop or self.rebuild)
+
+    def describe(self) -> List[str]:
+        """One human readable line per change"""
+        lines = [f"{self.collection}: create {index.document['name']}" for index in self.create]
+        lines += [f"{self.collection}: rebuild {name}" for name, _ in self.rebuild]
+        lines += [f"{self.collection}: drop {name}" for name in self.drop]
+        return lines
+
+
+def _key_pattern(document: Dict) -> Tuple[Tuple, Tuple]:
+    """(regular keys in order, sorted text fields), comparable between declared and live text indexes"""
+    regular, text = [], set()
+    if "_fts" in document["key"]:
+        text.update(document.get("weights") or {})
+
+    for key, direction in document["key"].items():
+        if key in _TEXT_KEYS:
+            continue
+        if direction == "text":
+            text.add(key)
+        else:
+            regular.append((key, direction))
+
+    return tuple(regular), tuple(sorted(text))
+
+
+def _option(document: Dict, name: str) -> Any:
+    value = document.get(name)
+    return None if value is False else value
+
+
+def _matches(declared: Dict, live: Dict) -> bool:
+    if _key_pattern(declared) != _key_pattern(live):
+        return False
+
+    if any(_option(declared, name) != _option(live, name) for name in _DEFINITION_OPTIONS):
+        return False
+
+    # MongoDB reports every collation and text weight setting, including defaults, so only compare declared ones
+    collation, live_collation = declared.get("collation"), live.get("collation")
+    if bool(collation) != bool(live_collation):
+        return False
+    if collation and any(live_collation.get(key) != value for key, value in collation.items()):
+        return False
+
+    text_fields = _key_pattern(declared)[1]
+    if text_fields:
+        weights = dict.fromkeys(text_fields, 1)
+        weights.update(declared.get("weights") or {})
+        live_weights = live.get("weights") or dict.fromkeys(text_fields, 1)
+        if weights != dict(live_weights):
+            return False
+
+    return True
+
+
+def diff_indexes(
+    collection_name: str, declared: Iterable[IndexModel], live: Iterable[Dict], drop: bool = True
+) -> IndexPlan:
+    """Plans the changes turning the live index documents, as returned by list_indexes, into the declared ones"""
+    plan = IndexPlan(collection=collection_name)
+    live_indexes = {document["name"]: dict(document) for document in live if document["name"] != "_id_"}
+    matched = set()
+
+    for index in declared:
+        document = index.document
+        name = document["name"]
+        if name not in live_indexes:
+            # The same key pattern under another name would conflict with the new index
+            name = next(
+                (
+                    live_name
+                    for live_name, live_document in live_indexes.items()
+                    if live_name not in matched and _key_pattern(live_document) == _key_pattern(document)
+                ),
+                None,
+            )
+
+        if name is None:
+            plan.create.append(index)
+            continue
+
+        matched.add(name)
+        if not _matches(document, live_indexes[name]) or name != document["name"]:
+            plan.rebuild.append((name, index))
+
+    if drop:
+        plan.drop = [name for name in live_indexes if name not in matched]
+
+    return plan
+
+
+def _build(index: IndexModel, background: bool) -> IndexModel:
+    if not background:
+        return index
+    document = dict(index.document)
+    document["background"] = True
+    return IndexModel(list(document.pop("key").items()), **document)
+
+
+def apply_plan(collection: Collection, plan: IndexPlan, background: bool = False, rolling: bool = False) -> None:
+    """Runs a plan against the collection.
+
+    By default stale and changed indexes are dropped first, and all indexes are then built with a single
+    createIndexes command, which scans the collection once. With rolling, changes are applied one index at a time:
+    new indexes are built before stale ones are dropped, so queries keep an index to use throughout. Changed
+    indexes are still dropped right before they are rebuilt, since MongoDB does not allow a second index on the
+    same key pattern, nor renaming one, so queries relying on them fall back to other plans while they build.
+
+    Raises:
+        IndexCreationError: If an index could not be dropped or built
+    """
+    try:
+        if rolling:
+            for index in plan.create:
+                collection.create_indexes([_build(index, background)])
+            for name, index in plan.rebuild:
+                collection.drop_index(name)
+                collection.create_indexes([_build(index, background)])
+            for name in plan.drop:
+                collection.drop_index(name)
+            return
+
+        for name in plan.drop + [name for name, _ in plan.rebuild]:
+            collection.drop_index(name)
+
+        indexes = plan.create + [index for _, index in plan.rebuild]
+        if indexes:
+            collection.create_indexes([_build(index, background) for index in indexes])
+    except Exception as e:
+        raise IndexCreationError(f"Failed to sync indexes of {plan.collection}: {e}")
+
+
+def plan_for(collection: Collection, indexes: Optional[Iterable[Any]], drop: bool = True) -> IndexPlan:
+    """Plans the sync of a collection with a list of Index declarations"""
+    declared = [index.to_pymongo() for index in indexes or []]
+    return diff_indexes(collection.name, declared, collection.list_indexes(), drop=drop)
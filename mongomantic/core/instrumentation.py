@@ -0,0 +1,342 @@
+"""Latency, volume and query plan instrumentation for repositories
+
+Repositories opt in by setting `instrumentation` in their Meta to an Instrumentation instance, which may be shared
+between repositories. Every get, find, aggregate and save call then produces an OperationEvent, aggregated into
+per-shape statistics and passed on to the configured sinks. A query shape is the filter with its values left out,
+so `get(email="a@b.c")` and `get(email="d@e.f")` are reported together.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import bisect
+import json
+import logging
+import threading
+import time
+import warnings
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+import bson
+from mongomantic.config import logger
+
+from .errors import IndexWarning
+
+__all__ = [
+    "CallbackSink",
+    "Histogram",
+    "Instrumentation",
+    "LoggingSink",
+    "MetricsClient",
+    "MetricsSink",
+    "OperationEvent",
+    "OperationStats",
+    "Sink",
+    "query_shape",
+]
+
+# Upper bounds of the latency buckets, in milliseconds
+DEFAULT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+@dataclass
+class OperationEvent:
+    repository: str
+    operation: str  # get, find, aggregate or save
+    shape: str
+    duration_ms: float
+    documents: int = 0
+    bytes: int = 0
+    cached: bool = False  # Served from Meta.cache
+    error: Optional[str] = None
+    plan: Optional[List[str]] = None  # Stages of the winning plan, with explain enabled
+
+    @property
+    def collscan(self) -> bool:
+        return bool(self.plan) and "COLLSCAN" in self.plan
+
+
+class Histogram:
+    """Fixed-bucket histogram, cheap enough to update on every operation"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last bucket counts values above every bound
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile, or infinity for the overflow bucket
+
+        >>> histogram = Histogram(buckets=(1, 10, 100))
+        >>> for value in (0.5, 3, 4, 50):
+        ...     histogram.observe(value)
+        >>> histogram.quantile(0.5), histogram.quantile(0.99)
+        (10, 100)
+        """
+        if not self.count:
+            return 0.0
+
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+@dataclass
+class OperationStats:
+    latency: Histogram = field(default_factory=Histogram)
+    documents: int = 0
+    bytes: int = 0
+    errors: int = 0
+
+
+class Sink(ABC):
+    """Destination of operation events"""
+
+    @abstractmethod
+    def emit(self, event: OperationEvent) -> None:
+        """Called once per operation. Must not raise."""
+
+
+class LoggingSink(Sink):
+    """Logs events through the mongomantic logger, at WARNING for operations slower than slow_ms"""
+
+    def __init__(self, level: int = logging.DEBUG, slow_ms: Optional[float] = None):
+        self.level = level
+        self.slow_ms = slow_ms
+
+    def emit(self, event: OperationEvent) -> None:
+        slow = self.slow_ms is not None and event.duration_ms >= self.slow_ms
+        level = logging.WARNING if slow or event.collscan else self.level
+        if logger.isEnabledFor(level):
+            logger.log(
+                level,
+                f"{event.repository}.{event.operation} {event.shape} took {event.duration_ms:.1f}ms, "
+                f"{event.documents} documents, {event.bytes} bytes" + (", COLLSCAN" if event.collscan else ""),
+            )
+
+
+class CallbackSink(Sink):
+    def __init__(self, callback: Callable[[OperationEvent], Any]):
+        self.callback = callback
+
+    def emit(self, event: OperationEvent) -> None:
+        self.callback(event)
+
+
+class MetricsClient(ABC):
+    """Interface to adapt a metrics library, e.g. a StatsD, Datadog or Prometheus client"""
+
+    @abstractmethod
+    def histogram(self, name: str, value: float, tags: Dict[str, str]) -> None:
+        pass
+
+    @abstractmethod
+    def increment(self, name: str, value: int, tags: Dict[str, str]) -> None:
+        pass
+
+
+class MetricsSink(Sink):
+    def __init__(self, client: MetricsClient, prefix: str = "mongomantic"):
+        self.client = client
+        self.prefix = prefix
+
+    def emit(self, event: OperationEvent) -> None:
+        tags = {"repository": event.repository, "operation": event.operation, "shape": event.shape}
+        self.client.histogram(f"{self.prefix}.duration_ms", event.duration_ms, tags)
+        self.client.increment(f"{self.prefix}.documents", event.documents, tags)
+        self.client.increment(f"{self.prefix}.bytes", event.bytes, tags)
+        if event.error is not None:
+            self.client.increment(f"{self.prefix}.errors", 1, tags)
+        if event.collscan:
+            self.client.increment(f"{self.prefix}.collscans", 1, tags)
+
+
+def _shape(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        return [_shape(item) for item in value]  # $and, $or and $nor clauses, or pipeline stages
+    return "?"
+
+
+def query_shape(query_filter: Any) -> str:
+    """Filter, or pipeline, with every value replaced by '?'
+
+    >>> query_shape({"age": {"$gte": 30}, "email": {"$in": ["a", "b"]}})
+    '{"age":{"$gte":"?"},"email":{"$in":"?"}}'
+    """
+    return json.dumps(_shape(query_filter), sort_keys=True, separators=(",", ":"))
+
+
+def document_size(document: Any) -> int:
+    raw = getattr(document, "raw", None)
+    if raw is not None:
+        return len(raw)
+    return len(bson.encode(document))
+
+
+def plan_stages(explain: Dict) -> List[str]:
+    """Stage names of the winning plan in an explain document, from the root down"""
+    planner = explain.get("queryPlanner", explain)
+    plan = planner.get("winningPlan", {})
+    plan = plan.get("queryPlan", plan)  # Slot based execution engine
+
+    stages, pending = [], [plan]
+    while pending:
+        stage = pending.pop(0)
+        if "stage" in stage:
+            stages.append(stage["stage"])
+        pending.extend(stage.get("inputStages", []))
+        if "inputStage" in stage:
+            pending.append(stage["inputStage"])
+
+    return stages
+
+
+class Observation:
+    """Measures a single operation. Reports to its Instrumentation when finished."""
+
+    def __init__(self, instrumentation: "Instrumentation", repository: str, operation: str, shape: str):
+        self.instrumentation = instrumentation
+        self.repository = repository
+        self.operation = operation
+        self.shape = shape
+        self.elapsed = 0.0
+        self.documents = 0
+        self.bytes = 0
+        self.cached = False
+        self.error: Optional[str] = None
+        self.plan: Optional[List[str]] = None
+        self._started = time.perf_counter()
+        self._finished = False
+
+    def add(self, document: Any) -> None:
+        self.documents += 1
+        self.bytes += document_size(document)
+
+    def iterate(self, results: Iterable, convert: Callable) -> Iterator:
+        """Yields converted results, timing only the work done inside the iteration, not the consumer's"""
+        self.elapsed += time.perf_counter() - self._started
+        iterator = iter(results)
+        while True:
+            started = time.perf_counter()
+            try:
+                document = next(iterator)
+            except StopIteration:
+                self.elapsed += time.perf_counter() - started
+                return
+
+            self.add(document)
+            result = convert(document)
+            self.elapsed += time.perf_counter() - started
+            yield result
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if self._finished:
+            return
+        self._finished = True
+
+        if self.elapsed == 0.0:
+            self.elapsed = time.perf_counter() - self._started
+        if error is not None and not isinstance(error, GeneratorExit):
+            self.error = repr(error)
+
+        self.instrumentation.record(
+            OperationEvent(
+                repository=self.repository,
+                operation=self.operation,
+                shape=self.shape,
+                duration_ms=self.elapsed * 1000,
+                documents=self.documents,
+                bytes=self.bytes,
+                cached=self.cached,
+                error=self.error,
+                plan=self.plan,
+            )
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.finish(exc)
+
+
+class Instrumentation:
+    """Collects per-shape statistics of repository operations and forwards events to sinks.
+
+    Args:
+        sinks: Destinations of every operation event
+        explain: If True, the first get or find of every query shape is explained, and plans scanning the whole
+                 collection are flagged with an IndexWarning
+        buckets: Upper bounds of the latency histogram buckets, in milliseconds
+    """
+
+    def __init__(self, sinks: Iterable[Sink] = (), explain: bool = False, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.sinks = list(sinks)
+        self.explain = explain
+        self.buckets = tuple(buckets)
+        self.stats: Dict[Tuple[str, str, str], OperationStats] = {}
+        self._plans: Dict[Tuple[str, str], Optional[List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, repository: str, operation: str, query_filter: Any = None) -> Observation:
+        shape = query_shape(query_filter) if query_filter is not None else ""
+        return Observation(self, repository, operation, shape)
+
+    def record(self, event: OperationEvent) -> None:
+        key = (event.repository, event.operation, event.shape)
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = OperationStats(latency=Histogram(self.buckets))
+            stats.latency.observe(event.duration_ms)
+            stats.documents += event.documents
+            stats.bytes += event.bytes
+            stats.errors += event.error is not None
+
+        for sink in self.sinks:
+            try:
+                sink.emit(event)
+            except Exception as e:
+                logger.error(f"Instrumentation sink {sink!r} failed: {e}")
+
+    def check_plan(self, observation: Observation, collection, query_filter: Dict, indexes: Iterable[Any]) -> None:
+        """Explains the query once per shape, flagging collection scans against the declared indexes"""
+        if not self.explain:
+            return
+
+        key = (observation.repository, observation.shape)
+        if key in self._plans:
+            observation.plan = self._plans[key]
+            return
+
+        try:
+            plan = plan_stages(collection.find(query_filter).explain())
+        except Exception as e:  # Explain is not supported by every server or mock
+            logger.debug(f"Could not explain {observation.shape}: {e}")
+            plan = None
+
+        self._plans[key] = observation.plan = plan
+        if plan and "COLLSCAN" in plan:
+            warnings.warn(self._collscan_message(observation, query_filter, indexes), IndexWarning)
+
+    @staticmethod
+    def _collscan_message(observation: Observation, query_filter: Dict, indexes: Iterable[Any]) -> str:
+        message = f"{observation.repository}.{observation.operation} {observation.shape} scans the whole collection"
+        fields = set(query_filter)
+        for index in indexes or []:
+            keys = list(index.to_pymongo().document["key"])
+            if keys and keys[0] in fields:
+                return f"{message}, although declared index on {keys} could serve it. Run sync_indexes()."
+
+        return f"{message}, and no index in Meta.indexes starts with one of {sorted(fields)}"
@@ -0,0 +1,446 @@
+"""In-memory engine for tests, with real indexes
+
+Mongomock answers every query with a scan of the whole collection, and checks unique indexes and TTL expiry with
+scans too, so large fixtures make test suites slow. This engine keeps mongomock's query, update and aggregation
+semantics, but maintains a hash and a sorted index for every index created on a collection, typically from a
+repository's Meta.indexes:
+
+- Equality, $in and range conditions on _id or on the first field of an index only visit the matching documents,
+  which mongomock then filters as usual. Other queries fall back to a scan.
+- Unique indexes are checked with a hash lookup, honouring sparse and partialFilterExpression.
+- TTL indexes expire documents with a range lookup instead of a scan on every read.
+
+Select it with connect(..., mock="memory").
+
+The engine hooks into private parts of mongomock (its stores, Collection._iter_documents and
+Collection._ensure_uniques), so it requires the mongomock version it was written against.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import bisect
+from datetime import datetime, timedelta
+
+import mongomock
+from bson import ObjectId
+from mongomock import DuplicateKeyError, helpers
+from mongomock.collection import Collection
+from mongomock.database import Database
+from mongomock.filtering import filter_applies
+from mongomock.store import CollectionStore, DatabaseStore, ServerStore
+
+__all__ = ["MemoryClient"]
+
+# Versions whose private API the engine relies on, see pyproject.toml
+_MONGOMOCK_VERSIONS = ((4, 1), (5, 0))
+
+# Operators whose values an index can look up. Other operators are left to mongomock's filtering.
+_RANGE_OPERATORS = {"$gt": (True, False), "$gte": (True, True), "$lt": (False, False), "$lte": (False, True)}
+
+# Index types that do not order documents by field value
+_UNORDERED_TYPES = ("text", "2d", "2dsphere", "geoHaystack")
+
+
+class _Unindexable(Exception):
+    """Raised for values the indexes do not order, such as embedded documents. Such documents are always visited."""
+
+
+def index_key(value: Any) -> Tuple:
+    """Comparable key of a value, ranked by type like MongoDB so that range conditions only match one type
+
+    >>> index_key(1) == index_key(1.0), index_key(None) < index_key(-5) < index_key("a")
+    (True, True)
+    """
+    if value is None:
+        return (1,)
+    if isinstance(value, bool):
+        return (8, value)
+    if isinstance(value, (int, float)):
+        if value != value:  # NaN
+            raise _Unindexable
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    if isinstance(value, ObjectId):
+        return (7, value.binary)
+    if isinstance(value, datetime):
+        return (9, helpers.patch_datetime_awareness_in_document(value))
+    raise _Unindexable
+
+
+def path_keys(document: Dict, path: str) -> Set[Tuple]:
+    """Keys of the values at a dotted path, one per element of arrays. Missing values are keyed as None."""
+    values = [document]
+    for part in path.split("."):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                found.append(value.get(part))
+            elif isinstance(value, list):
+                if part.isdigit():
+                    raise _Unindexable
+                found.extend(item.get(part) for item in value if isinstance(item, dict))
+            else:
+                found.append(None)
+        values = found
+
+    keys = set()
+    for value in values:
+        if isinstance(value, list):
+            if not value:
+                raise _Unindexable
+            keys.update(index_key(item) for item in value)
+        else:
+            keys.add(index_key(value))
+    return keys
+
+
+def _store_id(_id: Any) -> Any:
+    return helpers.hashdict(_id) if isinstance(_id, dict) else _id
+
+
+class _FieldIndex:
+    """Hash and sorted index on one field path"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.ids: Dict[Tuple, Set] = {}  # Key to the ids of the documents holding it
+        self.keys: List[Tuple] = []  # Distinct keys, sorted
+        self.entries: Dict[Any, Set[Tuple]] = {}  # Id to the keys the document is indexed under
+        self.unindexed: Set = set()
+
+    def add(self, _id: Any, document: Dict):
+        try:
+            keys = path_keys(document, self.path)
+        except _Unindexable:
+            self.unindexed.add(_id)
+            return
+
+        self.entries[_id] = keys
+        for key in keys:
+            ids = self.ids.get(key)
+            if ids is None:
+                ids = self.ids[key] = set()
+                bisect.insort(self.keys, key)
+            ids.add(_id)
+
+    def remove(self, _id: Any):
+        self.unindexed.discard(_id)
+        for key in self.entries.pop(_id, ()):
+            ids = self.ids[key]
+            ids.discard(_id)
+            if not ids:
+                del self.ids[key]
+                del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def equal(self, value: Any) -> Set:
+        return self.ids.get(index_key(value), set()) | self.unindexed
+
+    def range(self, lower: Any, lower_inclusive: bool, upper: Any, upper_inclusive: bool) -> Set:
+        """Ids whose keys fall between the bounds, of the type of the bounds. A missing bound is given as None."""
+        low = index_key(lower) if lower is not None else None
+        high = index_key(upper) if upper is not None else None
+        rank = (low or high)[0]
+        if rank == 1 or (high is not None and high[0] != rank):
+            raise _Unindexable  # Comparisons with null, or across types
+
+        if low is None:
+            start = bisect.bisect_left(self.keys, (rank,))
+        else:
+            start = (bisect.bisect_left if lower_inclusive else bisect.bisect_right)(self.keys, low)
+        if high is None:
+            end = bisect.bisect_left(self.keys, (rank + 1,))
+        else:
+            end = (bisect.bisect_right if upper_inclusive else bisect.bisect_left)(self.keys, high)
+
+        ids = set(self.unindexed)
+        for key in self.keys[start:end]:
+            ids |= self.ids[key]
+        return ids
+
+    def lookup(self, condition: Any) -> Optional[Set]:
+        """Superset of the ids matching a query condition, or None if the index cannot narrow it down"""
+        try:
+            if not isinstance(condition, dict):
+                if isinstance(condition, list):
+                    return None  # Whole array equality
+                return self.equal(condition)
+
+            if not condition or not all(operator.startswith("$") for operator in condition):
+                return None  # Embedded document equality
+
+            candidates = []
+            if "$eq" in condition and not isinstance(condition["$eq"], (dict, list)):
+                candidates.append(self.equal(condition["$eq"]))
+            if "$in" in condition and all(not isinstance(value, (dict, list)) for value in condition["$in"]):
+                ids = set()
+                for value in condition["$in"]:
+                    ids |= self.equal(value)
+                candidates.append(ids)
+
+            bounds = {True: (None, True), False: (None, True)}
+            for operator, (is_lower, inclusive) in _RANGE_OPERATORS.items():
+                if operator in condition:
+                    bounds[is_lower] = (condition[operator], inclusive)
+            if bounds[True][0] is not None or bounds[False][0] is not None:
+                candidates.append(self.range(*bounds[True], *bounds[False]))
+        except (_Unindexable, TypeError):
+            return None
+
+        if not candidates:
+            return None
+        return set.intersection(*candidates)
+
+
+class _UniqueKeys:
+    """Hash of the full keys of a unique index"""
+
+    def __init__(self, fields: List[str], sparse: bool, partial_filter: Optional[Dict]):
+        self.fields = fields
+        self.sparse = sparse
+        self.partial_filter = partial_filter
+        self.ids: Dict[Tuple, Set] = {}
+        self.entries: Dict[Any, Tuple] = {}
+        self.unindexed: Set = set()
+
+    def key(self, document: Dict) -> Optional[Tuple]:
+        """Full key of document, or None if the index leaves it out"""
+        if self.partial_filter is not None and not filter_applies(self.partial_filter, document):
+            return None
+
+        key = []
+        for field in self.fields:
+            keys = path_keys(document, field)
+            if len(keys) != 1:
+                raise _Unindexable  # Multikey values are checked by mongomock
+            key.append(next(iter(keys)))
+
+        if self.sparse and all(part == (1,) for part in key):
+            return None
+        return tuple(key)
+
+    def add(self, _id: Any, document: Dict):
+        try:
+            key = self.key(document)
+        except _Unindexable:
+            self.unindexed.add(_id)
+            return
+
+        if key is not None:
+            self.entries[_id] = key
+            self.ids.setdefault(key, set()).add(_id)
+
+    def remove(self, _id: Any):
+        self.unindexed.discard(_id)
+        key = self.entries.pop(_id, None)
+        if key is not None:
+            ids = self.ids[key]
+            ids.discard(_id)
+            if not ids:
+                del self.ids[key]
+
+    def is_duplicate(self, _id: Any) -> bool:
+        key = self.entries.get(_id)
+        return key is not None and len(self.ids[key]) > 1
+
+
+class _CollectionStore(CollectionStore):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._field_indexes: Dict[str, _FieldIndex] = {}
+        self._unique_keys: Dict[str, _UniqueKeys] = {}
+        self._sequence: Dict[Any, int] = {}  # Insertion order, which is the natural order of results
+        self._next_sequence = 0
+
+    def drop(self):
+        super().drop()
+        self._field_indexes, self._unique_keys, self._sequence = {}, {}, {}
+
+    def create_index(self, index_name: str, index_dict: Dict):
+        super().create_index(index_name, index_dict)
+
+        key = index_dict["key"]
+        if key[0][1] not in _UNORDERED_TYPES:
+            self._field_indexes[index_name] = index = _FieldIndex(key[0][0])
+            for _id, document in self._documents.items():
+                index.add(_id, document)
+
+        if index_dict.get("unique"):
+            self._unique_keys[index_name] = unique = _UniqueKeys(
+                [field for field, _ in key], index_dict.get("sparse", False), index_dict.get("partialFilterExpression")
+            )
+            for _id, document in self._documents.items():
+                unique.add(_id, document)
+
+    def drop_index(self, index_name: str):
+        super().drop_index(index_name)
+        self._field_indexes.pop(index_name, None)
+        self._unique_keys.pop(index_name, None)
+
+    def _indexes(self) -> Iterator[Any]:
+        yield from self._field_indexes.values()
+        yield from self._unique_keys.values()
+
+    def __setitem__(self, key: Any, val: Dict):
+        super().__setitem__(key, val)
+        self.reindex(key)
+
+    def __delitem__(self, key: Any):
+        super().__delitem__(key)
+        for index in self._indexes():
+            index.remove(key)
+        self._sequence.pop(key, None)
+
+    def reindex(self, key: Any):
+        """Updates the index entries of a document, which mongomock may have modified in place"""
+        document = self._documents[key]
+        for index in self._indexes():
+            index.remove(key)
+            index.add(key, document)
+
+        if key not in self._sequence:
+            self._sequence[key] = self._next_sequence
+            self._next_sequence += 1
+
+    def unique_violation(self, key: Any) -> Optional[bool]:
+        """True if a document breaks a unique index, or None if its values must be checked by a scan"""
+        violation = False
+        for unique in self._unique_keys.values():
+            if key in unique.unindexed:
+                return None
+            violation = violation or unique.is_duplicate(key)
+        return violation
+
+    def _remove_expired_documents(self):
+        for index_name, index in self._ttl_indexes.items():
+            field_index = self._field_indexes.get(index_name)
+            if field_index is None or len(index["key"]) > 1:
+                continue
+            try:
+                expiry = int(index["expireAfterSeconds"])
+            except ValueError:
+                continue
+
+            cutoff = mongomock.utcnow() - timedelta(seconds=expiry)
+            for _id in field_index.range(None, True, cutoff, True) - field_index.unindexed:
+                del self[_id]
+
+    def candidates(self, query_filter: Dict) -> Optional[List[Dict]]:
+        """Documents that may match the filter, in natural order, or None if no index narrows it down"""
+        best = None
+        for path, condition in _conditions(query_filter):
+            if path == "_id":
+                ids = _id_lookup(condition)
+            else:
+                indexes = [index for index in self._field_indexes.values() if index.path == path]
+                ids = indexes[0].lookup(condition) if indexes else None
+
+            if ids is not None and (best is None or len(ids) < len(best)):
+                best = ids
+
+        if best is None:
+            return None
+
+        self._remove_expired_documents()
+        with self._rwlock.reader():
+            documents = self._documents
+            found = [_id for _id in best if _id in documents]
+            found.sort(key=self._sequence.__getitem__)
+            return [documents[_id] for _id in found]
+
+
+def _conditions(query_filter: Dict) -> Iterator[Tuple[str, Any]]:
+    """Field conditions that every matching document satisfies, including those of top-level $and clauses"""
+    for key, condition in query_filter.items():
+        if key == "$and":
+            for clause in condition:
+                yield from _conditions(clause)
+        elif not key.startswith("$"):
+            yield key, condition
+
+
+def _id_lookup(condition: Any) -> Optional[Set]:
+    try:
+        if not isinstance(condition, dict):
+            return None if isinstance(condition, list) else {condition}
+        if set(condition) == {"$eq"}:
+            return {_store_id(condition["$eq"])}
+        if set(condition) == {"$in"}:
+            return {_store_id(value) for value in condition["$in"]}
+    except TypeError:  # Unhashable ids
+        return None
+    return None
+
+
+class _DatabaseStore(DatabaseStore):
+    def __getitem__(self, col_name: str) -> CollectionStore:
+        try:
+            return self._collections[col_name]
+        except KeyError:
+            collection = self._collections[col_name] = _CollectionStore(col_name)
+            return collection
+
+
+class _ServerStore(ServerStore):
+    def __getitem__(self, db_name: str) -> DatabaseStore:
+        try:
+            return self._databases[db_name]
+        except KeyError:
+            database = self._databases[db_name] = _DatabaseStore()
+            return database
+
+
+class _Collection(Collection):
+    def _iter_documents(self, filter):
+        documents = None
+        if filter and isinstance(self._store, _CollectionStore):
+            documents = self._store.candidates(filter)
+        if documents is None:
+            return super()._iter_documents(filter)
+
+        return (document for document in documents if filter_applies(filter, document))
+
+    def _ensure_uniques(self, new_data):
+        store = self._store
+        if not isinstance(store, _CollectionStore):
+            return super()._ensure_uniques(new_data)
+
+        key = _store_id(new_data["_id"])
+        store.reindex(key)  # Updates modify documents in place, then check unique indexes
+        violation = store.unique_violation(key)
+        if violation is None:
+            super()._ensure_uniques(new_data)
+        elif violation:
+            raise DuplicateKeyError("E11000 Duplicate Key Error", 11000)
+
+    def with_options(self, *args, **kwargs):
+        collection = super().with_options(*args, **kwargs)
+        if type(collection) is Collection:
+            collection.__class__ = _Collection
+        return collection
+
+
+class _Database(Database):
+    def get_collection(self, *args, **kwargs):
+        collection = super().get_collection(*args, **kwargs)
+        if type(collection) is Collection:
+            collection.__class__ = _Collection
+        return collection
+
+
+class MemoryClient(mongomock.MongoClient):
+    """Mongomock client whose collections maintain real indexes"""
+
+    def __init__(self, *args, **kwargs):
+        version = tuple(int(part) for part in mongomock.__version__.split(".")[:2])
+        if not _MONGOMOCK_VERSIONS[0] <= version < _MONGOMOCK_VERSIONS[1]:
+            raise ImportError(f"The memory engine requires mongomock>=4.1,<5, found {mongomock.__version__}")
+
+        kwargs.setdefault("_store", _ServerStore())
+        super().__init__(*args, **kwargs)
+
+    def get_database(self, *args, **kwargs):
+        database = super().get_database(*args, **kwargs)
+        if type(database) is Database:
+            database.__class__ = _Database
+        return database
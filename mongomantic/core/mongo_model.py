@@ -1,11 +1,15 @@
-from typing import Any, Dict, Optional, Type
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type
 
 from abc import ABC
 from datetime import datetime
 
 from bson import ObjectId
 from bson.objectid import InvalidId
-from pydantic import BaseConfig, BaseModel
+from pydantic import BaseConfig, BaseModel, Extra, PrivateAttr, ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import MissingError
+from pydantic.fields import SHAPE_DICT, SHAPE_LIST, SHAPE_SINGLETON, ModelField
+from pydantic.main import validate_model
 
 
 class OID:
@@ -21,10 +25,192 @@ class OID:
             raise ValueError("Invalid object ID")
 
 
+# Types that PyMongo already decodes to the exact python value pydantic would produce. Only exact matches count:
+# subclasses such as Enums or constr/conint types, and floats stored as ints, need validation to be converted.
+_BSON_NATIVE_TYPES = (str, int, bool, bytes, datetime, ObjectId, OID, dict, list)
+
+# How a stored field value is turned into a model attribute during trusted hydration
+_AS_IS, _MODEL, _MODEL_LIST, _VALIDATE = range(4)
+
+
+def _hydration_kind(field: ModelField) -> int:
+    if field.sub_fields and field.shape == SHAPE_SINGLETON:
+        return _VALIDATE  # Unions and other composite types
+
+    type_ = field.type_
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        if field.shape == SHAPE_SINGLETON:
+            return _MODEL
+        if field.shape == SHAPE_LIST:
+            return _MODEL_LIST
+        return _VALIDATE
+
+    if type_ is Any or type_ in _BSON_NATIVE_TYPES:
+        if field.shape in (SHAPE_SINGLETON, SHAPE_LIST, SHAPE_DICT):
+            return _AS_IS
+
+    return _VALIDATE
+
+
+def _hydration_plan(model: Type[BaseModel]) -> List[Tuple[str, str, ModelField, int]]:
+    """Per-model list of (alias, name, field, kind), computed once per class"""
+    plan = model.__dict__.get("__hydration_plan__")
+    if plan is None:
+        plan = [(field.alias, name, field, _hydration_kind(field)) for name, field in model.__fields__.items()]
+        setattr(model, "__hydration_plan__", plan)
+
+    return plan
+
+
+def _construct_trusted(model: Type[BaseModel], data: Dict[str, Any]) -> BaseModel:
+    """Builds a model from stored data, skipping validation of fields PyMongo already decoded faithfully"""
+    values = {}
+    for alias, name, field, kind in _hydration_plan(model):
+        if alias in data:
+            value = data[alias]
+        elif name in data:
+            value = data[name]
+        else:
+            if not field.required:
+                values[name] = field.get_default()
+            continue
+
+        if value is None or kind == _AS_IS:
+            values[name] = value
+        elif kind == _MODEL:
+            values[name] = _construct_trusted(field.type_, value)
+        elif kind == _MODEL_LIST:
+            values[name] = [_construct_trusted(field.type_, v) for v in value]
+        else:
+            value, errors = field.validate(value, values, loc=name, cls=model)
+            if errors:
+                raise ValidationError([errors], model)
+            values[name] = value
+
+    return _new_instance(model, values, set(values))
+
+
+def _new_instance(model: Type[BaseModel], values: Dict[str, Any], fields_set: Set[str]) -> BaseModel:
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__fields_set__", fields_set)
+    instance._init_private_attributes()
+    return instance
+
+
+def _validate_partial(model: Type[BaseModel], data: Dict[str, Any], deferred: Iterable[str]) -> BaseModel:
+    """Validates data into a model, allowing the deferred fields to be missing"""
+    values, fields_set, error = validate_model(model, data)
+    if error is not None:
+        deferred = set(deferred)
+        errors = [
+            wrapper
+            for wrapper in error.raw_errors
+            if not (
+                isinstance(wrapper, ErrorWrapper)
+                and isinstance(wrapper.exc, MissingError)
+                and wrapper.loc_tuple()[0] in deferred
+            )
+        ]
+        if errors:
+            raise ValidationError(errors, model)
+
+    return _new_instance(model, values, fields_set)
+
+
+# How a field value is turned into a BSON-ready value by to_mongo
+_ENCODE_AS_IS, _ENCODE_LIST, _ENCODE_MODEL, _ENCODE_MODEL_LIST, _ENCODE_GENERIC = range(5)
+
+# Immutable types that BSON encodes natively, and that dict() returns unchanged
+_BSON_SCALAR_TYPES = (str, int, float, bool, bytes, datetime, ObjectId, OID)
+
+
+def _encoding_kind(field: ModelField) -> int:
+    if field.sub_fields and field.shape == SHAPE_SINGLETON:
+        return _ENCODE_GENERIC  # Unions and other composite types
+
+    type_ = field.type_
+    if not isinstance(type_, type):
+        return _ENCODE_GENERIC
+
+    if issubclass(type_, BaseModel):
+        if field.shape == SHAPE_SINGLETON:
+            return _ENCODE_MODEL
+        if field.shape == SHAPE_LIST:
+            return _ENCODE_MODEL_LIST
+    elif issubclass(type_, _BSON_SCALAR_TYPES):
+        if field.shape == SHAPE_SINGLETON:
+            return _ENCODE_AS_IS
+        if field.shape == SHAPE_LIST:
+            return _ENCODE_LIST
+
+    return _ENCODE_GENERIC
+
+
+def _encoding_plan(model: Type[BaseModel]) -> Optional[List[Tuple[str, str, int]]]:
+    """Per-model list of (name, alias, kind), computed once per class. None if dict() must be used instead."""
+    try:
+        return model.__dict__["__encoding_plan__"]
+    except KeyError:
+        pass
+
+    plan = None
+    if model.__config__.extra != Extra.allow:  # Extra attributes are only known to dict()
+        plan = [(name, field.alias, _encoding_kind(field)) for name, field in model.__fields__.items()]
+    setattr(model, "__encoding_plan__", plan)
+    return plan
+
+
+def encode_value(value: Any) -> Any:
+    """Converts models nested in a value to dictionaries keyed by alias, like BaseModel.dict(by_alias=True)"""
+    if isinstance(value, BaseModel):
+        return encode_model(value)
+    if isinstance(value, dict):
+        return {key: encode_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return value.__class__(encode_value(item) for item in value)
+    return value
+
+
+def encode_model(instance: BaseModel) -> Dict[str, Any]:
+    """Maps a model to a dictionary keyed by alias, equivalent to dict(by_alias=True)"""
+    plan = _encoding_plan(type(instance))
+    if plan is None:
+        return instance.dict(by_alias=True)
+
+    values = instance.__dict__
+    document = {}
+    for name, alias, kind in plan:
+        if name not in values:
+            continue
+
+        value = values[name]
+        if value is None or kind == _ENCODE_AS_IS:
+            document[alias] = value
+        elif kind == _ENCODE_LIST:
+            document[alias] = list(value)
+        elif kind == _ENCODE_MODEL:
+            document[alias] = encode_model(value)
+        elif kind == _ENCODE_MODEL_LIST:
+            document[alias] = [encode_model(item) for item in value]
+        else:
+            document[alias] = encode_value(value)
+
+    return document
+
+
 class MongoDBModel(BaseModel, ABC):
 
     id: Optional[OID]
 
+    # Dirty tracking: fields assigned since the model was loaded from or written to MongoDB
+    _persisted: bool = PrivateAttr(default=False)
+    _changed: Set[str] = PrivateAttr(default_factory=set)
+
+    # Repository the model was loaded through, which loads deferred fields and referenced models on demand
+    _repository: Any = PrivateAttr(default=None)
+    _related: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+
     class Config(BaseConfig):
         allow_population_by_field_name = True
         json_encoders = {
@@ -33,16 +219,125 @@ class MongoDBModel(BaseModel, ABC):
         }
 
     @classmethod
-    def from_mongo(cls, data: Dict[str, Any]) -> Optional[Type["MongoDBModel"]]:
-        """Constructs a pydantic object from mongodb compatible dictionary"""
+    def from_mongo(
+        cls, data: Dict[str, Any], trusted: bool = False, deferred: Iterable[str] = ()
+    ) -> Optional[Type["MongoDBModel"]]:
+        """Constructs a pydantic object from mongodb compatible dictionary
+
+        If trusted, data is assumed to have been stored through the ORM, and validation is skipped for fields
+        whose stored values already have the right type. Nested models are built the same way.
+
+        Deferred fields missing from data are left unset, instead of failing validation or taking their default.
+        """
         if not data:
             return None
 
-        id = data.pop("_id", None)  # Convert _id into id
-        return cls(**dict(data, id=id))
+        data = dict(data)  # Leaves the caller's document unchanged
+        data["id"] = data.pop("_id", None)  # Convert _id into id
+        if trusted:
+            model = _construct_trusted(cls, data)
+        elif deferred:
+            model = _validate_partial(cls, data, deferred)
+        else:
+            model = cls(**data)
+
+        for name in deferred:
+            field = cls.__fields__[name]
+            if field.alias not in data and name not in data:
+                model.__dict__.pop(name, None)
+                model.__fields_set__.discard(name)
+
+        model._mark_persisted()
+        return model
+
+    def __getattr__(self, name):
+        # Only reached for attributes that are not set, such as deferred fields that were not loaded yet
+        if name in self.__fields__ and self._repository is not None:
+            self._repository._load_deferred(self)
+            if name in self.__dict__:
+                return self.__dict__[name]
+
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    @property
+    def unloaded_fields(self) -> Set[str]:
+        """Deferred fields that were not loaded yet"""
+        return {name for name in self.__fields__ if name not in self.__dict__}
+
+    def _load_fields(self, document: Dict[str, Any], trusted: bool = False):
+        """Sets the unloaded fields found in a stored document, without marking them as changed"""
+        for alias, name, field, kind in _hydration_plan(type(self)):
+            if name in self.__dict__ or (alias not in document and name not in document):
+                continue
+
+            value = document[alias] if alias in document else document[name]
+            if trusted and kind == _MODEL and value is not None:
+                value = _construct_trusted(field.type_, value)
+            elif trusted and kind == _MODEL_LIST and value is not None:
+                value = [_construct_trusted(field.type_, v) for v in value]
+            elif not trusted or kind == _VALIDATE:
+                value, errors = field.validate(value, self.__dict__, loc=name, cls=type(self))
+                if errors:
+                    raise ValidationError([errors], type(self))
+
+            self.__dict__[name] = value
+            self.__fields_set__.add(name)
+
+    def related(self, field: str) -> Any:
+        """Model, or list of models, referenced by field, as declared in the repository's Meta.references
+
+        References are resolved for whole result batches by find(prefetch_related=[...]). Otherwise, they are
+        fetched on first access.
+        """
+        if self._related is None or field not in self._related:
+            if self._repository is None:
+                raise ValueError(f"{type(self).__name__} was not loaded through a repository")
+            self._repository._resolve_references([self], [field])
+
+        return self._related[field]
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.__fields__:
+            self._changed.add(name)
+
+    def _copy_and_set_values(self, values: Dict[str, Any], fields_set: Set[str], *, deep: bool) -> "MongoDBModel":
+        # Private attributes are copied shallowly, so copies would otherwise share their set of changed fields
+        model = super()._copy_and_set_values(values, fields_set, deep=deep)
+        object.__setattr__(model, "_changed", set(self._changed))
+        return model
+
+    def _mark_persisted(self):
+        """Marks the model as in sync with its stored document"""
+        self._persisted = True
+        self._changed.clear()
+
+    @property
+    def is_persisted(self) -> bool:
+        """True if the model was loaded from, or saved to, MongoDB"""
+        return self._persisted
+
+    @property
+    def changed_fields(self) -> Set[str]:
+        """Fields assigned since the model was loaded or saved"""
+        return set(self._changed)
+
+    def mark_changed(self, *fields: str):
+        """Flags fields as changed, e.g. after mutating a nested model or list in place"""
+        for field in fields:
+            if field not in self.__fields__:
+                raise ValueError(f"Field {field} does not exist for model {type(self)}")
+        self._changed.update(fields)
 
     def to_mongo(self, **kwargs):
-        """Maps a pydantic model to a mongodb compatible dictionary"""
+        """Maps a pydantic model to a mongodb compatible dictionary
+
+        Without arguments, the model is encoded with a plan computed once per class instead of going through dict().
+        """
+        if not kwargs:
+            document = encode_model(self)
+            document.pop("id", None)
+            return document
 
         exclude_unset = kwargs.pop(
             "exclude_unset",
@@ -70,3 +365,45 @@ class MongoDBModel(BaseModel, ABC):
         hidden_fields = {"_collection"}
         kwargs.setdefault("exclude", hidden_fields)
         return super().dict(**kwargs)
+
+
+def _view_paths(model: Type[BaseModel], prefix: str, seen: Tuple[type, ...]) -> Iterator[str]:
+    for name, field in model.__fields__.items():
+        if not prefix and name == "id" and issubclass(model, MongoDBModel):
+            continue  # _id is always returned
+
+        path = prefix + field.alias
+        type_ = field.type_
+        if (
+            isinstance(type_, type)
+            and issubclass(type_, BaseModel)
+            and not field.sub_fields
+            and field.shape in (SHAPE_SINGLETON, SHAPE_LIST)
+            and type_.__config__.extra != Extra.allow
+            and type_ not in seen
+        ):
+            yield from _view_paths(type_, path + ".", seen + (type_,))
+        else:
+            yield path
+
+
+def view_projection(view: Type[BaseModel]) -> Dict[str, bool]:
+    """Projection of the stored fields a view model reads, computed once per class
+
+    Fields holding models are narrowed down to the fields of those models, unless they accept extra fields.
+
+    >>> from pydantic import Field
+    >>> class Address(BaseModel):
+    ...     city: str
+    >>> class UserSummary(MongoDBModel):
+    ...     name: str = Field(alias="full_name")
+    ...     address: Address
+    >>> view_projection(UserSummary)
+    {'full_name': True, 'address.city': True}
+    """
+    projection = view.__dict__.get("__view_projection__")
+    if projection is None:
+        projection = {path: True for path in _view_paths(view, "", (view,))}
+        setattr(view, "__view_projection__", projection)
+
+    return projection
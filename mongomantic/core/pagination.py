@@ -0,0 +1,101 @@
+"""Keyset pagination helpers
+
+Pages are fetched with a range filter on the sort keys of the last returned document, instead of skip, so
+every page costs the same index walk regardless of depth.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import base64
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+from bson import json_util
+from pymongo import ASCENDING
+
+from .errors import InvalidQueryError
+
+__all__ = ["Page"]
+
+
+@dataclass
+class Page:
+    items: List[Any] = field(default_factory=list)
+    next_token: Optional[str] = None  # Opaque token to pass as `after` for the next page
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_token is not None
+
+
+def with_tiebreaker(sort: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+    """Appends _id to the sort keys so that the ordering is total"""
+    if any(key == "_id" for key, _ in sort):
+        return sort
+    direction = sort[-1][1] if sort else ASCENDING
+    return sort + [("_id", direction)]
+
+
+def _lookup(document: Dict, path: str) -> Any:
+    value = document
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, Mapping) else None
+    return value
+
+
+def encode_token(sort: List[Tuple[str, int]], document: Dict) -> str:
+    payload = {"s": [key for key, _ in sort], "v": [_lookup(document, key) for key, _ in sort]}
+    return base64.urlsafe_b64encode(json_util.dumps(payload).encode()).decode()
+
+
+def decode_token(sort: List[Tuple[str, int]], token: str) -> List[Any]:
+    try:
+        payload = json_util.loads(base64.urlsafe_b64decode(token.encode()))
+        keys, values = payload["s"], payload["v"]
+    except Exception:
+        raise InvalidQueryError("Invalid pagination token")
+
+    if keys != [key for key, _ in sort]:
+        raise InvalidQueryError("Pagination token was created with a different sort")
+
+    return values
+
+
+def _after(key: str, direction: int, value: Any) -> Optional[Dict]:
+    """Condition on key matching values strictly after value. Null and missing values sort before all others."""
+    if value is None:
+        return {key: {"$ne": None}} if direction == ASCENDING else None
+    if direction == ASCENDING:
+        return {key: {"$gt": value}}
+    # $lt does not match nulls, which come after every value in descending order
+    return {"$or": [{key: {"$lt": value}}, {key: None}]}
+
+
+def range_filter(sort: List[Tuple[str, int]], values: List[Any]) -> Dict:
+    """Filter matching documents strictly after values, in sort order
+
+    >>> range_filter([("age", 1), ("_id", 1)], [None, 7])
+    {'$or': [{'age': {'$ne': None}}, {'age': None, '_id': {'$gt': 7}}]}
+    """
+    clauses = []
+    for i, (key, direction) in enumerate(sort):
+        after = _after(key, direction, values[i])
+        if after is not None:
+            clause = {previous: values[j] for j, (previous, _) in enumerate(sort[:i])}
+            clause.update(after)
+            clauses.append(clause)
+
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def include_sort_keys(projection: Any, sort: List[Tuple[str, int]]) -> Any:
+    """Makes sure an inclusion projection still returns the sort keys needed for the next token"""
+    if isinstance(projection, (list, tuple)):
+        return list(projection) + [key for key, _ in sort if key not in projection]
+
+    if isinstance(projection, dict) and any(projection.get(key) for key in projection if key != "_id"):
+        projection = dict(projection)
+        for key, _ in sort:
+            projection[key] = True
+
+    return projection
@@ -0,0 +1,184 @@
+"""Parallel collection scans
+
+The collection is split into ranges of a field, with boundaries taken from a $sample of its values. Worker
+processes scan and hydrate one range at a time, and send results back in chunks through a bounded queue, so
+validation runs on every core while memory stays bounded by the queue size.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import queue
+import traceback
+from collections import Counter
+from datetime import datetime
+
+from bson import ObjectId
+
+from .database import MongomanticClient, connect
+from .errors import InvalidQueryError
+from .pagination import _lookup
+from .query import Q, _compile_key
+
+# Seconds between checks that workers are still alive while waiting for results
+_POLL_INTERVAL = 1.0
+
+_CHUNK, _DONE, _ERROR = range(3)
+
+
+def _bson_type(value: Any) -> Optional[str]:
+    """$type alias of the values that range filters on value compare with, or None if ranges cannot split on it
+
+    >>> _bson_type(3), _bson_type(2.5), _bson_type(True), _bson_type(None)
+    ('number', 'number', 'bool', None)
+    """
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, ObjectId):
+        return "objectId"
+    if isinstance(value, datetime):
+        return "date"
+    return None
+
+
+def split_points(collection, path: str, parts: int, samples_per_part: int = 20) -> List[Any]:
+    """Up to parts - 1 distinct values of path splitting a random sample of documents into equal parts
+
+    Range filters only match values of the same BSON type, so points are taken among the sampled values of the
+    most common type only.
+    """
+    if parts < 2:
+        return []
+
+    pipeline = [{"$sample": {"size": parts * samples_per_part}}, {"$project": {path: 1}}]
+    sampled = [_lookup(document, path) for document in collection.aggregate(pipeline)]
+    types = Counter(_bson_type(value) for value in sampled)
+    types.pop(None, None)
+    if not types:
+        return []
+
+    bson_type = types.most_common(1)[0][0]
+    values = sorted(value for value in sampled if _bson_type(value) == bson_type)
+
+    points = []
+    for i in range(1, parts):
+        value = values[i * len(values) // parts]
+        if not points or value > points[-1]:
+            points.append(value)
+
+    return points
+
+
+def split_ranges(model, collection, split_by: str, parts: int) -> List[Q]:
+    """Filters on split_by covering every document of the collection exactly once"""
+    path = _compile_key(model, split_by)[0]
+    points = split_points(collection, path, parts)
+
+    bounds: List[Tuple[Optional[Any], Optional[Any]]] = list(zip([None] + points, points + [None]))
+    ranges = []
+    for low, high in bounds:
+        lookups = {}
+        if low is not None:
+            lookups[f"{split_by}__gte"] = low
+        if high is not None:
+            lookups[f"{split_by}__lt"] = high
+        # Without bounds, the single range must still leave out missing values, which get their own range below
+        ranges.append(Q(**lookups) if lookups else Q(**{f"{split_by}__ne": None}))
+
+    if points:
+        # Bounds only match values of their own type. Values of other types, null or missing, are scanned together.
+        ranges.append(Q(**{split_by: {"$not": {"$type": _bson_type(points[0])}}}))
+    elif path != "_id":
+        ranges.append(Q(**{split_by: None}))  # Documents where the field is missing or null
+
+    return ranges
+
+
+def scan_ranges(
+    repository,
+    alias: str,
+    settings,
+    tasks,
+    results,
+    queries: Sequence[Q],
+    kwargs: Dict[str, Any],
+    chunk_size: int,
+) -> None:
+    """Worker loop: scans the ranges taken from tasks until a None task, sending chunks of results"""
+    try:
+        if alias not in MongomanticClient.connections:
+            connect(settings.uri, settings.database, mock=settings.mock, alias=alias, **settings.options)
+        # A forked worker inherits the parent's connection, which get_connection replaces with a new client
+        repository._indexes = True  # Indexes are the parent's business
+
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            for chunk in repository.find_chunks(*queries, task, chunk_size=chunk_size, **kwargs):
+                results.put((_CHUNK, chunk))
+
+        results.put((_DONE, None))
+    except BaseException:
+        results.put((_ERROR, traceback.format_exc()))
+
+
+def run_workers(
+    repository,
+    alias: str,
+    ranges: List[Q],
+    queries: Sequence[Q],
+    kwargs: Dict[str, Any],
+    workers: int,
+    chunk_size: int,
+    queue_size: int,
+    start_method: Optional[str] = None,
+) -> Iterator[Any]:
+    """Scans ranges in worker processes, yielding their results in no particular order"""
+    import multiprocessing  # Only needed by parallel scans, and slow to import
+
+    settings = MongomanticClient.get_settings(alias)
+    context = multiprocessing.get_context(start_method)
+
+    tasks = context.Queue()
+    for task in ranges:
+        tasks.put(task)
+    for _ in range(workers):
+        tasks.put(None)
+
+    results = context.Queue(maxsize=queue_size)
+    processes = [
+        context.Process(
+            target=scan_ranges,
+            args=(repository, alias, settings, tasks, results, list(queries), kwargs, chunk_size),
+            daemon=True,
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        done = 0
+        while done < workers:
+            try:
+                kind, payload = results.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    raise InvalidQueryError("Parallel scan workers exited without finishing their ranges")
+                continue
+
+            if kind == _CHUNK:
+                yield from payload
+            elif kind == _DONE:
+                done += 1
+            else:
+                raise InvalidQueryError(f"Parallel scan worker failed:\n{payload}")
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
@@ -0,0 +1,112 @@
+"""Fluent builder of aggregation pipelines for BaseRepository.aggregate
+
+Every method returns a new Pipeline, so partial pipelines can be shared and extended. Q objects and keyword
+lookups passed to match refer to the repository model's fields, and are compiled like find filters when the
+pipeline runs. After stages that reshape documents, such as group or project, pass match a filter dict instead.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel
+
+from .errors import InvalidQueryError
+from .query import Q, combine_filters, compile_filter
+
+__all__ = ["Pipeline"]
+
+
+class _Match:
+    """A $match stage whose lookups are compiled against the model once it is known"""
+
+    def __init__(self, filters: Tuple[Union[Q, Dict], ...], lookups: Dict[str, Any]):
+        self.filters = filters
+        self.lookups = lookups
+
+    def compile(self, model: Optional[Type[BaseModel]]) -> Dict:
+        needs_model = self.lookups or any(isinstance(query_filter, Q) for query_filter in self.filters)
+        if needs_model and model is None:
+            raise InvalidQueryError("Q objects and keyword lookups in match need a model to compile against")
+
+        clauses = [compile_filter(model, self.lookups)] if self.lookups else []
+        for query_filter in self.filters:
+            clauses.append(query_filter.compile(model) if isinstance(query_filter, Q) else query_filter)
+
+        return {"$match": combine_filters(clauses)}
+
+
+def _field_path(field: str) -> str:
+    return field if field.startswith("$") else f"${field}"
+
+
+class Pipeline:
+    """Aggregation pipeline builder.
+
+    >>> pipeline = Pipeline().match({"active": True}).group("$country", total={"$sum": 1}).sort("-total").limit(3)
+    >>> pipeline.build()[1:]
+    [{'$group': {'_id': '$country', 'total': {'$sum': 1}}}, {'$sort': {'total': -1}}, {'$limit': 3}]
+    """
+
+    def __init__(self, stages: Optional[List[Any]] = None):
+        self._stages = list(stages or [])
+
+    def __repr__(self):
+        return f"Pipeline({self._stages!r})"
+
+    def __len__(self):
+        return len(self._stages)
+
+    def stage(self, stage: Dict) -> "Pipeline":
+        """Appends a raw stage, e.g. {"$facet": {...}}"""
+        return Pipeline(self._stages + [stage])
+
+    def match(self, *filters: Union[Q, Dict], **lookups: Any) -> "Pipeline":
+        """Filters documents with Q objects and keyword lookups on model fields, or with filter dicts"""
+        return Pipeline(self._stages + [_Match(filters, lookups)])
+
+    def project(self, *fields: str, **expressions: Any) -> "Pipeline":
+        """Keeps the given fields, and adds fields computed from expressions, or excluded with 0"""
+        return self.stage({"$project": {**{field: 1 for field in fields}, **expressions}})
+
+    def add_fields(self, **expressions: Any) -> "Pipeline":
+        return self.stage({"$addFields": expressions})
+
+    def group(self, key: Any, **accumulators: Dict) -> "Pipeline":
+        """Groups documents by key, e.g. "$country" or {"year": {"$year": "$joined"}}, computing accumulators"""
+        return self.stage({"$group": {"_id": key, **accumulators}})
+
+    def sort(self, *keys: str) -> "Pipeline":
+        """Sorts on field names prefixed with '+' or '-'"""
+        spec = {}
+        for key in keys:
+            field = key.lstrip("+-")
+            spec["_id" if field == "id" else field] = -1 if key.startswith("-") else 1
+        return self.stage({"$sort": spec})
+
+    def skip(self, count: int) -> "Pipeline":
+        return self.stage({"$skip": count})
+
+    def limit(self, count: int) -> "Pipeline":
+        return self.stage({"$limit": count})
+
+    def sample(self, size: int) -> "Pipeline":
+        return self.stage({"$sample": {"size": size}})
+
+    def unwind(self, field: str, preserve_empty: bool = False) -> "Pipeline":
+        """Outputs one document per element of an array field. With preserve_empty, keeps documents without any."""
+        if preserve_empty:
+            return self.stage({"$unwind": {"path": _field_path(field), "preserveNullAndEmptyArrays": True}})
+        return self.stage({"$unwind": _field_path(field)})
+
+    def lookup(self, collection: Any, local_field: str, foreign_field: str, as_: str) -> "Pipeline":
+        """Joins the documents of another collection, given by name or by repository"""
+        collection = getattr(getattr(collection, "Meta", None), "collection", collection)
+        return self.stage(
+            {"$lookup": {"from": collection, "localField": local_field, "foreignField": foreign_field, "as": as_}}
+        )
+
+    def count(self, field: str = "count") -> "Pipeline":
+        return self.stage({"$count": field})
+
+    def build(self, model: Optional[Type[BaseModel]] = None) -> List[Dict]:
+        """The list of stages, with match lookups compiled against model"""
+        return [stage.compile(model) if isinstance(stage, _Match) else stage for stage in self._stages]
@@ -0,0 +1,183 @@
+"""Keyword lookups and Q objects compiled into MongoDB filters
+
+Keyword arguments follow Django's lookup syntax: `age__gte=30`, `email__in=[...]`, `address__city="Paris"`.
+Parsing a set of keys against the model's fields is done once per model and query shape, after which only
+the values are placed into the filter.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pydantic import BaseModel
+
+from .errors import FieldDoesNotExistError, InvalidQueryError
+from .mongo_model import OID
+
+__all__ = ["Q", "LOOKUPS", "compile_filter"]
+
+LOOKUPS = {
+    "exact": None,
+    "ne": "$ne",
+    "gt": "$gt",
+    "gte": "$gte",
+    "lt": "$lt",
+    "lte": "$lte",
+    "in": "$in",
+    "nin": "$nin",
+    "all": "$all",
+    "exists": "$exists",
+    "size": "$size",
+    "regex": "$regex",
+}
+
+# Lookups whose value is a list of field values
+_LIST_LOOKUPS = {"$in", "$nin", "$all"}
+
+# Lookups whose value is not a field value and must not be coerced
+_RAW_LOOKUPS = {"$exists", "$size", "$regex"}
+
+# Compiled shapes, keyed on (model, keys). Shapes are bounded by the queries written in code.
+_compiled_shapes: Dict[Tuple[Type[BaseModel], Tuple[str, ...]], List[Tuple[str, Optional[str], Callable]]] = {}
+
+
+class Q:
+    """Composable filter. Combine with | ($or), & ($and) and ~ ($nor).
+
+    >>> (Q(age__gte=30) | Q(first_name="John")).children
+    [Q(age__gte=30), Q(first_name='John')]
+    """
+
+    def __init__(self, *children: "Q", connector: str = "$and", negated: bool = False, **lookups: Any):
+        self.children = list(children)
+        self.lookups = lookups
+        self.connector = connector
+        self.negated = negated
+
+    def _combine(self, other: "Q", connector: str) -> "Q":
+        if not isinstance(other, Q):
+            return NotImplemented
+        return Q(self, other, connector=connector)
+
+    def __or__(self, other: "Q") -> "Q":
+        return self._combine(other, "$or")
+
+    def __and__(self, other: "Q") -> "Q":
+        return self._combine(other, "$and")
+
+    def __invert__(self) -> "Q":
+        return Q(self, negated=True)
+
+    def __repr__(self):
+        if self.lookups and not self.children:
+            return "Q({})".format(", ".join(f"{key}={value!r}" for key, value in self.lookups.items()))
+        return f"Q({self.children!r}, connector={self.connector!r}, negated={self.negated}, {self.lookups!r})"
+
+    def compile(self, model: Type[BaseModel]) -> Dict:
+        clauses = [child.compile(model) for child in self.children]
+        if self.lookups:
+            clauses.insert(0, compile_filter(model, self.lookups))
+        clauses = [clause for clause in clauses if clause]
+
+        if self.negated:
+            return {"$nor": [combine_filters(clauses)]} if clauses else {}
+        if self.connector == "$and":
+            return combine_filters(clauses)
+        return {self.connector: clauses}
+
+
+def combine_filters(filters: Iterable[Dict]) -> Dict:
+    filters = [query_filter for query_filter in filters if query_filter]
+    if not filters:
+        return {}
+    if len(filters) == 1:
+        return filters[0]
+    return {"$and": filters}
+
+
+def _coerce_object_id(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(str(value))
+    except InvalidId:
+        raise InvalidQueryError(f"Invalid ObjectId {value}.")
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _coercer(field_type: Any, operator: Optional[str]) -> Callable:
+    """Builds the function converting a lookup value to the type stored in MongoDB"""
+    if operator in _RAW_LOOKUPS or field_type not in (OID, ObjectId):
+        return _identity
+
+    if operator in _LIST_LOOKUPS:
+        return lambda values: [_coerce_object_id(value) for value in values]
+
+    # Raw operator dicts such as {"$gt": ...} are passed through untouched
+    return lambda value: value if isinstance(value, dict) else _coerce_object_id(value)
+
+
+def _compile_key(model: Type[BaseModel], key: str) -> Tuple[str, Optional[str], Callable]:
+    """Resolves 'address__city__in' to the stored path 'address.city', operator '$in' and a value coercer"""
+    parts = key.split("__")
+    operator = None
+    if len(parts) > 1 and parts[-1] in LOOKUPS:
+        operator = LOOKUPS[parts.pop()]
+
+    if parts[0] in ("id", "_id"):
+        if len(parts) > 1:
+            raise FieldDoesNotExistError(f"Field {key} does not exist for model {model}")
+        return "_id", operator, _coercer(OID, operator)
+
+    path = []
+    current: Optional[Type[BaseModel]] = model
+    field_type: Any = None
+    for part in parts:
+        if current is None:
+            path.append(part)  # Inside a dict or untyped field, any key is allowed
+            field_type = None
+            continue
+
+        field = current.__fields__.get(part)
+        if field is None:
+            raise FieldDoesNotExistError(f"Field {key} does not exist for model {model}")
+
+        path.append(field.alias)
+        field_type = field.type_
+        current = field_type if isinstance(field_type, type) and issubclass(field_type, BaseModel) else None
+
+    return ".".join(path), operator, _coercer(field_type, operator)
+
+
+def compile_filter(model: Type[BaseModel], lookups: Dict[str, Any]) -> Dict:
+    """Compiles keyword lookups into a MongoDB filter, parsing each query shape only once per model"""
+    shape = (model, tuple(lookups))
+    compiled = _compiled_shapes.get(shape)
+    if compiled is None:
+        compiled = [_compile_key(model, key) for key in lookups]
+        _compiled_shapes[shape] = compiled
+
+    query_filter: Dict[str, Any] = {}
+    operator_paths = set()  # Paths whose value is an operator dict built here, as opposed to a given value
+    conflicts = []
+    for (path, operator, coerce), value in zip(compiled, lookups.values()):
+        value = coerce(value)
+        if operator is None:
+            if path in query_filter:
+                conflicts.append({path: value})
+            else:
+                query_filter[path] = value
+        elif path not in query_filter:
+            query_filter[path] = {operator: value}
+            operator_paths.add(path)
+        elif path in operator_paths and operator not in query_filter[path]:
+            query_filter[path][operator] = value
+        else:
+            conflicts.append({path: {operator: value}})
+
+    if conflicts:
+        return {"$and": [query_filter] + conflicts}
+    return query_filter
@@ -0,0 +1,214 @@
+"""Client sessions and transactions for repository calls
+
+Sessions are bound to the current context, so every repository call made in the scope of `transaction()` or
+`start_session()`, in any repository on the same connection, runs in that session without passing it around.
+"""
+
+from typing import Any, Callable, Iterator, List, Optional
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from pymongo.client_session import ClientSession
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+
+from .database import DEFAULT_CONNECTION_NAME, MongomanticClient, as_read_preference
+
+__all__ = ["after_commit", "current_session", "run_in_transaction", "start_session", "transaction"]
+
+# Seconds after which transient errors are no longer retried, as in the MongoDB drivers' convenient transaction API
+DEFAULT_TRANSACTION_TIMEOUT = 120.0
+
+_current_session: ContextVar[Optional[ClientSession]] = ContextVar("mongomantic_session", default=None)
+
+# Callbacks of the transaction in scope, called once it commits
+_commit_callbacks: ContextVar[Optional[List[Callable[[], Any]]]] = ContextVar("mongomantic_commit", default=None)
+
+
+def current_session() -> Optional[ClientSession]:
+    """The session bound to the current context, if any"""
+    return _current_session.get()
+
+
+def after_commit(callback: Callable[[], Any]) -> bool:
+    """Calls callback once the transaction in scope commits, e.g. to drop cached reads of documents written in it.
+
+    Returns False, without calling callback, outside of transactions. Callbacks of aborted transactions are dropped.
+    """
+    callbacks = _commit_callbacks.get()
+    if callbacks is None:
+        return False
+    callbacks.append(callback)
+    return True
+
+
+def has_error_label(error: BaseException, label: str) -> bool:
+    """True if error, or a PyMongo error it was raised from, carries label. Repository errors wrap PyMongo's."""
+    while error is not None:
+        if hasattr(error, "has_error_label") and error.has_error_label(label):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _backoff(attempt: int, backoff: float, max_backoff: float) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(max_backoff, backoff * 2**attempt))
+
+
+@contextmanager
+def _bind(session: ClientSession, callbacks: Optional[List[Callable[[], Any]]] = None) -> Iterator[ClientSession]:
+    token = _current_session.set(session)
+    callbacks_token = _commit_callbacks.set(callbacks)
+    try:
+        yield session
+    finally:
+        _commit_callbacks.reset(callbacks_token)
+        _current_session.reset(token)
+
+
+@contextmanager
+def start_session(alias: str = DEFAULT_CONNECTION_NAME, causal_consistency: bool = True) -> Iterator[ClientSession]:
+    """Binds a session to the repository calls in scope.
+
+    With causal consistency, reads in scope observe the writes made earlier in scope, even when they are served by
+    secondaries, e.g. through a repository's Meta.read_preference.
+
+    Args:
+        alias: Connection to start the session on
+        causal_consistency: If True, order operations in the session causally
+    """
+    client = MongomanticClient.get_connection(alias).client
+    with client.start_session(causal_consistency=causal_consistency) as session, _bind(session):
+        yield session
+
+
+def _commit(
+    session: ClientSession, deadline: float, backoff: float, max_backoff: float, max_commit_time_ms: Optional[int]
+) -> None:
+    attempt = 0
+    while True:
+        try:
+            session.commit_transaction()
+            return
+        except Exception as e:
+            # The commit may or may not have been applied, and committing again is safe
+            if not has_error_label(e, "UnknownTransactionCommitResult") or time.monotonic() >= deadline:
+                raise
+            if max_commit_time_ms is not None and getattr(e, "code", None) == 50:  # MaxTimeMSExpired
+                raise
+
+        time.sleep(_backoff(attempt, backoff, max_backoff))
+        attempt += 1
+
+
+@contextmanager
+def transaction(
+    alias: str = DEFAULT_CONNECTION_NAME,
+    causal_consistency: bool = True,
+    read_concern: Optional[ReadConcern] = None,
+    write_concern: Optional[WriteConcern] = None,
+    read_preference: Optional[Any] = None,
+    max_commit_time_ms: Optional[int] = None,
+    timeout: float = DEFAULT_TRANSACTION_TIMEOUT,
+    backoff: float = 0.01,
+    max_backoff: float = 1.0,
+) -> Iterator[ClientSession]:
+    """Runs the repository calls in scope in a multi-document transaction.
+
+    The transaction is committed when the block exits, and aborted if it raises. Commits whose outcome is unknown
+    are retried with backoff until timeout. The block itself runs once; use run_in_transaction to retry it on
+    transient errors such as write conflicts.
+
+    A transaction opened in the scope of another one joins it. In the scope of start_session, the transaction
+    uses that session.
+
+    Args:
+        alias: Connection to run the transaction on
+        causal_consistency: If True, order operations in the session causally
+        read_concern: Read concern of the transaction, e.g. ReadConcern("snapshot")
+        write_concern: Write concern of the commit, e.g. WriteConcern("majority")
+        read_preference: Read preference of the transaction, which must target the primary for reads in it
+        max_commit_time_ms: Server-side time limit for each commit attempt
+        timeout: Seconds after which commits are no longer retried
+        backoff: Initial delay between commit attempts, in seconds
+        max_backoff: Maximum delay between commit attempts, in seconds
+    """
+    client = MongomanticClient.get_connection(alias).client
+    active = current_session()
+    if active is not None and active.client is client and active.in_transaction:
+        yield active
+        return
+
+    options = {
+        "read_concern": read_concern,
+        "write_concern": write_concern,
+        "read_preference": as_read_preference(read_preference),
+    }
+    if max_commit_time_ms is not None:
+        options["max_commit_time_ms"] = max_commit_time_ms
+
+    owned = active is None or active.client is not client
+    session = client.start_session(causal_consistency=causal_consistency) if owned else active
+    deadline = time.monotonic() + timeout
+    callbacks: List[Callable[[], Any]] = []
+    try:
+        session.start_transaction(**options)
+        with _bind(session, callbacks):
+            try:
+                yield session
+            except BaseException:
+                if session.in_transaction:
+                    session.abort_transaction()
+                raise
+
+        _commit(session, deadline, backoff, max_backoff, max_commit_time_ms)
+        for callback in callbacks:
+            callback()
+    finally:
+        if owned:
+            session.end_session()
+
+
+def run_in_transaction(
+    callback: Callable[[], Any],
+    alias: str = DEFAULT_CONNECTION_NAME,
+    timeout: float = DEFAULT_TRANSACTION_TIMEOUT,
+    backoff: float = 0.01,
+    max_backoff: float = 1.0,
+    **options: Any,
+) -> Any:
+    """Calls callback in a transaction and returns its result.
+
+    The whole transaction, callback included, is retried with backoff on errors labelled TransientTransactionError,
+    such as write conflicts or primary elections, until timeout. The callback must therefore be safe to call again.
+    Called in the scope of another transaction, the callback joins it and is not retried.
+
+    Args:
+        callback: Function making the repository calls, taking no arguments
+        alias: Connection to run the transaction on
+        timeout: Seconds after which transient errors are no longer retried
+        backoff: Initial delay between attempts, in seconds
+        max_backoff: Maximum delay between attempts, in seconds
+        options: Passed on to transaction(), e.g. read_concern or write_concern
+    """
+    active = current_session()
+    if active is not None and active.in_transaction:
+        return callback()
+
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        try:
+            remaining = max(deadline - time.monotonic(), 0)
+            with transaction(alias, timeout=remaining, backoff=backoff, max_backoff=max_backoff, **options):
+                return callback()
+        except Exception as e:
+            if not has_error_label(e, "TransientTransactionError") or time.monotonic() >= deadline:
+                raise
+
+        time.sleep(_backoff(attempt, backoff, max_backoff))
+        attempt += 1
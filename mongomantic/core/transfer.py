@@ -0,0 +1,125 @@
+"""Streaming file formats for BaseRepository.export_to and import_from
+
+Documents are read and written one at a time, through buffered and optionally compressed files, so memory use
+does not grow with the size of the collection. Uncompressed BSON files are read through a memory map.
+
+"bson" files are concatenated BSON documents, the format of mongodump. "ndjson" files hold one JSON document
+per line, encoded with the model's Config.json_encoders. Imports also read MongoDB Extended JSON, e.g.
+{"$oid": ...} or {"$date": ...}, the format of mongoexport.
+"""
+
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import json
+import mmap
+import os
+import time
+from dataclasses import dataclass, field
+from importlib import import_module
+
+import bson
+from bson import json_util
+
+__all__ = ["FORMATS", "TransferProgress"]
+
+FORMATS = ("bson", "ndjson")
+
+# Size of write and read buffers, in bytes
+BUFFER_SIZE = 1 << 20
+
+# Modules providing each compression, imported on first use
+_COMPRESSORS = {"gzip": "gzip", "bz2": "bz2", "xz": "lzma"}
+_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+_FORMAT_SUFFIXES = {".bson": "bson", ".ndjson": "ndjson", ".jsonl": "ndjson", ".json": "ndjson"}
+
+
+@dataclass
+class TransferProgress:
+    documents: int = 0  # Documents written by an export, or read by an import
+    bytes: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def rate(self) -> float:
+        """Documents per second"""
+        elapsed = self.elapsed
+        return self.documents / elapsed if elapsed > 0 else 0.0
+
+
+def compression_for(path: str, compress: Optional[str]) -> Optional[str]:
+    """Compression given, or inferred from the file suffix"""
+    if compress is None:
+        return _SUFFIXES.get(os.path.splitext(path)[1])
+    if compress not in _COMPRESSORS:
+        raise ValueError(f"Invalid compression {compress}, expected one of {tuple(_COMPRESSORS)}")
+    return compress
+
+
+def format_for(path: str, compress: Optional[str]) -> str:
+    """Format inferred from the file suffix, ignoring the compression suffix"""
+    root, suffix = os.path.splitext(path)
+    if compress is not None and suffix in _SUFFIXES:
+        suffix = os.path.splitext(root)[1]
+    return _FORMAT_SUFFIXES.get(suffix, "bson")
+
+
+def open_file(path: str, mode: str, compress: Optional[str]) -> IO[bytes]:
+    if compress is None:
+        return open(path, mode, buffering=BUFFER_SIZE)
+    return import_module(_COMPRESSORS[compress]).open(path, mode)
+
+
+def write_documents(
+    file: IO[bytes],
+    documents: Iterable[Dict],
+    format: str,
+    encoder: Callable[[Any], Any],
+    progress: TransferProgress,
+) -> Iterator[TransferProgress]:
+    """Writes documents one by one, yielding progress after each"""
+    for document in documents:
+        if format == "bson":
+            data = bson.encode(document)
+        else:
+            data = json.dumps(document, default=encoder, separators=(",", ":")).encode() + b"\n"
+
+        file.write(data)
+        progress.documents += 1
+        progress.bytes += len(data)
+        yield progress
+
+
+def _read_mapped(path: str) -> Iterator[Tuple[Dict, int]]:
+    if os.path.getsize(path) == 0:
+        return
+
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+            offset = 0
+            while offset < len(view):
+                size = int.from_bytes(view[offset : offset + 4], "little")
+                yield bson.decode(view[offset : offset + size]), size
+                offset += size
+
+
+def read_documents(path: str, format: str, compress: Optional[str]) -> Iterator[Tuple[Dict, int]]:
+    """Yields (document, size in bytes) pairs. Extended JSON values are decoded, others are left to validation."""
+    if format == "bson" and compress is None:
+        yield from _read_mapped(path)
+        return
+
+    with open_file(path, "rb", compress) as file:
+        if format == "bson":
+            header = file.read(4)
+            while header:
+                size = int.from_bytes(header, "little")
+                yield bson.decode(header + file.read(size - 4)), size
+                header = file.read(4)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json_util.loads(line), len(line)
@@ -0,0 +1,167 @@
+"""Buffered inserts for BaseRepository.save_buffered
+
+Models are encoded when they are added, then inserted by a background thread in unordered bulk writes. A batch is
+sent once it reaches max_docs or max_bytes, or once its oldest document has waited max_latency_ms. Callers get a
+future resolving to the inserted id, or failing with WriteError. Adding to a full buffer blocks until the batch in
+flight is written. Buffers still holding documents are flushed when the interpreter exits.
+"""
+
+from typing import Any, List, NamedTuple, Optional
+
+import atexit
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+import bson
+
+from .bulk import BulkWriteResult, PendingWrite, insert_request
+from .errors import WriteError
+
+__all__ = ["WriteBuffer", "WriteBufferSettings"]
+
+_buffers: "weakref.WeakSet[WriteBuffer]" = weakref.WeakSet()
+
+
+@dataclass
+class WriteBufferSettings:
+    max_docs: int = 1000  # Documents per bulk insert
+    max_bytes: Optional[int] = 8 * 1024 * 1024  # Encoded size of a bulk insert
+    max_latency_ms: float = 50  # Longest a document waits before its batch is sent
+
+
+class _Buffered(NamedTuple):
+    model: Any
+    request: Any
+    size: int
+    inserted_id: Any
+    future: Future
+
+
+class WriteBuffer:
+    """Accumulates inserts for one repository and writes them from a background thread"""
+
+    def __init__(self, repository: Any, settings: WriteBufferSettings):
+        if settings.max_docs < 1:
+            raise ValueError("max_docs must be at least 1")
+
+        self.repository = repository
+        self.settings = settings
+        self.pid = os.getpid()
+
+        self._condition = threading.Condition()
+        self._pending: List[_Buffered] = []
+        self._pending_bytes = 0
+        self._oldest = 0.0
+        self._unwritten = 0  # Buffered or in flight
+        self._flushing = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        _buffers.add(self)
+
+    def add(self, model: Any, timeout: Optional[float] = None) -> Future:
+        """Buffers the insert of a model. Blocks while the buffer is full, raising WriteError after timeout seconds."""
+        request, document, inserted_id = insert_request(model, keep_id=True)
+        size = len(bson.encode(document)) if self.settings.max_bytes is not None else 0
+        buffered = _Buffered(model, request, size, inserted_id, Future())
+
+        with self._condition:
+            if self._closed:
+                raise WriteError("Write buffer is closed")
+            if not self._condition.wait_for(lambda: not self._is_full(size), timeout):
+                raise WriteError(f"Write buffer is full, could not add document within {timeout}s")
+
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append(buffered)
+            self._pending_bytes += size
+            self._unwritten += 1
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"{self.repository.__name__}-writer", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify_all()
+
+        return buffered.future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Sends buffered documents now, and waits until they are written. Returns False on timeout."""
+        with self._condition:
+            self._flushing = True
+            self._condition.notify_all()
+            done = self._condition.wait_for(lambda: not self._unwritten, timeout)
+            self._flushing = False
+            return done
+
+    def close(self, timeout: Optional[float] = None):
+        """Flushes the buffer and stops its thread. Later adds raise WriteError."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout)
+
+    def _is_full(self, size: int) -> bool:
+        if len(self._pending) >= self.settings.max_docs:
+            return True
+        max_bytes = self.settings.max_bytes
+        return bool(self._pending) and max_bytes is not None and self._pending_bytes + size > max_bytes
+
+    def _ready(self) -> bool:
+        if self._flushing or self._closed or self._is_full(0):
+            return True
+        return time.monotonic() - self._oldest >= self.settings.max_latency_ms / 1000
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending or not self._ready():
+                    if self._closed and not self._pending:
+                        return
+                    wait = None
+                    if self._pending:
+                        wait = max(0.0, self._oldest + self.settings.max_latency_ms / 1000 - time.monotonic())
+                    self._condition.wait(wait)
+
+                batch, self._pending, self._pending_bytes = self._pending, [], 0
+                self._condition.notify_all()  # Wakes callers blocked on a full buffer
+
+            self._write(batch)
+
+            with self._condition:
+                self._unwritten -= len(batch)
+                self._condition.notify_all()
+
+    def _write(self, batch: List[_Buffered]):
+        writes = [
+            PendingWrite(i, buffered.model, buffered.request, 0, buffered.inserted_id)
+            for i, buffered in enumerate(batch)
+        ]
+        try:
+            result = self.repository._bulk(iter(writes), BulkWriteResult(), False, len(batch), None)
+        except Exception as e:
+            for buffered in batch:
+                buffered.future.set_exception(e if isinstance(e, WriteError) else WriteError(str(e)))
+            return
+
+        failures = {failure.index: failure for failure in result.failures}
+        for i, buffered in enumerate(batch):
+            failure = failures.get(i)
+            if failure is None:
+                buffered.future.set_result(buffered.inserted_id)
+            else:
+                buffered.future.set_exception(WriteError(f"Error inserting document: \n{failure.message}"))
+
+
+@atexit.register
+def _flush_at_exit():
+    for buffer in list(_buffers):
+        if buffer.pid == os.getpid():
+            buffer.close()
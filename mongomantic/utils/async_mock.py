@@ -0,0 +1,87 @@
+"""In-process stand-in for Motor, wrapping mongomock behind awaitable methods and async cursors
+
+Operations run synchronously on the event loop thread, which is enough for tests of code written against Motor.
+"""
+
+import inspect
+
+import mongomock
+
+__all__ = ["AsyncMockClient"]
+
+# Collection methods that return a cursor synchronously in Motor, instead of a coroutine
+_CURSOR_METHODS = {"find", "aggregate", "list_indexes"}
+
+
+class AsyncMockCursor:
+    def __init__(self, cursor):
+        self._cursor = iter(cursor)
+        self._wrapped = cursor
+
+    def __getattr__(self, name):
+        attr = getattr(self._wrapped, name)
+
+        def chain(*args, **kwargs):
+            self._wrapped = attr(*args, **kwargs)
+            self._cursor = iter(self._wrapped)
+            return self
+
+        return chain
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        results = []
+        async for document in self:
+            results.append(document)
+            if length is not None and len(results) >= length:
+                break
+        return results
+
+
+class AsyncMockCollection:
+    def __init__(self, collection: mongomock.Collection):
+        self._collection = collection
+
+    def with_options(self, *args, **kwargs):
+        return AsyncMockCollection(self._collection.with_options(*args, **kwargs))
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not inspect.isroutine(attr):  # Properties such as name, database or read_preference
+            return attr
+        if name in _CURSOR_METHODS:
+            return lambda *args, **kwargs: AsyncMockCursor(attr(*args, **kwargs))
+
+        async def method(*args, **kwargs):
+            return attr(*args, **kwargs)
+
+        return method
+
+
+class AsyncMockDatabase:
+    def __init__(self, database: mongomock.Database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return AsyncMockCollection(self._database[name])
+
+    __getattr__ = __getitem__
+
+
+class AsyncMockClient:
+    def __init__(self, *args, client: mongomock.MongoClient = None, **kwargs):
+        self._client = client if client is not None else mongomock.MongoClient(*args, **kwargs)
+
+    def __getitem__(self, name):
+        return AsyncMockDatabase(self._client[name])
+
+    def close(self):
+        self._client.close()
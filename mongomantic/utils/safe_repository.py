@@ -1,12 +1,20 @@
 """SafeRepository is a subclass of BaseRepository that handles all raised errors
 """
 
-from typing import Dict, Iterator, List, Type
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Type, Union
 
 from mongomantic.config import logger
 from mongomantic.core.base_repository import BaseRepository
+from mongomantic.core.bulk import BulkWriteResult
 from mongomantic.core.errors import DoesNotExistError, InvalidQueryError, MultipleObjectsReturnedError, WriteError
 from mongomantic.core.mongo_model import MongoDBModel
+from mongomantic.core.pagination import Page
+from mongomantic.core.pipeline import Pipeline
+from mongomantic.core.query import Q
+from pymongo.results import UpdateResult
+
+if TYPE_CHECKING:  # pragma: no cover
+    from concurrent.futures import Future
 
 
 class SafeRepository(BaseRepository):
@@ -22,25 +30,89 @@ class SafeRepository(BaseRepository):
             raise NotImplementedError
 
     @classmethod
-    def save(cls, model) -> Type[MongoDBModel]:
+    def save(cls, model, as_: str = "model") -> Any:
         try:
-            return super().save(model)
+            return super().save(model, as_)
         except WriteError as e:
             logger.error(e)
             return None
 
     @classmethod
-    def get(cls, **kwargs) -> Type[MongoDBModel]:
+    def save_buffered(cls, model, timeout: Optional[float] = None) -> Optional["Future"]:
+        try:
+            return super().save_buffered(model, timeout)
+        except WriteError as e:
+            logger.error(e)
+            return None
+
+    @classmethod
+    def update_one(cls, update: Dict, *queries: Q, **kwargs) -> Optional[UpdateResult]:
+        try:
+            return super().update_one(update, *queries, **kwargs)
+        except (WriteError, InvalidQueryError) as e:
+            logger.error(e)
+            return None
+
+    @classmethod
+    def update_where(cls, update: Dict, *queries: Q, **kwargs) -> Optional[UpdateResult]:
         try:
-            return super().get(**kwargs)
+            return super().update_where(update, *queries, **kwargs)
+        except (WriteError, InvalidQueryError) as e:
+            logger.error(e)
+            return None
+
+    @classmethod
+    def find_one_and_update(cls, update: Dict, *queries: Q, **kwargs) -> Optional[Type[MongoDBModel]]:
+        try:
+            return super().find_one_and_update(update, *queries, **kwargs)
+        except (WriteError, InvalidQueryError) as e:
+            logger.error(e)
+            return None
+
+    @classmethod
+    def save_many(cls, models: Iterable[MongoDBModel], **kwargs) -> BulkWriteResult:
+        try:
+            return super().save_many(models, **kwargs)
+        except WriteError as e:
+            logger.error(e)
+            return None
+
+    @classmethod
+    def update_many(cls, models: Iterable[MongoDBModel], **kwargs) -> BulkWriteResult:
+        try:
+            return super().update_many(models, **kwargs)
+        except WriteError as e:
+            logger.error(e)
+            return None
+
+    @classmethod
+    def delete_many(cls, models: Iterable[MongoDBModel], **kwargs) -> BulkWriteResult:
+        try:
+            return super().delete_many(models, **kwargs)
+        except WriteError as e:
+            logger.error(e)
+            return None
+
+    @classmethod
+    def bulk_write(cls, requests: Iterable[Any], **kwargs) -> BulkWriteResult:
+        try:
+            return super().bulk_write(requests, **kwargs)
+        except WriteError as e:
+            logger.error(e)
+            return None
+
+    @classmethod
+    def get(cls, *queries: Q, **kwargs) -> Type[MongoDBModel]:
+        try:
+            return super().get(*queries, **kwargs)
         except (DoesNotExistError, MultipleObjectsReturnedError) as e:
             logger.error(e)
             return None
 
     @classmethod
-    def find(cls, **kwargs) -> Iterator[Type[MongoDBModel]]:
+    def find(cls, *queries: Q, **kwargs) -> Iterator[Type[MongoDBModel]]:
         try:
-            gen = super().find(**kwargs)
+            gen = super().find(*queries, **kwargs)
             try:
                 yield from gen
             except InvalidQueryError as e:
@@ -52,9 +124,41 @@ class SafeRepository(BaseRepository):
             return None
 
     @classmethod
-    def aggregate(cls, pipeline: List[Dict]):
+    def paginate(cls, *args, **kwargs) -> Page:
+        try:
+            return super().paginate(*args, **kwargs)
+        except InvalidQueryError as e:
+            logger.error(e)
+            return Page()
+
+    @classmethod
+    def count(cls, *queries: Q, **kwargs) -> Optional[int]:
+        try:
+            return super().count(*queries, **kwargs)
+        except InvalidQueryError as e:
+            logger.error(e)
+            return None
+
+    @classmethod
+    def exists(cls, *queries: Q, **kwargs) -> Optional[bool]:
+        try:
+            return super().exists(*queries, **kwargs)
+        except InvalidQueryError as e:
+            logger.error(e)
+            return None
+
+    @classmethod
+    def distinct(cls, field: str, *queries: Q, **kwargs) -> Optional[List[Any]]:
+        try:
+            return super().distinct(field, *queries, **kwargs)
+        except InvalidQueryError as e:
+            logger.error(e)
+            return None
+
+    @classmethod
+    def aggregate(cls, pipeline: Union[List[Dict], Pipeline], **kwargs):
         try:
-            gen = super().aggregate(pipeline)
+            gen = super().aggregate(pipeline, **kwargs)
             try:
                 yield from gen
             except InvalidQueryError as e:
@@ -0,0 +1,125 @@
+from typing import List
+
+import pytest
+from mongomantic import MongoDBModel, Pipeline, Q
+from mongomantic.core.database import connect
+from mongomantic.core.errors import InvalidQueryError
+from pydantic import BaseModel, Field
+
+from .user import User
+from .user_repository import SafeUserRepository, UserRepository
+
+
+class AgeGroup(BaseModel):
+    age: int
+    total: int
+
+
+class AgeSummary(BaseModel):
+    age: int = Field(alias="_id")
+    total: int
+
+
+class UserName(MongoDBModel):
+    first_name: str
+
+
+class AgeStats(BaseModel):
+    count: int
+
+
+class AgeReport(BaseModel):
+    age: int = Field(alias="_id")
+    stats: AgeStats
+    history: List[AgeStats]
+
+
+class UserReport(MongoDBModel):
+    first_name: str
+    stats: AgeStats
+
+
+@pytest.fixture()
+def users():
+    connect("localhost:27017", "test", mock=True)
+    UserRepository.save_many(
+        [User(first_name=f"User {i}", last_name="Smith", email=f"{i}@google.com", age=20 + i % 3) for i in range(9)]
+    )
+
+
+def test_count_and_exists(users):
+    assert UserRepository.count() == 9
+    assert UserRepository.count(age=20) == 3
+    assert UserRepository.count(Q(age=20) | Q(age=21), limit=4) == 4
+    assert UserRepository.estimated_count() == 9
+
+    assert UserRepository.exists(email="0@google.com")
+    assert not UserRepository.exists(email="missing@google.com")
+
+
+def test_distinct(users):
+    assert sorted(UserRepository.distinct("age")) == [20, 21, 22]
+    assert UserRepository.distinct("age", first_name="User 4") == [21]
+
+
+def test_pipeline_builder(users):
+    pipeline = (
+        Pipeline().match(age__gte=21).group("$age", total={"$sum": 1}).project(total=1, age="$_id", _id=0).sort("-age")
+    )
+
+    results = list(UserRepository.aggregate(pipeline, output_model=AgeGroup, allow_disk_use=True, batch_size=10))
+    assert results == [AgeGroup(age=22, total=3), AgeGroup(age=21, total=3)]
+
+    trusted = list(UserRepository.aggregate(pipeline, output_model=AgeGroup, trusted=True))
+    assert [(group.age, group.total) for group in trusted] == [(22, 3), (21, 3)]
+
+    # The base pipeline is unchanged by the stages added to it
+    assert len(pipeline.limit(1)) == 5 and len(pipeline) == 4
+
+
+def test_output_models(users):
+    pipeline = Pipeline().group("$age", total={"$sum": 1}).sort("+id")
+
+    summaries = list(UserRepository.aggregate(pipeline, output_model=AgeSummary))
+    assert [(summary.age, summary.total) for summary in summaries] == [(20, 3), (21, 3), (22, 3)]
+
+    names = list(UserRepository.aggregate(Pipeline().match(age=20).project("first_name"), output_model=UserName))
+    assert len(names) == 3 and all(name.id and name.first_name for name in names)
+
+    documents = list(UserRepository.aggregate(pipeline, output_model=dict))
+    assert documents[0] == {"_id": 20, "total": 3}
+
+    # Without an output model, results are validated as Meta.model
+    with pytest.raises(InvalidQueryError):
+        list(UserRepository.aggregate(pipeline))
+
+
+def test_trusted_output_models_build_nested_models(users):
+    pipeline = (
+        Pipeline()
+        .group("$age", total={"$sum": 1}, history={"$push": {"count": "$age"}})
+        .project(stats={"count": "$total"}, history=1)
+        .sort("+id")
+    )
+
+    reports = list(UserRepository.aggregate(pipeline, output_model=AgeReport, trusted=True))
+    assert reports[0] == AgeReport(_id=20, stats=AgeStats(count=3), history=[AgeStats(count=20)] * 3)
+    assert isinstance(reports[0].stats, AgeStats) and isinstance(reports[0].history[0], AgeStats)
+
+    pipeline = Pipeline().match(age=20).project(first_name=1, stats={"count": "$age"})
+    users = list(UserRepository.aggregate(pipeline, output_model=UserReport, trusted=True))
+    assert len(users) == 3 and all(user.id and user.stats == AgeStats(count=20) for user in users)
+
+
+def test_match_after_reshaping_takes_filters(users):
+    pipeline = Pipeline().group("$age", total={"$sum": 1}).match({"_id": {"$gt": 20}})
+    assert len(list(UserRepository.aggregate(pipeline, output_model=dict))) == 2
+
+    with pytest.raises(InvalidQueryError):
+        Pipeline().match(age=20).build()
+
+
+def test_safe_repository_shortcuts(users):
+    assert SafeUserRepository.count(age=20) == 3
+    assert SafeUserRepository.exists(age=21)
+    assert SafeUserRepository.count(sort="+age") is None
@@ -0,0 +1,247 @@
+import types
+
+import asyncio
+import sys
+
+import pytest
+from mongomantic import AsyncBaseRepository, Index, MongoDBModel, connect_async, disconnect_async
+from mongomantic.core import base_repository
+from mongomantic.core.async_database import AsyncMongomanticClient
+from mongomantic.core.database import MongomanticClient
+from mongomantic.core.errors import DoesNotExistError, InvalidQueryError, MultipleObjectsReturnedError
+from mongomantic.utils.async_mock import AsyncMockCollection
+from pymongo import ReadPreference
+
+from .user import User
+
+
+class AsyncUserRepository(AsyncBaseRepository):
+    class Meta:
+        model = User
+        collection = "user"
+
+
+class AsyncAnalyticsRepository(AsyncBaseRepository):
+    class Meta:
+        model = User
+        collection = "user"
+        connection = "analytics"
+        read_preference = "secondaryPreferred"
+
+
+class Account(MongoDBModel):
+    email: str
+
+
+class AsyncAccountRepository(AsyncBaseRepository):
+    class Meta:
+        model = Account
+        collection = "account"
+        indexes = [Index(fields=["+email"], unique=True)]
+
+
+@pytest.fixture(scope="function")
+def async_mongodb():
+    connect_async("localhost:27017", "test", mock=True)
+    AsyncAccountRepository._indexes = None
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def make_user(age=29):
+    return User(first_name="John", last_name="Smith", email="john@google.com", age=age)
+
+
+def test_async_repository_definition_without_model():
+    with pytest.raises(NotImplementedError):
+
+        class TestRepo(AsyncBaseRepository):
+            class Meta:
+                collection = "user"
+
+
+def test_async_save_modes(async_mongodb):
+    async def scenario():
+        user = make_user()
+        saved = await AsyncUserRepository.save(user, as_="instance")
+        inserted_id = await AsyncUserRepository.save(make_user(30), as_="id")
+        return user, saved, inserted_id, await AsyncUserRepository.get(id=inserted_id)
+
+    user, saved, inserted_id, fetched = run(scenario())
+    assert saved is user and user.id and user.is_persisted
+    assert fetched.id == inserted_id and fetched.age == 30
+
+
+def test_async_save_updates_persisted_models(async_mongodb):
+    async def scenario():
+        user = await AsyncUserRepository.save(make_user(), as_="instance")
+        user.age = 31
+        saved = await AsyncUserRepository.save(user)
+        loaded = await AsyncUserRepository.get(id=user.id)
+        loaded.last_name = "Doe"
+        await AsyncUserRepository.save(loaded)
+        return user, saved, await collect(AsyncUserRepository.find())
+
+    user, saved, users = run(scenario())
+    assert saved is user and not user.changed_fields
+    assert len(users) == 1 and (users[0].age, users[0].last_name) == (31, "Doe")
+
+
+def test_async_updates(async_mongodb):
+    async def scenario():
+        await AsyncUserRepository.save(make_user(20))
+        await AsyncUserRepository.save(make_user(30))
+        one = await AsyncUserRepository.update_one({"$inc": {"age": 1}}, age=20)
+        where = await AsyncUserRepository.update_where({"last_name": "Doe"}, age__gte=21)
+        before = await AsyncUserRepository.find_one_and_update({"$inc": {"age": 5}}, age=30, return_new=False)
+        missing = await AsyncUserRepository.find_one_and_update({"age": 1}, age=99)
+        return one, where, before, missing, await collect(AsyncUserRepository.find(sort="+age"))
+
+    one, where, before, missing, users = run(scenario())
+    assert one.modified_count == 1 and where.modified_count == 2
+    assert before.age == 30 and missing is None
+    assert [(user.age, user.last_name) for user in users] == [(21, "Doe"), (35, "Doe")]
+
+
+def test_async_save_and_get(async_mongodb):
+    async def scenario():
+        saved = await AsyncUserRepository.save(make_user())
+        fetched = await AsyncUserRepository.get(id=saved.id)
+        return saved, fetched
+
+    saved, fetched = run(scenario())
+
+    assert saved.id
+    assert fetched == saved
+
+
+def test_async_get_errors(async_mongodb):
+    with pytest.raises(DoesNotExistError):
+        run(AsyncUserRepository.get(age=1))
+
+    async def duplicate():
+        await AsyncUserRepository.save(make_user())
+        await AsyncUserRepository.save(make_user())
+        await AsyncUserRepository.get(age=29)
+
+    with pytest.raises(MultipleObjectsReturnedError):
+        run(duplicate())
+
+
+def test_async_find_and_aggregate(async_mongodb):
+    async def scenario():
+        await AsyncUserRepository.save_many([make_user(age) for age in range(5)])
+        users = await collect(AsyncUserRepository.find(last_name="Smith", skip=1, limit=2))
+        ages = await collect(AsyncUserRepository.find(projection=["age"], as_="tuple"))
+        matched = await collect(AsyncUserRepository.aggregate([{"$match": {"age": {"$gte": 3}}}]))
+        return users, ages, matched
+
+    users, ages, matched = run(scenario())
+
+    assert [user.age for user in users] == [1, 2]
+    assert ages == [(age,) for age in range(5)]
+    assert all(isinstance(user, User) for user in matched)
+    assert [user.age for user in matched] == [3, 4]
+
+
+def test_async_find_invalid_filter(async_mongodb):
+    with pytest.raises(InvalidQueryError):
+        run(collect(AsyncUserRepository.find(first_name={"$tf": "test"})))
+
+
+def test_async_gather_fan_out(async_mongodb):
+    async def scenario():
+        saved = await asyncio.gather(*(AsyncUserRepository.save(make_user(age)) for age in range(10)))
+        fetched = await asyncio.gather(*(AsyncUserRepository.get(id=user.id) for user in saved))
+        return saved, fetched
+
+    saved, fetched = run(scenario())
+
+    assert fetched == saved
+
+
+def test_async_indexes_and_bulk_failures(async_mongodb):
+    accounts = [Account(email="a@mail.com"), Account(email="a@mail.com"), Account(email="b@mail.com")]
+
+    result = run(AsyncAccountRepository.save_many(accounts, ordered=False))
+
+    assert result.inserted_count == 2
+    assert [failure.index for failure in result.failures] == [1]
+
+
+def test_async_connection_alias_and_read_preference(async_mongodb):
+    connect_async("localhost:27017", "analytics", mock=True, alias="analytics")
+    try:
+
+        async def scenario():
+            await AsyncAnalyticsRepository.save(make_user())
+            return await AsyncAnalyticsRepository._get_collection(), await collect(AsyncUserRepository.find())
+
+        collection, default_users = run(scenario())
+        assert collection.database.name == "analytics"
+        assert collection.read_preference == ReadPreference.SECONDARY_PREFERRED
+        assert default_users == []
+
+        # Sync repositories on the same connection see the same mock data
+        assert MongomanticClient.get_database("analytics").user.count_documents({}) == 1
+    finally:
+        disconnect_async("analytics")
+
+
+def test_async_client_options(monkeypatch):
+    created = []
+
+    class MotorClient:
+        def __init__(self, uri, **options):
+            created.append((uri, options))
+
+        def __getitem__(self, name):
+            return name
+
+        def close(self):
+            pass
+
+    motor_asyncio = types.ModuleType("motor.motor_asyncio")
+    motor_asyncio.AsyncIOMotorClient = MotorClient
+    monkeypatch.setitem(sys.modules, "motor", types.ModuleType("motor"))
+    monkeypatch.setitem(sys.modules, "motor.motor_asyncio", motor_asyncio)
+
+    connect_async("mongodb://localhost:27017", "test", alias="pooled", maxPoolSize=7, waitQueueTimeoutMS=100)
+    try:
+        assert not created  # Created on first use
+        assert AsyncMongomanticClient.get_database("pooled") == "test"
+        assert created == [("mongodb://localhost:27017", {"maxPoolSize": 7, "waitQueueTimeoutMS": 100})]
+    finally:
+        disconnect_async("pooled")
+
+
+def test_async_collection_options(async_mongodb, monkeypatch):
+    class AsyncReplicatedRepository(AsyncBaseRepository):
+        class Meta:
+            model = User
+            collection = "user"
+            read_preference = "secondaryPreferred"
+            write_concern = {"w": "majority"}
+
+    applied = []
+    with_options = AsyncMockCollection.with_options
+
+    def recording_with_options(self, **kwargs):
+        applied.extend(kwargs)
+        if "codec_options" in kwargs:
+            return self  # Mongomock does not support custom type registries
+        return with_options(self, **kwargs)
+
+    monkeypatch.setattr(AsyncMockCollection, "with_options", recording_with_options)
+    monkeypatch.setattr(base_repository, "codec_options", lambda models, base: base)
+
+    collection = run(AsyncReplicatedRepository._get_collection())
+    assert applied == ["codec_options", "read_preference", "write_concern"]
+    assert collection.read_preference == ReadPreference.SECONDARY_PREFERRED
+    assert collection.write_concern.document == {"w": "majority"}
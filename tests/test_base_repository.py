@@ -1,6 +1,7 @@
 from typing import Generator
 
 import pytest
+from bson.raw_bson import RawBSONDocument
 from mongomantic import BaseRepository
 from mongomantic.core.database import connect
 from mongomantic.core.errors import DoesNotExistError, InvalidQueryError, MultipleObjectsReturnedError
@@ -45,6 +46,37 @@ def test_repository_save(mongodb, repository):
     assert user.first_name == "John"
 
 
+def test_repository_save_modes(mongodb, repository):
+    user = User(first_name="John", last_name="Smith", email="john@google.com", age=29)
+
+    saved = repository.save(user, as_="instance")
+    assert saved is user and user.id and user.is_persisted and not user.changed_fields
+
+    user.age = 30
+    assert repository.save(user, as_="id") == user.id
+    assert repository.get(id=user.id).age == 30
+
+    inserted_id = repository.save(User(first_name="Jane", last_name="Doe", email="jane@google.com", age=31), as_="id")
+    assert repository.get(id=inserted_id).first_name == "Jane"
+
+
+def test_repository_save_invalid_mode(mongodb):
+    with pytest.raises(ValueError):
+        UserRepository.save(User(first_name="John", last_name="Smith", email="john@google.com", age=29), as_="dict")
+
+
+def test_repository_write_concern(mongodb):
+    class TelemetryRepository(BaseRepository):
+        class Meta:
+            model = User
+            collection = "telemetry"
+            write_concern = {"w": 0}
+
+    assert TelemetryRepository._get_collection().write_concern.document == {"w": 0}
+    assert UserRepository._get_collection().write_concern.acknowledged
+    assert TelemetryRepository.save(User(first_name="John", last_name="Smith", email="john@google.com", age=29))
+
+
 @pytest.fixture()
 def example_user(mongodb, repository) -> User:
     user = User(first_name="John", last_name="Smith", email="john@google.com", age=29)
@@ -160,3 +192,79 @@ def test_safe_repository_aggregate_error(example_user):
 
     assert isinstance(user, Generator)
     assert list(user) == []
+
+
+def test_repository_find_as_dict(example_user, repository):
+    users = list(repository.find(first_name="John", projection={"first_name": True, "_id": False}, as_="dict"))
+
+    assert users == [{"first_name": "John"}]
+
+
+def test_repository_find_as_tuple(example_user, repository):
+    users = list(repository.find(projection=["age", "email"], as_="tuple"))
+
+    assert users == [(29, "john@google.com")]
+
+
+def test_repository_find_as_raw_bson(example_user, repository):
+    users = list(repository.find(projection=["first_name"], as_="raw_bson"))
+
+    assert isinstance(users[0], RawBSONDocument)
+    assert users[0]["first_name"] == "John"
+    assert users[0]["_id"] == example_user.id
+
+
+def test_repository_find_invalid_result_mode(mongodb):
+    with pytest.raises(InvalidQueryError):
+        list(UserRepository.find(as_="xml"))
+
+
+def test_repository_aggregate_as_dict(example_user):
+    results = list(UserRepository.aggregate([{"$group": {"_id": "$last_name", "total": {"$sum": "$age"}}}], as_="dict"))
+
+    assert results == [{"_id": "Smith", "total": 29}]
+
+
+@pytest.fixture()
+def many_users(mongodb):
+    UserRepository.save_many(
+        User(first_name=f"John{i}", last_name="Smith", email=f"john{i}@google.com", age=i) for i in range(10)
+    )
+
+
+def test_repository_find_sort(many_users, repository):
+    users = list(repository.find(sort="-age", limit=3))
+    assert [user.age for user in users] == [9, 8, 7]
+
+    users = list(repository.find(sort=["+last_name", "-age"], limit=2))
+    assert [user.age for user in users] == [9, 8]
+
+
+def test_repository_find_cursor_options(many_users, repository, monkeypatch):
+    collection = repository._get_collection()
+    find = collection.find
+    options = {}
+
+    def recording_find(*args, allow_disk_use=None, **kwargs):
+        options.update(kwargs, allow_disk_use=allow_disk_use)
+        return find(*args, **kwargs)  # Older mongomock versions reject allow_disk_use
+
+    monkeypatch.setattr(collection, "find", recording_find)
+    users = list(repository.find(batch_size=3, max_time_ms=1000, no_cursor_timeout=True, allow_disk_use=True))
+
+    assert len(users) == 10
+    assert options["allow_disk_use"] and options["batch_size"] == 3 and options["max_time_ms"] == 1000
+    assert options["no_cursor_timeout"]
+
+
+def test_repository_find_chunks(many_users, repository):
+    chunks = list(repository.find_chunks(chunk_size=4, sort="age"))
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert [user.age for user in chunks[2]] == [8, 9]
+
+
+def test_repository_find_chunks_as_tuple(many_users, repository):
+    chunks = list(repository.find_chunks(chunk_size=5, projection=["age"], as_="tuple", sort="-age"))
+
+    assert chunks[0] == [(9,), (8,), (7,), (6,), (5,)]
@@ -0,0 +1,27 @@
+import pytest
+from benchmarks import startup, suite
+
+
+def test_suite_runs_on_mongomock():
+    results = suite.run(20, only="small")
+
+    assert {result.name for result in results} >= {"get/small", "save_many/small", "find/small", "aggregate/small"}
+    assert all(result.ops_per_sec > 0 and result.p99_ms >= result.p50_ms for result in results)
+
+
+def test_compare_flags_regressions():
+    results = [suite.Result("find/small", 800, 1, 2, 10), suite.Result("get/small", 950, 1, 2, 10)]
+    baseline = {"results": {"find/small": {"ops_per_sec": 1000}, "get/small": {"ops_per_sec": 1000}}}
+
+    assert suite.compare(results, baseline, threshold=0.1) == [("find/small", pytest.approx(-0.2))]
+
+
+def test_baseline_round_trip(tmp_path):
+    path = tmp_path / "baseline.json"
+    assert suite.main(["-n", "10", "--filter", "to_mongo/small", "--save", str(path)]) == 0
+    assert suite.main(["-n", "10", "--filter", "to_mongo/small", "--compare", str(path), "--threshold", "100"]) == 0
+
+
+def test_startup_within_budget():
+    results = [startup.check(case, runs=2) for case in startup.CASES]
+    assert startup.failures(results) == []
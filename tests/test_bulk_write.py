@@ -0,0 +1,132 @@
+import pytest
+from mongomantic import BaseRepository, Index, MongoDBModel
+from mongomantic.core.database import connect
+from pymongo import DeleteOne, UpdateOne
+
+from .user import User
+from .user_repository import SafeUserRepository, UserRepository
+
+
+class Account(MongoDBModel):
+    email: str
+
+
+class AccountRepository(BaseRepository):
+    class Meta:
+        model = Account
+        collection = "account"
+        indexes = [Index(fields=["+email"], unique=True)]
+
+
+@pytest.fixture(scope="function")
+def mongodb():
+    connect("localhost:27017", "test", mock=True)
+    AccountRepository._indexes = None
+
+
+@pytest.fixture(scope="function", params=[UserRepository, SafeUserRepository])
+def repository(request):
+    return request.param
+
+
+def make_users(n):
+    return (User(first_name=f"John{i}", last_name="Smith", email=f"john{i}@google.com", age=i) for i in range(n))
+
+
+def test_save_many(mongodb, repository):
+    result = repository.save_many(make_users(25), batch_size=10)
+
+    assert result.acknowledged
+    assert result.inserted_count == 25
+    assert len(result.inserted_ids) == 25
+    assert len(list(repository.find())) == 25
+    assert repository.get(id=result.inserted_ids[3]).age == 3
+
+
+def test_save_many_byte_bounded_batches(mongodb, monkeypatch):
+    calls = []
+    collection = UserRepository._get_collection()
+    original = collection.bulk_write
+
+    def bulk_write(requests, **kwargs):
+        calls.append(len(requests))
+        return original(requests, **kwargs)
+
+    monkeypatch.setattr(collection, "bulk_write", bulk_write)
+    UserRepository.save_many(make_users(10), max_batch_bytes=250)
+
+    assert sum(calls) == 10
+    assert len(calls) > 1
+
+
+def test_save_many_unordered_reports_duplicates(mongodb):
+    accounts = [Account(email="a@mail.com"), Account(email="a@mail.com"), Account(email="b@mail.com")]
+
+    result = AccountRepository.save_many(accounts, ordered=False)
+
+    assert result.inserted_count == 2
+    assert len(result.inserted_ids) == 2
+    assert [failure.index for failure in result.failures] == [1]
+    assert result.failures[0].code == 11000
+    assert result.failures[0].operation is accounts[1]
+
+
+def test_save_many_ordered_stops_at_first_failure(mongodb):
+    accounts = (Account(email=email) for email in ["a@mail.com", "a@mail.com", "b@mail.com", "c@mail.com"])
+
+    result = AccountRepository.save_many(accounts, ordered=True, batch_size=2)
+
+    assert result.inserted_count == 1
+    assert [failure.index for failure in result.failures] == [1]
+    assert len(list(AccountRepository.find())) == 1
+
+
+def test_save_many_ordered_failure_mid_batch(mongodb):
+    accounts = [Account(email=email) for email in ["a@mail.com", "a@mail.com", "b@mail.com", "c@mail.com"]]
+
+    result = AccountRepository.save_many(accounts, ordered=True)
+
+    assert result.inserted_count == 1
+    assert result.inserted_ids == [account.id for account in AccountRepository.find()]
+    assert [failure.index for failure in result.failures] == [1]
+
+
+def test_update_many(mongodb, repository):
+    repository.save_many(make_users(5))
+    users = list(repository.find())
+    for user in users:
+        user.last_name = "Doe"
+
+    missing_id = User(first_name="X", last_name="Y", email="x@y.com", age=1)
+    result = repository.update_many(users + [missing_id], ordered=False)
+
+    assert result.modified_count == 5
+    assert [failure.index for failure in result.failures] == [5]
+    assert {user.last_name for user in repository.find()} == {"Doe"}
+
+
+def test_delete_many(mongodb, repository):
+    repository.save_many(make_users(5))
+    users = list(repository.find(limit=3))
+
+    result = repository.delete_many(users)
+
+    assert result.deleted_count == 3
+    assert len(list(repository.find())) == 2
+
+
+def test_bulk_write_mixed_requests(mongodb):
+    UserRepository.save_many(make_users(2))
+
+    result = UserRepository.bulk_write(
+        [
+            User(first_name="Jane", last_name="Smith", email="jane@google.com", age=40),
+            UpdateOne({"age": 0}, {"$set": {"last_name": "Doe"}}),
+            DeleteOne({"age": 1}),
+        ]
+    )
+
+    assert result.inserted_count == 1
+    assert result.modified_count == 1
+    assert result.deleted_count == 1
+    assert UserRepository.get(age=0).last_name == "Doe"
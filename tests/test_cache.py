@@ -0,0 +1,138 @@
+import time
+
+import pytest
+from mongomantic import BaseRepository
+from mongomantic.core.cache import LRUCache, cache_key
+from mongomantic.core.database import connect
+
+from .user import User
+
+
+class CachedUserRepository(BaseRepository):
+    class Meta:
+        model = User
+        collection = "user"
+        cache = LRUCache(max_size=2)
+
+
+@pytest.fixture()
+def cached_repository():
+    connect("localhost:27017", "test", mock=True)
+    CachedUserRepository.Meta.cache = LRUCache(max_size=2)
+    return CachedUserRepository
+
+
+def make_user(age=29):
+    return User(first_name="John", last_name="Smith", email="john@google.com", age=age)
+
+
+def test_get_is_cached(cached_repository, monkeypatch):
+    user = cached_repository.save(make_user())
+    assert cached_repository.get(id=user.id) == user
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Cached lookup should not query MongoDB")
+
+    monkeypatch.setattr(cached_repository._get_collection(), "find", fail)
+
+    cached = cached_repository.get(id=str(user.id))
+    assert cached == user
+    assert cached is not cached_repository.get(id=user.id)
+    assert cached_repository.Meta.cache.stats.hits == 2
+    assert cached_repository.Meta.cache.stats.misses == 1
+
+
+def test_cache_key_ignores_keyword_order():
+    assert cache_key({"a": 1, "b": 2}) == cache_key({"b": 2, "a": 1})
+    assert cache_key({"a": 1}, "default/test.user") != cache_key({"a": 1}, "default/test.event")
+
+
+def test_shared_cache_separates_repositories(cached_repository):
+    class EventRepository(BaseRepository):
+        class Meta:
+            model = User
+            collection = "event"
+            cache = cached_repository.Meta.cache
+
+    user = cached_repository.save(make_user())
+    event = EventRepository.save(make_user())
+
+    assert cached_repository.get(email="john@google.com").id == user.id
+    assert EventRepository.get(email="john@google.com").id == event.id
+    assert len(cached_repository.Meta.cache) == 2
+
+    # A write only invalidates the entries of its own collection
+    EventRepository.save(make_user(age=30))
+    assert len(cached_repository.Meta.cache) == 1
+    assert cached_repository.get(email="john@google.com").id == user.id
+    assert cached_repository.Meta.cache.stats.hits == 1
+
+
+def test_reads_started_before_a_write_are_not_cached(cached_repository):
+    cached_repository.save(make_user())
+    cache = cached_repository.Meta.cache
+    collection = cached_repository._get_collection()
+    find = collection.find
+
+    def find_then_write(*args, **kwargs):
+        results = list(find(*args, **kwargs))
+        cached_repository._invalidate_cache()  # A concurrent write lands after the read
+        return iter(results)
+
+    collection.find = find_then_write
+    try:
+        cached_repository.get(age=29)
+    finally:
+        del collection.find
+
+    assert len(cache) == 0 and cache.generation("test.user/") == 2
+
+
+def test_writes_invalidate_cache(cached_repository):
+    user = cached_repository.save(make_user())
+    cached_repository.get(age=29)
+
+    cached_repository.save(make_user(age=30))
+    assert len(cached_repository.Meta.cache) == 0
+
+    cached_repository.get(age=29)
+    user.last_name = "Doe"
+    cached_repository.update_many([user])
+
+    assert cached_repository.get(age=29).last_name == "Doe"
+
+
+def test_invalidate_namespace():
+    cache = LRUCache()
+    cache.set_if_current("a/1", b"1", "a/", cache.generation("a/"))
+    cache.set_if_current("b/1", b"2", "b/", cache.generation("b/"))
+    cache.set("a/2", b"3")
+
+    generation = cache.generation("a/")
+    cache.invalidate("a/")
+    cache.set_if_current("a/3", b"4", "a/", generation)
+
+    assert cache.get("a/1") is None and cache.get("a/2") is None and cache.get("a/3") is None
+    assert cache.get("b/1") == b"2" and len(cache) == 1
+
+
+def test_lru_eviction():
+    cache = LRUCache(max_size=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.stats.evictions == 1
+
+
+def test_ttl_expiry():
+    cache = LRUCache(ttl=0.01)
+    cache.set("a", b"1")
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats.evictions == 1
+    assert cache.stats.misses == 1
@@ -0,0 +1,150 @@
+import pytest
+from bson import ObjectId
+from mongomantic.core.change_stream import ChangeEvent, CollectionTokenStore, MemoryTokenStore
+from mongomantic.core.database import connect
+from mongomantic.core.errors import InvalidQueryError
+
+from .user import User
+from .user_repository import UserRepository
+
+
+class FakeChangeStream:
+    """Stands in for a ChangeStream, which mongomock does not implement, replaying queued server batches.
+
+    An empty batch is what the server returns when no event arrived within max_await_ms.
+    """
+
+    def __init__(self, batches, resume_after=None):
+        self.batches = [list(batch) for batch in batches]
+        self.resume_after = resume_after
+        self.resume_token = resume_after
+        self.alive = True
+        self.closed = False
+
+    def try_next(self):
+        if not self.batches:
+            self.alive = False
+            return None
+
+        batch = self.batches[0]
+        if not batch:
+            self.batches.pop(0)
+            self.resume_token = {"_data": f"idle-{len(self.batches)}"}
+            return None
+
+        change = batch.pop(0)
+        if not batch:
+            self.batches.pop(0)
+        self.resume_token = change["_id"]
+        return change
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.closed = True
+
+
+def change(n, operation="insert", **document):
+    _id = ObjectId()
+    event = {
+        "_id": {"_data": f"token-{n}"},
+        "operationType": operation,
+        "documentKey": {"_id": _id},
+        "clusterTime": n,
+    }
+    if operation != "delete":
+        event["fullDocument"] = {
+            "_id": _id,
+            "first_name": f"User {n}",
+            "last_name": "Smith",
+            "email": "a@b.c",
+            "age": n,
+        }
+        event["fullDocument"].update(document)
+    if operation == "update":
+        event["updateDescription"] = {"updatedFields": {"age": n}, "removedFields": []}
+    return event
+
+
+@pytest.fixture()
+def streams(monkeypatch):
+    connect("localhost:27017", "test", mock=True)
+    collection = UserRepository._get_collection()
+    opened = []
+    batches = []
+
+    def watch(pipeline, resume_after=None, **options):
+        stream = FakeChangeStream(batches.pop(0) if batches else [], resume_after)
+        stream.pipeline = pipeline
+        stream.options = options
+        opened.append(stream)
+        return stream
+
+    monkeypatch.setattr(collection, "watch", watch)
+    return opened, batches
+
+
+def test_events_are_models(streams):
+    opened, batches = streams
+    batches.append([[change(1), change(2, "update"), change(3, "delete")]])
+
+    events = list(UserRepository.watch(pipeline=[{"$match": {"operationType": "insert"}}], max_await_ms=500))
+
+    assert [event.operation for event in events] == ["insert", "update", "delete"]
+    assert isinstance(events[0], ChangeEvent) and isinstance(events[0].model, User)
+    assert events[0].model.id == events[0].id and events[0].model.is_persisted
+    assert events[1].updated_fields == {"age": 2}
+    assert events[2].model is None
+    assert opened[0].pipeline == [{"$match": {"operationType": "insert"}}]
+    assert opened[0].options["max_await_time_ms"] == 500
+    assert opened[0].closed
+
+
+def test_batches_flush_when_idle(streams):
+    _, batches = streams
+    batches.append([[change(1), change(2), change(3)], [], [change(4)]])
+
+    groups = list(UserRepository.watch(batch=2))
+
+    assert [[event.model.age for event in group] for group in groups] == [[1, 2], [3], [4]]
+
+
+def test_resume_tokens_saved_after_processing(streams):
+    opened, batches = streams
+    store = MemoryTokenStore()
+    batches.append([[change(1), change(2)]])
+
+    events = UserRepository.watch(token_store=store, name="mailer")
+    next(events)
+    assert store.load("mailer") is None  # Not saved until the consumer asks for the next event
+    next(events)
+    assert store.load("mailer") == {"_data": "token-1"}
+    events.close()
+
+    list(UserRepository.watch(token_store=store, name="mailer"))
+    assert opened[-1].resume_after == {"_data": "token-1"}  # Event 2 is redelivered
+
+
+def test_idle_stream_advances_token(streams):
+    _, batches = streams
+    store = MemoryTokenStore()
+    batches.append([[change(1)], []])
+
+    list(UserRepository.watch(token_store=store))
+
+    assert store.load("user") == {"_data": "idle-0"}
+
+
+def test_collection_token_store(streams):
+    store = CollectionTokenStore()
+    assert store.load("user") is None
+
+    store.save("user", {"_data": "a"})
+    store.save("user", {"_data": "b"})
+    assert store.load("user") == {"_data": "b"}
+
+
+def test_invalid_batch(streams):
+    with pytest.raises(InvalidQueryError):
+        next(UserRepository.watch(batch=0))
@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Optional, Union
+
+from datetime import datetime
+
+import bson
+from bson import ObjectId
+from mongomantic import MongoDBModel
+from mongomantic.core.codec import ModelCodec, codec_options
+from pydantic import BaseModel, Extra, Field
+
+
+class Address(BaseModel):
+    city: str
+    zip_code: Optional[str] = Field(default=None, alias="zipCode")
+
+
+class Order(MongoDBModel):
+    number: int
+    items: List[str] = []
+
+
+class Customer(MongoDBModel):
+    name: str = Field(alias="fullName")
+    address: Optional[Address]
+    previous_addresses: List[Address] = []
+    tags: List[str] = []
+    scores: Dict[str, float] = {}
+    metadata: Any = None
+    reference: Union[int, str] = 0
+    last_order: Optional[Order]
+    joined: datetime = datetime(2021, 5, 1)
+
+
+class Flexible(MongoDBModel):
+    name: str
+
+    class Config:
+        extra = Extra.allow
+
+
+def make_customer():
+    return Customer(
+        fullName="John Smith",
+        address=Address(city="Beirut", zipCode="1100"),
+        previous_addresses=[Address(city="Paris")],
+        tags=["a", "b"],
+        scores={"math": 9.5},
+        metadata={"nested": [Address(city="Rome")]},
+        reference="abc",
+        last_order=Order(id=ObjectId(), number=3, items=["x"]),
+    )
+
+
+def test_to_mongo_matches_dict():
+    customer = make_customer()
+    customer.id = ObjectId()
+
+    assert customer.to_mongo() == customer.to_mongo(by_alias=True)
+    assert "id" not in customer.to_mongo()
+    assert customer.to_mongo()["last_order"]["id"] == customer.last_order.id
+    assert Customer(fullName="Jane").to_mongo() == Customer(fullName="Jane").to_mongo(by_alias=True)
+
+
+def test_to_mongo_copies_containers():
+    customer = make_customer()
+    document = customer.to_mongo()
+    document["tags"].append("c")
+    document["scores"]["art"] = 1.0
+
+    assert customer.tags == ["a", "b"]
+    assert customer.scores == {"math": 9.5}
+
+
+def test_to_mongo_extra_fields():
+    model = Flexible(name="John", color="blue")
+    assert model.to_mongo() == {"name": "John", "color": "blue"}
+
+
+def test_codec_roundtrip():
+    codec = ModelCodec(Customer)
+    customer = make_customer()
+
+    document = codec.encode(customer)
+    document["_id"] = ObjectId()
+    decoded = codec.decode(bson.decode(bson.encode(document)))
+
+    assert decoded.id == document["_id"]
+    assert decoded.address == customer.address
+    assert decoded.last_order == customer.last_order
+    assert decoded.is_persisted
+
+
+def test_type_registry_encodes_models_as_values():
+    options = codec_options([Customer])
+    address = Address(city="Paris", zipCode="75001")
+
+    encoded = bson.encode({"$set": {"address": address, "history": [address]}}, codec_options=options)
+    assert bson.decode(encoded) == {
+        "$set": {
+            "address": {"city": "Paris", "zipCode": "75001"},
+            "history": [{"city": "Paris", "zipCode": "75001"}],
+        }
+    }
+
+    # Models that are not reachable from the registered ones go through the fallback encoder
+    other = bson.encode({"model": Flexible(name="John")}, codec_options=options)
+    assert bson.decode(other) == {"model": {"id": None, "name": "John"}}
@@ -0,0 +1,75 @@
+import pytest
+from mongomantic import BaseRepository, connect, disconnect
+from mongomantic.core.database import MongomanticClient
+from mongomantic.core.errors import ConnectionNotFoundError
+from pymongo import ReadPreference
+
+from .user import User
+
+
+class AnalyticsUserRepository(BaseRepository):
+    class Meta:
+        model = User
+        collection = "user"
+        connection = "analytics"
+        read_preference = "secondaryPreferred"
+
+
+@pytest.fixture()
+def connections():
+    connect("localhost:27017", "test", mock=True)
+    connect("localhost:27017", "analytics", mock=True, alias="analytics")
+    yield
+    disconnect()
+    disconnect("analytics")
+
+
+def test_repository_uses_connection_alias(connections):
+    AnalyticsUserRepository.save(User(first_name="John", last_name="Smith", email="john@google.com", age=29))
+
+    collection = AnalyticsUserRepository._get_collection()
+    assert collection.database.name == "analytics"
+    assert collection.read_preference == ReadPreference.SECONDARY_PREFERRED
+    assert MongomanticClient.get_database("analytics").user.count_documents({}) == 1
+    assert MongomanticClient.db.user.count_documents({}) == 0
+
+
+def test_missing_connection_alias(connections):
+    disconnect("analytics")
+
+    with pytest.raises(ConnectionNotFoundError):
+        AnalyticsUserRepository.get(age=29)
+
+
+def test_client_pool_options():
+    connect("mongodb://localhost:27017", "test", alias="pooled", connect=False, maxPoolSize=7, minPoolSize=2)
+    try:
+        client = MongomanticClient.get_connection("pooled").client
+        assert client.options.pool_options.max_pool_size == 7
+        assert client.options.pool_options.min_pool_size == 2
+    finally:
+        disconnect("pooled")
+
+
+def test_reconnect_after_fork():
+    connect("mongodb://localhost:27017", "test", alias="forked", connect=False)
+    try:
+        connection = MongomanticClient.get_connection("forked")
+        parent_client = connection.client
+        connection.pid = -1  # As if inherited from a parent process
+
+        assert MongomanticClient.get_connection("forked").client is not parent_client
+    finally:
+        disconnect("forked")
+
+
+def test_client_created_on_first_use():
+    connect("mongodb://localhost:27017", "test", alias="lazy", connect=False)
+    try:
+        connection = MongomanticClient.get_connection("lazy")
+        assert connection._client is None
+
+        assert MongomanticClient.get_database("lazy").name == "test"
+        assert connection._client is not None
+    finally:
+        disconnect("lazy")
@@ -0,0 +1,171 @@
+import pytest
+from mongomantic import BaseRepository, Index, MongoDBModel
+from mongomantic import __main__ as cli
+from mongomantic.core.database import connect, disconnect
+from mongomantic.core.index_sync import diff_indexes
+from pymongo import TEXT, IndexModel
+
+
+class Article(MongoDBModel):
+    title: str
+    body: str
+    author: str
+    published: bool = False
+
+
+class ArticleRepository(BaseRepository):
+    class Meta:
+        model = Article
+        collection = "article"
+        auto_create_index = False
+        indexes = [
+            Index(fields=["+author", "-title"]),
+            Index(fields=["$title", "$body"]),
+        ]
+
+
+@pytest.fixture()
+def articles():
+    connect("localhost:27017", "test", mock=True)
+    ArticleRepository._get_collection().drop_indexes()
+    return ArticleRepository
+
+
+def test_index_options():
+    document = (
+        Index(
+            fields=["+email"],
+            unique=True,
+            partial_filter_expression={"active": True},
+            collation={"locale": "en", "strength": 2},
+        )
+        .to_pymongo()
+        .document
+    )
+
+    assert document["partialFilterExpression"] == {"active": True}
+    assert document["collation"] == {"locale": "en", "strength": 2}
+    assert "expireAfterSeconds" not in document
+    assert "sparse" not in document
+
+    wildcard = Index(fields=["attributes.$**"]).to_pymongo().document
+    assert list(wildcard["key"].items()) == [("attributes.$**", 1)]
+
+
+def test_sync_creates_declared_indexes(articles):
+    plan = articles.sync_indexes()
+    assert len(plan.create) == 2
+
+    names = set(articles._get_collection().index_information())
+    assert {"author_1_title_-1", "title_text_body_text"} <= names
+    assert articles.plan_indexes().is_empty
+
+
+def test_sync_drops_and_rebuilds(articles):
+    collection = articles._get_collection()
+    collection.create_index([("author", 1), ("title", -1)], unique=True)
+    collection.create_index([("published", 1)])
+
+    plan = articles.sync_indexes(dry_run=True)
+    assert [name for name, _ in plan.rebuild] == ["author_1_title_-1"]
+    assert plan.drop == ["published_1"]
+    assert "published_1" in collection.index_information()
+
+    articles.sync_indexes(rolling=True)
+    information = collection.index_information()
+    assert "published_1" not in information
+    assert not information["author_1_title_-1"].get("unique")
+
+    assert articles.sync_indexes(drop=False).is_empty
+
+
+def test_sync_in_background(articles, monkeypatch):
+    built = []
+    collection = articles._get_collection()
+    create_indexes = collection.create_indexes
+
+    def record(indexes, **kwargs):
+        built.extend(index.document for index in indexes)
+        return create_indexes(indexes, **kwargs)
+
+    monkeypatch.setattr(collection, "create_indexes", record)
+    monkeypatch.setattr(
+        articles.Meta, "indexes", articles.Meta.indexes + [Index(fields=["+published"], background=True)]
+    )
+    articles.sync_indexes(background=True)
+
+    assert len(built) == 3 and all(document["background"] for document in built)
+    assert "published_1" in collection.index_information()
+
+
+def test_diff_matches_server_reported_definitions():
+    declared = [
+        Index(fields=["$title", "+author"], weights={"title": 10}).to_pymongo(),
+        Index(fields=["+email"], collation={"locale": "en"}).to_pymongo(),
+        Index(fields=["+tag"], partial_filter_expression={"published": True}).to_pymongo(),
+    ]
+    live = [
+        {"name": "_id_", "key": {"_id": 1}},
+        {
+            "name": "title_text_author_1",
+            "key": {"_fts": "text", "_ftsx": 1, "author": 1},
+            "weights": {"title": 10},
+            "default_language": "english",
+        },
+        {"name": "email_1", "key": {"email": 1}, "collation": {"locale": "en", "strength": 3, "caseLevel": False}},
+        {"name": "tag_1", "key": {"tag": 1}},
+    ]
+
+    plan = diff_indexes("article", declared, live)
+    assert plan.create == [] and plan.drop == []
+    assert [name for name, _ in plan.rebuild] == ["tag_1"]
+
+
+def test_diff_matches_renamed_index_by_key():
+    declared = [IndexModel([("title", TEXT)])]
+    live = [{"name": "search", "key": {"_fts": "text", "_ftsx": 1}, "weights": {"title": 1}}]
+
+    plan = diff_indexes("article", declared, live)
+    assert [name for name, _ in plan.rebuild] == ["search"]
+    assert plan.drop == []
+
+
+def test_cli_sync_indexes(articles, capsys, monkeypatch):
+    monkeypatch.setattr(cli, "connect", lambda uri, database, alias="default": None)  # Keep the mocked connection
+
+    assert cli.app(["sync-indexes", "tests.test_index_sync:ArticleRepository", "--dry-run"]) == 0
+    assert "article: create author_1_title_-1" in capsys.readouterr().out
+
+    assert cli.app(["sync-indexes", "tests.test_index_sync"]) == 0
+    assert cli.app(["sync-indexes", "tests.test_index_sync"]) == 0
+    assert "article: up to date" in capsys.readouterr().out
+
+
+def test_cli_connects_aliases(articles, capsys, monkeypatch):
+    monkeypatch.setattr(ArticleRepository.Meta, "connection", "analytics", raising=False)
+    connected = []
+
+    def mock_connect(uri, database, alias="default"):
+        connected.append((alias, uri, database))
+        connect(uri, database, mock=True, alias=alias)
+
+    monkeypatch.setattr(cli, "connect", mock_connect)
+
+    try:
+        assert cli.app(["sync-indexes", "tests.test_index_sync:ArticleRepository", "--dry-run"]) == 1
+        assert "skipped, connection 'analytics' is not configured" in capsys.readouterr().err
+
+        argv = [
+            "sync-indexes",
+            "tests.test_index_sync:ArticleRepository",
+            "--alias",
+            "analytics=localhost:27017/events",
+        ]
+        assert cli.app(argv + ["--dry-run"]) == 0
+        assert connected[-1] == ("analytics", "localhost:27017", "events")
+        assert "article: create author_1_title_-1" in capsys.readouterr().out
+    finally:
+        disconnect("analytics")
+
+    with pytest.raises(SystemExit):
+        cli.app(["sync-indexes", "tests.test_index_sync", "--alias", "analytics"])
@@ -0,0 +1,144 @@
+import logging
+
+import pytest
+from mongomantic import BaseRepository, Index
+from mongomantic.core.database import connect
+from mongomantic.core.errors import IndexWarning, InvalidQueryError
+from mongomantic.core.instrumentation import (
+    CallbackSink,
+    Instrumentation,
+    LoggingSink,
+    MetricsClient,
+    MetricsSink,
+    plan_stages,
+)
+from mongomock.collection import Cursor
+
+from .user import User
+
+
+class InstrumentedUserRepository(BaseRepository):
+    class Meta:
+        model = User
+        collection = "user"
+        indexes = [Index(fields=["+email"])]
+
+
+@pytest.fixture()
+def events():
+    connect("localhost:27017", "test", mock=True)
+    received = []
+    InstrumentedUserRepository.Meta.instrumentation = Instrumentation(sinks=[CallbackSink(received.append)])
+    yield received
+    InstrumentedUserRepository.Meta.instrumentation = None
+
+
+def make_user(email="john@google.com", age=29):
+    return User(first_name="John", last_name="Smith", email=email, age=age)
+
+
+def test_operations_are_recorded(events):
+    repository = InstrumentedUserRepository
+    repository.save(make_user())
+    repository.save(make_user(email="jane@google.com"))
+    repository.get(email="john@google.com")
+    repository.get(email="jane@google.com")
+    assert len(list(repository.find(age=29))) == 2
+    list(repository.aggregate([{"$match": {"age": 29}}], as_="dict"))
+
+    assert [event.operation for event in events] == ["save", "save", "get", "get", "find", "aggregate"]
+    assert all(event.bytes > 0 and event.duration_ms >= 0 for event in events)
+    assert events[4].documents == 2
+
+    stats = repository.Meta.instrumentation.stats
+    get_stats = stats[("InstrumentedUserRepository", "get", '{"email":"?"}')]
+    assert get_stats.latency.count == 2
+    assert get_stats.documents == 2
+    assert stats[("InstrumentedUserRepository", "aggregate", '[{"$match":{"age":"?"}}]')].documents == 2
+
+
+def test_abandoned_and_failed_operations_are_recorded(events):
+    repository = InstrumentedUserRepository
+    for i in range(3):
+        repository.save(make_user(email=f"{i}@google.com"))
+
+    results = repository.find(age=29)
+    next(results)
+    results.close()
+    assert events[-1].operation == "find"
+    assert events[-1].documents == 1
+    assert events[-1].error is None
+
+    with pytest.raises(InvalidQueryError):
+        list(repository.find(age={"$bad": 1}))
+    assert events[-1].error is not None
+
+
+def test_explain_flags_collection_scans(events, monkeypatch):
+    repository = InstrumentedUserRepository
+    repository.Meta.instrumentation.explain = True
+    repository.save(make_user())
+
+    explained = []
+
+    def explain(cursor):
+        explained.append(cursor)
+        return {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "COLLSCAN"}}}}
+
+    monkeypatch.setattr(Cursor, "explain", explain, raising=False)
+
+    with pytest.warns(IndexWarning, match="declared index"):
+        repository.get(email="john@google.com")
+    repository.get(email="john@google.com")
+
+    assert len(explained) == 1  # Once per shape
+    assert events[-1].plan == ["FETCH", "COLLSCAN"]
+    assert events[-1].collscan
+
+    with pytest.warns(IndexWarning, match="no index"):
+        list(repository.find(age=29))
+
+
+def test_plan_stages():
+    explain = {
+        "queryPlanner": {
+            "winningPlan": {
+                "queryPlan": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]},
+            }
+        }
+    }
+    assert plan_stages(explain) == ["OR", "IXSCAN", "COLLSCAN"]
+
+
+def test_logging_sink(caplog):
+    connect("localhost:27017", "test", mock=True)
+    InstrumentedUserRepository.Meta.instrumentation = Instrumentation(sinks=[LoggingSink(slow_ms=0)])
+    try:
+        with caplog.at_level(logging.WARNING, logger="mongomantic"):
+            InstrumentedUserRepository.save(make_user())
+    finally:
+        InstrumentedUserRepository.Meta.instrumentation = None
+
+    assert "InstrumentedUserRepository.save" in caplog.text
+
+
+def test_metrics_sink():
+    class Client(MetricsClient):
+        def __init__(self):
+            self.metrics = []
+
+        def histogram(self, name, value, tags):
+            self.metrics.append(name)
+
+        def increment(self, name, value, tags):
+            self.metrics.append(name)
+
+    client = Client()
+    connect("localhost:27017", "test", mock=True)
+    InstrumentedUserRepository.Meta.instrumentation = Instrumentation(sinks=[MetricsSink(client)])
+    try:
+        InstrumentedUserRepository.save(make_user())
+    finally:
+        InstrumentedUserRepository.Meta.instrumentation = None
+
+    assert client.metrics == ["mongomantic.duration_ms", "mongomantic.documents", "mongomantic.bytes"]
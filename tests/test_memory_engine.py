@@ -0,0 +1,131 @@
+import random
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from mongomantic import BaseRepository, Index, MongoDBModel
+from mongomantic.core.database import MongomanticClient, connect
+from mongomantic.core.errors import WriteError
+from mongomantic.core.memory import MemoryClient
+
+QUERIES = [
+    {"group": 3},
+    {"group": {"$in": [1, 4, "x"]}},
+    {"score": {"$gte": 20, "$lt": 40}},
+    {"score": {"$gt": 90.5}},
+    {"score": {"$lte": "zzz"}},
+    {"group": None},
+    {"group": {"$eq": 2}, "score": {"$ne": 10}},
+    {"$and": [{"tags": "b"}, {"score": {"$lt": 50}}]},
+    {"tags": {"$in": ["a", "c"]}},
+    {"nested.value": {"$gte": 5}},
+    {"_id": {"$in": [3, 7, 500]}},
+    {"$or": [{"group": 1}, {"score": 5}]},
+    {"created": {"$lt": datetime(2021, 1, 10)}},
+]
+
+
+def random_document(i: int, rng: random.Random) -> dict:
+    document = {"_id": i, "score": rng.choice([rng.randint(0, 100), rng.random() * 100, "text", None])}
+    if rng.random() < 0.8:
+        document["group"] = rng.choice([0, 1, 2, 3, 4, "x", None])
+    document["tags"] = rng.sample(["a", "b", "c", "d"], rng.randint(0, 3))
+    document["nested"] = rng.choice([{"value": rng.randint(0, 10)}, [{"value": 7}, {"value": 1}], {}])
+    document["created"] = datetime(2021, 1, 1) + timedelta(days=rng.randint(0, 30))
+    return document
+
+
+def test_queries_match_mongomock():
+    rng = random.Random(42)
+    documents = [random_document(i, rng) for i in range(300)]
+
+    collections = [mongomock.MongoClient().db.items, MemoryClient().db.items]
+    for collection in collections:
+        for field in ("group", "score", "tags", "nested.value", "created"):
+            collection.create_index(field)
+        collection.insert_many([dict(document) for document in documents])
+        collection.update_many({"group": 2}, {"$set": {"group": 4}})
+        collection.delete_many({"score": {"$gte": 95}})
+
+    expected, indexed = collections
+    for query in QUERIES:
+        assert list(indexed.find(query)) == list(expected.find(query)), query
+
+
+def test_lookups_only_visit_indexed_candidates():
+    collection = MemoryClient().db.items
+    collection.create_index("group")
+    collection.insert_many([{"group": i % 100, "name": f"item {i}"} for i in range(1000)])
+
+    store = collection._store
+    assert len(store.candidates({"group": 5})) == 10
+    assert len(store.candidates({"group": {"$gte": 10, "$lt": 12}, "name": {"$ne": "item 10"}})) == 20
+    assert store.candidates({"name": "item 5"}) is None
+    assert collection.count_documents({"group": 5, "name": "item 105"}) == 1
+
+    collection.update_one({"name": "item 105"}, {"$set": {"group": 200}})
+    assert len(store.candidates({"group": 5})) == 9
+    assert collection.find_one({"group": 200})["name"] == "item 105"
+
+
+def test_unique_sparse_and_partial_indexes():
+    collection = MemoryClient().db.items
+    collection.create_index("email", unique=True, sparse=True)
+    collection.create_index("code", unique=True, partialFilterExpression={"active": True})
+
+    collection.insert_many([{"email": "a@x.com"}, {"name": "no email"}, {"name": "no email either"}])
+    with pytest.raises(mongomock.DuplicateKeyError):
+        collection.insert_one({"email": "a@x.com"})
+
+    collection.insert_many([{"code": 1, "active": True}, {"code": 1, "active": False}])
+    with pytest.raises(mongomock.DuplicateKeyError):
+        collection.insert_one({"code": 1, "active": True})
+    with pytest.raises(mongomock.DuplicateKeyError):
+        collection.update_one({"active": False}, {"$set": {"active": True}})
+
+    # Rejected writes leave the indexes as they were
+    assert collection.count_documents({"code": 1}) == 2
+    assert collection.count_documents({"email": "a@x.com"}) == 1
+    collection.delete_one({"email": "a@x.com"})
+    collection.insert_one({"email": "a@x.com"})
+
+
+def test_ttl_index_expires_documents():
+    collection = MemoryClient().db.sessions
+    collection.create_index("created", expireAfterSeconds=60)
+
+    now = datetime.utcnow()
+    collection.insert_many([{"created": now - timedelta(minutes=5)}, {"created": now}, {"created": "not a date"}])
+    assert collection.count_documents({}) == 2
+
+
+class Account(MongoDBModel):
+    email: str
+    plan: str
+
+
+class AccountRepository(BaseRepository):
+    class Meta:
+        model = Account
+        collection = "account"
+        indexes = [Index(fields=["+email"], unique=True), Index(fields=["+plan"])]
+
+
+def test_connect_selects_memory_engine():
+    connect("localhost:27017", "test", mock="memory")
+    assert isinstance(MongomanticClient.client, MemoryClient)
+
+    AccountRepository.save_many([Account(email=f"{i}@x.com", plan="free" if i % 4 else "pro") for i in range(40)])
+    assert AccountRepository.count(plan="pro") == 10
+    assert AccountRepository.get(email="7@x.com").plan == "free"
+    with pytest.raises(WriteError):
+        AccountRepository.save(Account(email="7@x.com", plan="pro"))
+
+    with pytest.raises(ValueError):
+        connect("localhost:27017", "test", mock="fast")
+
+
+def test_requires_supported_mongomock(monkeypatch):
+    monkeypatch.setattr(mongomock, "__version__", "3.22.1")
+    with pytest.raises(ImportError):
+        MemoryClient()
@@ -0,0 +1,120 @@
+from typing import List, Optional
+
+from datetime import datetime
+from enum import Enum, IntEnum
+
+from bson import ObjectId
+from mongomantic import BaseRepository, MongoDBModel
+from pydantic import BaseModel, Field, constr
+
+from .user import User
+
+
+class Address(BaseModel):
+    city: str
+    zip_code: Optional[str] = None
+
+
+class Customer(MongoDBModel):
+    name: str = Field(alias="fullName")
+    address: Address
+    previous_addresses: List[Address] = []
+    tags: List[str] = []
+    joined: datetime
+    score: float = 1.0
+
+
+def customer_document():
+    return {
+        "_id": ObjectId(),
+        "fullName": "John Smith",
+        "address": {"city": "Beirut"},
+        "previous_addresses": [{"city": "Paris", "zip_code": "75001"}],
+        "tags": ["a", "b"],
+        "joined": datetime(2021, 5, 1),
+    }
+
+
+def test_trusted_hydration_matches_validated():
+    document = customer_document()
+
+    validated = Customer.from_mongo(dict(document))
+    trusted = Customer.from_mongo(dict(document), trusted=True)
+
+    assert trusted == validated
+    assert trusted.id == document["_id"]
+    assert isinstance(trusted.address, Address)
+    assert isinstance(trusted.previous_addresses[0], Address)
+    assert trusted.address.zip_code is None
+    assert trusted.score == 1.0
+
+
+class Color(str, Enum):
+    red = "red"
+    blue = "blue"
+
+
+class Level(IntEnum):
+    low = 1
+    high = 2
+
+
+class Palette(MongoDBModel):
+    color: Color
+    colors: List[Color] = []
+    level: Level
+    code: constr(max_length=5)
+    weight: float
+    weights: List[float] = []
+
+
+def test_trusted_hydration_converts_enums_and_floats():
+    document = {
+        "_id": ObjectId(),
+        "color": "red",
+        "colors": ["blue"],
+        "level": 2,
+        "code": "abc",
+        "weight": 3,
+        "weights": [1, 2.5],
+    }
+
+    trusted = Palette.from_mongo(dict(document), trusted=True)
+    validated = Palette.from_mongo(dict(document))
+
+    assert trusted == validated
+    assert trusted.color is Color.red and trusted.colors == [Color.blue] and trusted.level is Level.high
+    assert type(trusted.weight) is float and [type(weight) for weight in trusted.weights] == [float, float]
+
+
+def test_trusted_hydration_skips_validation():
+    user = User.from_mongo(
+        {"_id": ObjectId(), "first_name": "John", "last_name": "Smith", "email": 1, "age": "29"}, trusted=True
+    )
+
+    assert user.age == "29"
+    assert user.email == 1
+
+
+def test_trusted_hydration_roundtrip():
+    document = customer_document()
+    customer = Customer.from_mongo(dict(document), trusted=True)
+
+    assert customer.to_mongo() == Customer.from_mongo(dict(document)).to_mongo()
+
+
+def test_repository_trusted_hydration(mongodb):
+    class TrustedUserRepository(BaseRepository):
+        class Meta:
+            model = User
+            collection = "user"
+            trusted_hydration = True
+
+    TrustedUserRepository.save(User(first_name="John", last_name="Smith", email="john@google.com", age=29))
+
+    user = TrustedUserRepository.get(first_name="John")
+    assert user.age == 29
+    assert user.id
+
+    users = list(TrustedUserRepository.find(first_name="John", trusted=False))
+    assert users == [user]
@@ -0,0 +1,116 @@
+from typing import Optional
+
+import warnings
+
+import pytest
+from bson import encode
+from bson.raw_bson import RawBSONDocument
+from mongomantic import BaseRepository, Index, MongoDBModel
+from mongomantic.core.errors import IndexWarning, InvalidQueryError
+from mongomantic.core.pagination import encode_token
+
+from .user import User
+from .user_repository import SafeUserRepository, UserRepository
+
+
+class IndexedUserRepository(BaseRepository):
+    class Meta:
+        model = User
+        collection = "user"
+        indexes = [Index(fields=["+last_name", "-age"])]
+
+
+class Task(MongoDBModel):
+    title: str
+    priority: Optional[int] = None
+
+
+class TaskRepository(BaseRepository):
+    class Meta:
+        model = Task
+        collection = "task"
+        indexes = [Index(fields=["+priority"])]
+
+
+@pytest.fixture()
+def users(mongodb):
+    UserRepository.save_many(
+        User(first_name=f"John{i}", last_name="Smith" if i % 2 else "Doe", email=f"john{i}@google.com", age=i % 5)
+        for i in range(25)
+    )
+
+
+def collect_pages(repository, **kwargs):
+    pages, after = [], None
+    while True:
+        page = repository.paginate(after=after, **kwargs)
+        pages.append(page.items)
+        if not page.has_next:
+            return pages
+        after = page.next_token
+
+
+def test_paginate_by_id(users):
+    pages = collect_pages(UserRepository, page_size=10)
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    ids = [user.id for page in pages for user in page]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 25
+
+
+def test_paginate_with_duplicate_sort_values(users):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        pages = collect_pages(IndexedUserRepository, sort=["+last_name", "-age"], page_size=4)
+
+    users = [user for page in pages for user in page]
+    assert len({user.id for user in users}) == 25
+    assert [(user.last_name, -user.age) for user in users] == sorted((user.last_name, -user.age) for user in users)
+
+
+def test_paginate_with_filter_and_projection(users):
+    with pytest.warns(IndexWarning):
+        pages = collect_pages(
+            UserRepository, sort="-age", page_size=3, last_name="Doe", projection=["age"], as_="tuple"
+        )
+
+    values = [value for page in pages for value in page]
+    assert len(values) == 13
+    assert values == sorted(values, reverse=True)
+
+
+def test_paginate_warns_without_index(users):
+    with pytest.warns(IndexWarning):
+        UserRepository.paginate(sort="age")
+
+
+def test_paginate_rejects_foreign_token(users):
+    token = UserRepository.paginate(sort="_id", page_size=2).next_token
+
+    with pytest.raises(InvalidQueryError):
+        IndexedUserRepository.paginate(after=token, sort=["+last_name", "-age"])
+
+    with pytest.raises(InvalidQueryError):
+        UserRepository.paginate(after="garbage")
+
+    assert SafeUserRepository.paginate(after="garbage").items == []
+
+
+@pytest.mark.parametrize("sort", ["+priority", "-priority"])
+def test_paginate_over_nullable_field(mongodb, sort):
+    TaskRepository.save_many(Task(title=str(i), priority=None if i % 3 == 0 else i % 4) for i in range(11))
+    TaskRepository._get_collection().update_one({"title": "9"}, {"$unset": {"priority": ""}})
+
+    pages = collect_pages(TaskRepository, sort=sort, page_size=2)
+    tasks = [task for page in pages for task in page]
+
+    assert len({task.id for task in tasks}) == TaskRepository.count() == 11
+    keys = [(task.priority is not None, task.priority or 0) for task in tasks]
+    assert keys == sorted(keys, reverse=sort.startswith("-"))
+
+
+def test_token_from_raw_bson():
+    document = RawBSONDocument(encode({"_id": 1, "address": {"city": "Paris"}}))
+    sort = [("address.city", 1), ("_id", 1)]
+    assert encode_token(sort, document) == encode_token(sort, {"_id": 1, "address": {"city": "Paris"}})
@@ -0,0 +1,83 @@
+import multiprocessing
+
+import pytest
+from mongomantic.core.database import connect
+from mongomantic.core.errors import InvalidQueryError
+from mongomantic.core.parallel import split_ranges
+
+from .user import User
+from .user_repository import UserRepository
+
+# Mock clients live in memory, so only forked workers see the parent's data
+fork_only = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="Mock data is only shared with forked workers"
+)
+
+
+@pytest.fixture()
+def users():
+    connect("localhost:27017", "test", mock=True)
+    UserRepository.save_many(
+        [User(first_name=f"User {i}", last_name="Smith", email=f"{i}@google.com", age=i % 50) for i in range(300)]
+    )
+
+
+def scanned_ids(results):
+    ids = [user.id for user in results]
+    assert len(ids) == len(set(ids))
+    return set(ids)
+
+
+def test_ranges_cover_collection(users):
+    ranges = split_ranges(User, UserRepository._get_collection(), "_id", 8)
+    assert 1 < len(ranges) <= 9  # Up to 8 ranges of ids, and one for ids of other types
+
+    assert scanned_ids(UserRepository.parallel_scan(workers=0)) == {user.id for user in UserRepository.find()}
+
+
+def test_ranges_on_field_include_missing_values(users):
+    UserRepository._get_collection().insert_one({"first_name": "Ageless", "last_name": "Smith", "email": "a@b.c"})
+
+    results = list(UserRepository.parallel_scan(workers=0, split_by="age", as_="dict"))
+    assert len(results) == 301
+    assert len({document["_id"] for document in results}) == 301
+
+
+def test_filters_apply_to_every_range(users):
+    results = list(UserRepository.parallel_scan(workers=0, age__gte=40))
+    assert len(results) == 60
+    assert all(user.age >= 40 for user in results)
+
+
+@fork_only
+def test_parallel_scan_in_processes(users):
+    results = list(UserRepository.parallel_scan(workers=2, chunk_size=25, start_method="fork", age__lt=10))
+
+    assert len(results) == 60
+    assert all(isinstance(user, User) and user.is_persisted for user in results)
+    assert scanned_ids(results) == {user.id for user in UserRepository.find(age__lt=10)}
+
+
+@fork_only
+def test_worker_errors_are_raised(users):
+    with pytest.raises(InvalidQueryError, match="Parallel scan worker failed"):
+        list(UserRepository.parallel_scan(workers=2, start_method="fork", as_="invalid"))
+
+
+def test_invalid_workers(users):
+    with pytest.raises(InvalidQueryError):
+        list(UserRepository.parallel_scan(workers=-1))
+
+
+def test_ranges_on_field_with_mixed_types(users):
+    UserRepository._get_collection().insert_many(
+        [{"first_name": f"User {i}", "last_name": "Smith", "email": f"{i}@b.c", "age": str(i)} for i in range(100)]
+        + [{"first_name": "Unknown", "last_name": "Smith", "email": "u@b.c", "age": None}]
+    )
+
+    ranges = split_ranges(User, UserRepository._get_collection(), "age", 8)
+    assert ranges[-1].compile(User) == {"age": {"$not": {"$type": "number"}}}
+
+    results = list(UserRepository.parallel_scan(workers=0, split_by="age", as_="dict"))
+    assert len(results) == 401
+    assert len({document["_id"] for document in results}) == 401
@@ -0,0 +1,110 @@
+from typing import Dict, List, Optional
+
+import pytest
+from bson import ObjectId
+from mongomantic import BaseRepository, MongoDBModel, Q
+from mongomantic.core import query
+from mongomantic.core.errors import FieldDoesNotExistError, InvalidQueryError
+from mongomantic.core.mongo_model import OID
+from mongomantic.core.query import compile_filter
+from pydantic import BaseModel, Field
+
+
+class Address(BaseModel):
+    city: str
+    zip_code: str = Field(alias="zipCode")
+
+
+class Person(MongoDBModel):
+    name: str
+    age: int
+    email: str
+    address: Optional[Address]
+    tags: List[str] = []
+    extra: Dict = {}
+    manager_id: Optional[OID]
+
+
+class PersonRepository(BaseRepository):
+    class Meta:
+        model = Person
+        collection = "person"
+
+
+def test_compile_lookups():
+    manager = ObjectId()
+
+    assert compile_filter(Person, {"age__gte": 30, "age__lt": 40, "email__in": ["a", "b"]}) == {
+        "age": {"$gte": 30, "$lt": 40},
+        "email": {"$in": ["a", "b"]},
+    }
+    assert compile_filter(Person, {"address__city": "Paris", "address__zip_code__ne": "1"}) == {
+        "address.city": "Paris",
+        "address.zipCode": {"$ne": "1"},
+    }
+    assert compile_filter(Person, {"extra__anything__gt": 1}) == {"extra.anything": {"$gt": 1}}
+    assert compile_filter(Person, {"manager_id__in": [str(manager)], "id": str(manager)}) == {
+        "manager_id": {"$in": [manager]},
+        "_id": manager,
+    }
+
+
+def test_compile_conflicting_lookups():
+    assert compile_filter(Person, {"age": 3, "age__gte": 2}) == {"$and": [{"age": 3}, {"age": {"$gte": 2}}]}
+
+
+def test_compile_errors():
+    with pytest.raises(FieldDoesNotExistError):
+        compile_filter(Person, {"height__gte": 3})
+
+    with pytest.raises(FieldDoesNotExistError):
+        compile_filter(Person, {"address__country": "France"})
+
+    with pytest.raises(InvalidQueryError):
+        compile_filter(Person, {"manager_id": "not-an-id"})
+
+
+def test_compile_shape_is_cached():
+    compile_filter(Person, {"name": "a", "age__gt": 1})
+    compiled = query._compiled_shapes[(Person, ("name", "age__gt"))]
+
+    compile_filter(Person, {"name": "b", "age__gt": 2})
+    assert query._compiled_shapes[(Person, ("name", "age__gt"))] is compiled
+
+
+def test_compile_q_objects():
+    assert (Q(age__gte=30) | Q(name="John")).compile(Person) == {"$or": [{"age": {"$gte": 30}}, {"name": "John"}]}
+    assert (Q(age__gte=30) & Q(name="John")).compile(Person) == {"$and": [{"age": {"$gte": 30}}, {"name": "John"}]}
+    assert (~Q(name="John")).compile(Person) == {"$nor": [{"name": "John"}]}
+
+
+@pytest.fixture()
+def people(mongodb):
+    PersonRepository.save_many(
+        Person(
+            name=name,
+            age=age,
+            email=f"{name.lower()}@mail.com",
+            address=Address(city=city, zipCode="0000"),
+            tags=tags,
+        )
+        for name, age, city, tags in [
+            ("John", 25, "Paris", ["a"]),
+            ("Jane", 35, "Beirut", ["a", "b"]),
+            ("Jack", 45, "Paris", []),
+        ]
+    )
+
+
+def test_repository_lookups(people):
+    assert {person.name for person in PersonRepository.find(age__gte=30)} == {"Jane", "Jack"}
+    assert {person.name for person in PersonRepository.find(address__city="Paris", age__lt=30)} == {"John"}
+    assert {person.name for person in PersonRepository.find(email__in=["jane@mail.com", "x@mail.com"])} == {"Jane"}
+    assert PersonRepository.get(tags__size=2).name == "Jane"
+
+
+def test_repository_q_objects(people):
+    people = PersonRepository.find(Q(age__lt=30) | Q(address__city="Beirut"), tags__exists=True)
+    assert {person.name for person in people} == {"John", "Jane"}
+
+    assert PersonRepository.get(~Q(address__city="Paris")).name == "Jane"
@@ -0,0 +1,135 @@
+from typing import List, Optional
+
+import pytest
+from mongomantic import BaseRepository, MongoDBModel
+from mongomantic.core.database import connect
+from mongomantic.core.errors import InvalidQueryError
+from mongomantic.core.mongo_model import OID
+
+
+class Author(MongoDBModel):
+    name: str
+
+
+class Tag(MongoDBModel):
+    label: str
+
+
+class Document(MongoDBModel):
+    title: str
+    body: str
+    attachment: bytes = b""
+    author_id: Optional[OID]
+    tag_ids: List[OID] = []
+
+
+class AuthorRepository(BaseRepository):
+    class Meta:
+        model = Author
+        collection = "author"
+
+
+class TagRepository(BaseRepository):
+    class Meta:
+        model = Tag
+        collection = "tag"
+
+
+class DocumentRepository(BaseRepository):
+    class Meta:
+        model = Document
+        collection = "document"
+        deferred_fields = ["body", "attachment"]
+        references = {"author_id": AuthorRepository, "tag_ids": TagRepository}
+
+
+@pytest.fixture()
+def documents():
+    connect("localhost:27017", "test", mock=True)
+    author = AuthorRepository.save(Author(name="Jane"))
+    tags = [TagRepository.save(Tag(label=label)) for label in ("a", "b")]
+    for i in range(5):
+        DocumentRepository.save(
+            Document(
+                title=f"Document {i}",
+                body="x" * 1000,
+                attachment=b"blob",
+                author_id=author.id,
+                tag_ids=[tag.id for tag in tags],
+            )
+        )
+    return author, tags
+
+
+def count_queries(monkeypatch, repository, method="find"):
+    collection = repository._get_collection()
+    original = getattr(collection, method)
+    calls = []
+
+    def recording(*args, **kwargs):
+        calls.append(args or kwargs)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(collection, method, recording)
+    return calls
+
+
+def test_deferred_fields_load_on_access(documents, monkeypatch):
+    document = next(DocumentRepository.find(title="Document 0"))
+    assert document.unloaded_fields == {"body", "attachment"}
+    assert "body" not in document.dict()
+
+    calls = count_queries(monkeypatch, DocumentRepository, "find_one")
+    assert document.body == "x" * 1000
+    assert document.attachment == b"blob"
+    assert len(calls) == 1  # Every deferred field is loaded at once
+    assert document.unloaded_fields == set()
+    assert document.changed_fields == set()
+
+
+def test_defer_override(documents):
+    document = DocumentRepository.get(title="Document 0", defer=())
+    assert document.unloaded_fields == set()
+
+    document = DocumentRepository.get(title="Document 0", defer=["attachment"])
+    assert document.unloaded_fields == {"attachment"}
+
+    document = next(DocumentRepository.find(title="Document 0", as_="dict"))
+    assert document["body"]
+
+
+def test_save_partially_loaded_model(documents):
+    document = DocumentRepository.get(title="Document 0")
+    document.title = "Renamed"
+    DocumentRepository.save(document)
+
+    stored = DocumentRepository.get(title="Renamed", defer=())
+    assert stored.body == "x" * 1000
+
+    result = DocumentRepository.update_many([DocumentRepository.get(title="Renamed")])
+    assert result.failures and "deferred" in result.failures[0].message
+
+
+def test_prefetch_related(documents, monkeypatch):
+    author, tags = documents
+    author_calls = count_queries(monkeypatch, AuthorRepository)
+    tag_calls = count_queries(monkeypatch, TagRepository)
+
+    results = list(DocumentRepository.find(prefetch_related=["author_id", "tag_ids"], batch_size=2))
+
+    assert len(results) == 5
+    assert all(document.related("author_id") == author for document in results)
+    assert [tag.label for tag in results[0].related("tag_ids")] == ["a", "b"]
+    assert len(author_calls) == 3  # One $in query per batch of 2 results
+    assert len(tag_calls) == 3
+
+
+def test_related_without_prefetch(documents):
+    author, _ = documents
+    document = DocumentRepository.get(title="Document 1")
+    assert document.related("author_id") == author
+
+
+def test_prefetch_undeclared_reference(documents):
+    with pytest.raises(InvalidQueryError):
+        list(DocumentRepository.find(prefetch_related=["title"]))
@@ -0,0 +1,212 @@
+from contextvars import Context
+
+import pytest
+from mongomantic import BaseRepository, Index, run_in_transaction, start_session, transaction
+from mongomantic.core import session as session_module
+from mongomantic.core.cache import LRUCache
+from mongomantic.core.database import MongomanticClient, connect
+from mongomantic.core.errors import WriteError
+from mongomantic.core.session import current_session
+from pymongo.errors import PyMongoError
+
+from .user import User
+from .user_repository import UserRepository
+
+
+class IndexedUserRepository(BaseRepository):
+    class Meta:
+        model = User
+        collection = "user"
+        indexes = [Index(fields=["+email"])]
+
+
+class FakeSession:
+    """Stands in for a ClientSession, which mongomock does not implement"""
+
+    def __init__(self, client, commit_errors=()):
+        self.client = client
+        self.in_transaction = False
+        self.commit_errors = list(commit_errors)
+        self.events = []
+
+    def start_transaction(self, **options):
+        self.in_transaction = True
+        self.events.append("start")
+
+    def commit_transaction(self):
+        self.events.append("commit")
+        if self.commit_errors:
+            raise self.commit_errors.pop(0)
+        self.in_transaction = False
+
+    def abort_transaction(self):
+        self.events.append("abort")
+        self.in_transaction = False
+
+    def end_session(self):
+        self.events.append("end")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.end_session()
+
+
+@pytest.fixture()
+def sessions(monkeypatch):
+    connect("localhost:27017", "test", mock=True)
+    client = MongomanticClient.client
+    started = []
+
+    def start(causal_consistency=True):
+        fake = FakeSession(client, commit_errors=started_errors.pop(0) if started_errors else ())
+        started.append(fake)
+        return fake
+
+    started_errors = []
+    monkeypatch.setattr(client, "start_session", start, raising=False)
+    monkeypatch.setattr(session_module.time, "sleep", lambda seconds: None)
+
+    # Record the session passed to the collection, then run the write without it since mongomock has no sessions
+    collection = UserRepository._get_collection()
+    insert_one = collection.insert_one
+    used = []
+
+    def recording_insert_one(document, session=None):
+        used.append(session)
+        return insert_one(document)
+
+    monkeypatch.setattr(collection, "insert_one", recording_insert_one)
+    return started, started_errors, used
+
+
+def make_user():
+    return User(first_name="John", last_name="Smith", email="john@google.com", age=29)
+
+
+def test_transaction_threads_session(sessions):
+    started, _, used = sessions
+
+    with transaction() as session:
+        assert current_session() is session
+        UserRepository.save(make_user())
+        UserRepository.save(make_user())
+
+    assert current_session() is None
+    assert used == [session, session]
+    assert session.events == ["start", "commit", "end"]
+
+    UserRepository.save(make_user())
+    assert used[-1] is None
+
+
+def test_indexes_are_created_outside_transactions(sessions, monkeypatch):
+    collection = IndexedUserRepository._get_collection()
+    create_indexes = collection.create_indexes
+    used = []
+
+    def recording_create_indexes(indexes, **kwargs):
+        used.append(kwargs.get("session"))
+        return create_indexes(indexes, **kwargs)
+
+    monkeypatch.setattr(collection, "create_indexes", recording_create_indexes)
+    monkeypatch.setattr(IndexedUserRepository, "_indexes", None)
+
+    with transaction():
+        IndexedUserRepository._get_collection()  # First use of the repository
+
+    assert used == [None]
+
+
+def test_transaction_aborts_on_error(sessions):
+    started, _, _ = sessions
+
+    with pytest.raises(ValueError):
+        with transaction():
+            UserRepository.save(make_user())
+            raise ValueError("Out of stock")
+
+    assert started[0].events == ["start", "abort", "end"]
+
+
+def test_nested_transaction_joins(sessions):
+    started, _, used = sessions
+
+    with transaction() as outer:
+        with transaction() as inner:
+            UserRepository.save(make_user())
+
+    assert inner is outer
+    assert len(started) == 1
+    assert outer.events == ["start", "commit", "end"]
+
+
+def test_commit_retried_on_unknown_result(sessions):
+    started, started_errors, _ = sessions
+    started_errors.append([PyMongoError("timeout", error_labels=["UnknownTransactionCommitResult"])])
+
+    with transaction():
+        UserRepository.save(make_user())
+
+    assert started[0].events == ["start", "commit", "commit", "end"]
+
+
+def test_run_in_transaction_retries_transient_errors(sessions):
+    started, started_errors, _ = sessions
+    calls = []
+
+    def place_order():
+        calls.append(1)
+        if len(calls) == 1:
+            raise WriteError("Write conflict") from PyMongoError("conflict", error_labels=["TransientTransactionError"])
+        return UserRepository.save(make_user())
+
+    user = run_in_transaction(place_order)
+
+    assert user.id
+    assert len(calls) == 2
+    assert started[0].events == ["start", "abort", "end"]
+    assert started[1].events == ["start", "commit", "end"]
+
+
+def test_run_in_transaction_does_not_retry_other_errors(sessions):
+    started, _, _ = sessions
+
+    def fail():
+        raise WriteError("Duplicate key")
+
+    with pytest.raises(WriteError):
+        run_in_transaction(fail)
+    assert len(started) == 1
+
+
+def test_start_session(sessions):
+    started, _, used = sessions
+
+    with start_session() as session:
+        UserRepository.save(make_user())
+
+    assert used == [session]
+    assert session.events == ["end"]
+
+
+def test_cache_invalidated_after_commit(sessions, monkeypatch):
+    class CachedUserRepository(BaseRepository):
+        class Meta:
+            model = User
+            collection = "user"
+            cache = LRUCache(max_size=2)
+
+    collection = CachedUserRepository._get_collection()
+    insert_one = collection.insert_one
+    monkeypatch.setattr(collection, "insert_one", lambda document, session=None: insert_one(document))
+    cache = CachedUserRepository.Meta.cache
+
+    with transaction():
+        user = CachedUserRepository.save(make_user())
+        # A reader outside the transaction caches what it sees before the commit
+        Context().run(CachedUserRepository.get, id=user.id)
+        assert len(cache) == 1
+
+    assert len(cache) == 0
@@ -0,0 +1,115 @@
+from typing import List, Optional
+
+import json
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from mongomantic import BaseRepository, MongoDBModel
+from mongomantic.core.database import connect
+from mongomantic.core.errors import InvalidQueryError
+from pydantic import BaseModel
+
+
+class Address(BaseModel):
+    city: str
+
+
+class Customer(MongoDBModel):
+    name: str
+    joined: datetime
+    addresses: List[Address] = []
+    notes: Optional[str] = None
+
+
+class CustomerRepository(BaseRepository):
+    class Meta:
+        model = Customer
+        collection = "customer"
+        deferred_fields = ["notes"]
+
+
+@pytest.fixture()
+def customers():
+    connect("localhost:27017", "test", mock=True)
+    CustomerRepository.save_many(
+        [
+            Customer(name=f"Customer {i}", joined=datetime(2020, 1, 1, i), addresses=[{"city": "Paris"}], notes="vip")
+            for i in range(10)
+        ]
+    )
+    return {customer.id: customer for customer in CustomerRepository.find(defer=())}
+
+
+def reimport(path, **kwargs):
+    connect("localhost:27017", "test", mock=True)  # Fresh mock database
+    return CustomerRepository.import_from(str(path), **kwargs)
+
+
+@pytest.mark.parametrize("filename", ["customers.bson", "customers.bson.gz", "customers.ndjson", "customers.ndjson.xz"])
+def test_round_trip(customers, tmp_path, filename):
+    path = tmp_path / filename
+    fmt = "ndjson" if ".ndjson" in filename else "bson"
+    stats = CustomerRepository.export_to(str(path), format=fmt)
+    assert stats.documents == 10 and stats.bytes > 0
+
+    result = reimport(path)
+
+    assert result.inserted_count == 10 and result.acknowledged
+    assert {customer.id: customer for customer in CustomerRepository.find(defer=())} == customers
+
+
+def test_ndjson_uses_json_encoders(customers, tmp_path):
+    path = tmp_path / "customers.ndjson"
+    CustomerRepository.export_to(str(path), format="ndjson", name="Customer 1")
+
+    document = json.loads(path.read_text())
+    assert ObjectId(document["_id"]) in customers
+    assert document["joined"] == "2020-01-01T01:00:00"
+    assert document["notes"] == "vip"  # Deferred fields are exported
+
+
+def test_import_reports_progress_and_invalid_documents(customers, tmp_path):
+    path = tmp_path / "customers.ndjson"
+    CustomerRepository.export_to(str(path), format="ndjson")
+    with open(path, "a") as file:
+        file.write(json.dumps({"name": "No join date"}) + "\n")
+
+    reports = []
+    result = reimport(path, batch_size=4, progress=lambda stats: reports.append(stats.documents))
+
+    assert result.inserted_count == 10
+    assert len(result.failures) == 1 and result.failures[0].index == 10
+    assert reports == [4, 8, 11]
+
+
+def test_import_mongoexport_extended_json(tmp_path):
+    ids = [ObjectId(), ObjectId()]
+    path = tmp_path / "customers.json"
+    path.write_text(
+        "".join(
+            f'{{"_id":{{"$oid":"{_id}"}},"name":"Customer {i}","joined":{{"$date":"2020-01-0{i + 1}T00:00:00Z"}},'
+            f'"addresses":[{{"city":"Paris"}}]}}\n'
+            for i, _id in enumerate(ids)
+        )
+    )
+
+    result = reimport(path)
+
+    assert result.inserted_count == 2 and result.acknowledged
+    assert CustomerRepository.get(id=ids[1]).joined.day == 2
+
+
+def test_export_progress(customers, tmp_path):
+    reports = []
+    CustomerRepository.export_to(
+        str(tmp_path / "c.bson"), progress=lambda s: reports.append(s.documents), progress_every=5
+    )
+    assert reports == [5, 10, 10]
+
+
+def test_invalid_format(customers, tmp_path):
+    with pytest.raises(InvalidQueryError):
+        CustomerRepository.export_to(str(tmp_path / "c.csv"), format="csv")
+    with pytest.raises(InvalidQueryError):
+        CustomerRepository.export_to(str(tmp_path / "c.bson"), compress="zip")
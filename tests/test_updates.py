@@ -0,0 +1,178 @@
+from typing import List
+
+import pytest
+from bson import ObjectId
+from mongomantic import BaseRepository, MongoDBModel
+from mongomantic.core.database import connect
+from mongomantic.core.errors import InvalidQueryError, WriteError
+from mongomantic.utils.safe_repository import SafeRepository
+
+
+class Post(MongoDBModel):
+    title: str
+    body: str
+    views: int = 0
+    tags: List[str] = []
+
+
+class PostRepository(BaseRepository):
+    class Meta:
+        model = Post
+        collection = "post"
+
+
+class SafePostRepository(SafeRepository):
+    class Meta:
+        model = Post
+        collection = "post"
+
+
+@pytest.fixture()
+def posts():
+    connect("localhost:27017", "test", mock=True)
+    PostRepository._get_collection().delete_many({})
+    return PostRepository
+
+
+def test_dirty_tracking(posts):
+    post = Post(title="Hello", body="World")
+    assert not post.is_persisted
+
+    post = posts.save(post)
+    assert post.is_persisted
+    assert post.changed_fields == set()
+
+    post.title = "Hi"
+    assert post.changed_fields == {"title"}
+
+    with pytest.raises(ValueError):
+        post.mark_changed("missing")
+
+
+def test_copies_track_changes_separately(posts):
+    post = posts.save(Post(title="Hello", body="World"))
+    copy = post.copy()
+    copy.body = "Changed in the copy"
+
+    assert copy.changed_fields == {"body"} and post.changed_fields == set()
+    assert copy.is_persisted
+
+    post.title = "Hi"
+    posts.save(post)
+    assert posts.get(id=post.id).body == "World"
+
+
+def test_from_mongo_leaves_document_unchanged():
+    document = {"_id": ObjectId(), "title": "Hello", "body": "World"}
+    for trusted in (False, True):
+        assert Post.from_mongo(document, trusted=trusted).id == document["_id"]
+        assert "_id" in document and "id" not in document
+
+
+def test_save_updates_changed_fields_only(posts):
+    post = posts.save(Post(title="Hello", body="World"))
+    posts._get_collection().update_one({"_id": post.id}, {"$set": {"body": "Changed elsewhere"}})
+
+    post.title = "Hi"
+    saved = posts.save(post)
+
+    assert saved is post
+    assert post.changed_fields == set()
+    stored = posts.get(id=post.id)
+    assert stored.title == "Hi"
+    assert stored.body == "Changed elsewhere"
+    assert posts._get_collection().count_documents({}) == 1
+
+
+def test_save_without_changes_skips_write(posts, monkeypatch):
+    post = posts.save(Post(title="Hello", body="World"))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Unchanged model should not be written")
+
+    monkeypatch.setattr(posts._get_collection(), "update_one", fail)
+    assert posts.save(post) is post
+
+
+def test_save_deleted_document_raises(posts):
+    post = posts.save(Post(title="Hello", body="World"))
+    posts._get_collection().delete_one({"_id": post.id})
+
+    post.title = "Hi"
+    with pytest.raises(WriteError):
+        posts.save(post)
+
+
+def test_update_one_operators(posts):
+    post = posts.save(Post(title="Hello", body="World"))
+
+    res = posts.update_one({"$inc": {"views": 2}, "$push": {"tags": "news"}}, id=post.id)
+    assert res.modified_count == 1
+
+    stored = posts.get(id=post.id)
+    assert stored.views == 2
+    assert stored.tags == ["news"]
+
+
+def test_update_one_plain_values_use_set(posts):
+    post = posts.save(Post(title="Hello", body="World"))
+
+    posts.update_one({"title": "Hi"}, title="Hello")
+    assert posts.get(id=post.id).title == "Hi"
+    assert posts.get(id=post.id).body == "World"
+
+
+def test_update_one_upsert(posts):
+    res = posts.update_one({"$set": {"body": "World", "views": 0}}, title="Hello", upsert=True)
+    assert res.upserted_id is not None
+    assert posts.get(title="Hello").body == "World"
+
+
+def test_update_where(posts):
+    for title in ("a", "b", "c"):
+        posts.save(Post(title=title, body="draft"))
+
+    res = posts.update_where({"$set": {"body": "published"}}, title__in=["a", "b"])
+    assert res.modified_count == 2
+    assert sorted(post.title for post in posts.find(body="published")) == ["a", "b"]
+
+
+@pytest.mark.parametrize("option", [{"limit": 1}, {"skip": 1}, {"sort": "-views"}])
+def test_update_where_rejects_find_options(posts, option):
+    for title in ("a", "b"):
+        posts.save(Post(title=title, body="draft"))
+
+    with pytest.raises(InvalidQueryError, match=next(iter(option))):
+        posts.update_where({"$set": {"body": "published"}}, body="draft", **option)
+    with pytest.raises(InvalidQueryError):
+        posts.update_one({"$set": {"body": "published"}}, body="draft", **option)
+
+    assert posts.count(body="draft") == 2
+
+
+def test_find_one_and_update(posts):
+    post = posts.save(Post(title="Hello", body="World"))
+
+    updated = posts.find_one_and_update({"$inc": {"views": 1}}, id=post.id)
+    assert updated.views == 1
+    assert updated.is_persisted
+
+    before = posts.find_one_and_update({"$inc": {"views": 1}}, id=post.id, return_new=False)
+    assert before.views == 1
+
+    assert posts.find_one_and_update({"$inc": {"views": 1}}, title="Missing") is None
+
+
+def test_find_one_and_update_sort(posts):
+    for views in (3, 1, 2):
+        posts.save(Post(title="Hello", body="World", views=views))
+
+    claimed = posts.find_one_and_update({"$set": {"body": "claimed"}}, sort="+views")
+    assert claimed.views == 1
+    assert claimed.body == "claimed"
+
+
+def test_safe_update_returns_none(posts):
+    posts.save(Post(title="Hello", body="World"))
+    assert SafePostRepository.update_one({"$bad": {"views": 1}}, title="Hello") is None
+    assert SafePostRepository.find_one_and_update({"$bad": {"views": 1}}, title="Hello") is None
@@ -0,0 +1,90 @@
+from typing import List
+
+import pytest
+from mongomantic import BaseRepository, MongoDBModel
+from mongomantic.core.database import connect
+from mongomantic.core.errors import FieldDoesNotExistError, InvalidQueryError
+from pydantic import BaseModel, Field
+
+
+class Address(BaseModel):
+    street: str
+    city: str
+
+
+class Order(BaseModel):
+    item: str
+    price: float
+
+
+class Customer(MongoDBModel):
+    name: str = Field(alias="full_name")
+    email: str
+    bio: str
+    address: Address
+    orders: List[Order] = []
+
+
+class CityView(BaseModel):
+    city: str
+
+
+class CustomerSummary(MongoDBModel):
+    name: str = Field(alias="full_name")
+    address: CityView
+
+
+class OrderItem(BaseModel):
+    item: str
+
+
+class CustomerOrders(MongoDBModel):
+    orders: List[OrderItem]
+
+
+class CustomerRepository(BaseRepository):
+    class Meta:
+        model = Customer
+        collection = "customer"
+
+
+@pytest.fixture()
+def customers():
+    connect("localhost:27017", "test", mock=True)
+    CustomerRepository.save(
+        Customer(
+            full_name="Jane Doe",
+            email="jane@x.com",
+            bio="A long biography " * 100,
+            address=Address(street="1 Main St", city="Paris"),
+            orders=[Order(item="book", price=12.5), Order(item="pen", price=1.0)],
+        )
+    )
+
+
+def test_find_with_view(customers):
+    summary = next(CustomerRepository.find(view=CustomerSummary))
+
+    assert isinstance(summary, CustomerSummary) and summary.id
+    assert summary.name == "Jane Doe" and summary.address.city == "Paris"
+    assert CustomerRepository._view_projection(CustomerSummary) == {"full_name": True, "address.city": True}
+
+    documents = list(CustomerRepository.find(view=CustomerSummary, as_="dict"))
+    assert documents[0]["address"] == {"city": "Paris"} and "bio" not in documents[0]
+
+
+def test_view_of_embedded_lists(customers):
+    orders = CustomerRepository.get(view=CustomerOrders, name="Jane Doe", trusted=True)
+    assert [order.item for order in orders.orders] == ["book", "pen"]
+
+
+def test_invalid_views(customers):
+    class Unknown(MongoDBModel):
+        nickname: str
+
+    with pytest.raises(FieldDoesNotExistError):
+        list(CustomerRepository.find(view=Unknown))
+    with pytest.raises(InvalidQueryError):
+        list(CustomerRepository.find(view=CityView))
+    with pytest.raises(InvalidQueryError):
+        list(CustomerRepository.find(view=CustomerSummary, projection=["email"]))
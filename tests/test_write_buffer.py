@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+from bson import ObjectId
+from mongomantic import BaseRepository, Index
+from mongomantic.core.database import connect
+from mongomantic.core.errors import WriteError
+from mongomantic.core.write_buffer import WriteBuffer, WriteBufferSettings
+
+from .user import User
+
+
+class EventRepository(BaseRepository):
+    class Meta:
+        model = User
+        collection = "event"
+        indexes = [Index(fields=["+email"], unique=True)]
+        write_buffer = {"max_docs": 10, "max_latency_ms": 20}
+
+
+def make_user(i: int) -> User:
+    return User(first_name="Event", last_name=str(i), email=f"{i}@events.com", age=i)
+
+
+@pytest.fixture()
+def events():
+    connect("localhost:27017", "test", mock=True)
+    EventRepository._indexes = None  # Recreate indexes on the new mock client
+    yield EventRepository
+    EventRepository._write_buffer().close()
+    EventRepository._buffer = None
+
+
+def test_buffered_saves_resolve_to_inserted_ids(events):
+    futures = [events.save_buffered(make_user(i)) for i in range(25)]
+    ids = [future.result(timeout=5) for future in futures]
+
+    assert len(set(ids)) == 25 and all(isinstance(_id, ObjectId) for _id in ids)
+    assert events.get(id=str(ids[7])).age == 7
+
+
+def test_latency_flushes_partial_batches(events):
+    future = events.save_buffered(make_user(1))
+    assert future.result(timeout=5)
+    assert events.count() == 1
+
+
+def test_flush_writes_everything_buffered(events):
+    EventRepository._write_buffer().settings.max_latency_ms = 60_000
+    futures = [events.save_buffered(make_user(i)) for i in range(5)]
+
+    assert not any(future.done() for future in futures)
+    assert events.flush_buffer(timeout=5)
+    assert all(future.done() for future in futures) and events.count() == 5
+
+
+def test_failed_inserts_fail_their_own_futures(events):
+    events.save(make_user(1))
+    duplicate, other = events.save_buffered(make_user(1)), events.save_buffered(make_user(2))
+
+    with pytest.raises(WriteError):
+        duplicate.result(timeout=5)
+    assert other.result(timeout=5)
+
+    with pytest.raises(WriteError):
+        events.save_buffered(events.get(email="1@events.com"))
+
+
+def test_full_buffer_applies_backpressure():
+    gate = threading.Event()
+    written = []
+
+    class SlowRepository:
+        @classmethod
+        def _bulk(cls, writes, result, *args):
+            gate.wait(5)
+            written.extend(writes)
+            return result
+
+    buffer = WriteBuffer(SlowRepository, WriteBufferSettings(max_docs=2, max_latency_ms=0))
+    buffer.add(make_user(1))
+    time.sleep(0.05)  # The first batch is now in flight, blocked on the gate
+    buffer.add(make_user(2))
+    buffer.add(make_user(3))
+
+    with pytest.raises(WriteError):
+        buffer.add(make_user(4), timeout=0.05)
+
+    gate.set()
+    buffer.close(timeout=5)
+    assert len(written) == 3
+
+    with pytest.raises(WriteError):
+        buffer.add(make_user(5))
+
+
+def test_concurrent_first_saves_share_one_buffer(events, monkeypatch):
+    created = []
+    init = WriteBuffer.__init__
+
+    def slow_init(self, *args):
+        created.append(self)
+        time.sleep(0.05)  # Widens the window in which other threads find no buffer yet
+        init(self, *args)
+
+    monkeypatch.setattr(WriteBuffer, "__init__", slow_init)
+    EventRepository._buffer = None
+    barrier = threading.Barrier(8)
+    futures = []
+
+    def save(i):
+        barrier.wait()
+        futures.append(events.save_buffered(make_user(i)))
+
+    threads = [threading.Thread(target=save, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert len({future.result(timeout=5) for future in futures}) == 8